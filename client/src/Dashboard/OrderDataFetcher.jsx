@@ -3,7 +3,10 @@ import OrderManagement from './OrderMangement';
 
 const OrderDataFetcher = () => {
 const [orders, setOrders] = useState([]);
+const [summary, setSummary] = useState(null);
+const [nextCursor, setNextCursor] = useState(null);
 const [loading, setLoading] = useState(true);
+const [loadingMore, setLoadingMore] = useState(false);
 const [error, setError] = useState(null);
 const [filterStatus, setFilterStatus] = useState('all');
 const [searchTerm, setSearchTerm] = useState('');
@@ -12,24 +15,30 @@ const [dateRange, setDateRange] = useState({ from: '', to: '' });
 // Define the base API URL - replace with your actual backend URL
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'https://shopping-cart-5wj4.onrender.com';
 
-const fetchOrders = useCallback(async () => {
-    setLoading(true);
-    setError(null);
-    
-    try {
+// Orders per page; later pages are requested with the cursor of the previous one
+const PAGE_SIZE = 50;
+
+// Fetches one page of orders, starting after the given cursor
+const fetchOrderPage = useCallback(async (after) => {
     // Build URL with query parameters
     const url = new URL(`${API_BASE_URL}/orders`);
+    url.searchParams.append('limit', PAGE_SIZE);
+    url.searchParams.append('include', 'items,payments,coupon');
+    
+    if (after) {
+        url.searchParams.append('after', after);
+    }
     
     if (filterStatus !== 'all') {
         url.searchParams.append('status', filterStatus);
     }
     
     if (dateRange.from) {
-        url.searchParams.append('from_date', dateRange.from);
+        url.searchParams.append('date_from', dateRange.from);
     }
     
     if (dateRange.to) {
-        url.searchParams.append('to_date', dateRange.to);
+        url.searchParams.append('date_to', dateRange.to);
     }
     
     if (searchTerm) {
@@ -58,17 +67,13 @@ const fetchOrders = useCallback(async () => {
     
     console.log('Received data:', data);
     
-    // Make sure we're extracting the orders array correctly
-    // Adjust this based on your API response structure
-    let receivedOrders = data.orders || data.data || data;
-    
-    if (!Array.isArray(receivedOrders)) {
-        console.error('Expected an array of orders but got:', receivedOrders);
+    if (!Array.isArray(data.data)) {
+        console.error('Expected an array of orders but got:', data);
         throw new Error('Invalid data format received from server');
     }
     
     // Ensure each order has an items array
-    receivedOrders = receivedOrders.map(order => {
+    const receivedOrders = data.data.map(order => {
         return {
         ...order,
         // Ensure items is an array, if it doesn't exist or isn't an array
@@ -93,15 +98,45 @@ const fetchOrders = useCallback(async () => {
         };
     });
     
-    // Update state with the fetched orders
-    setOrders(receivedOrders);
+    return { orders: receivedOrders, nextCursor: data.next_cursor, summary: data.summary };
+}, [API_BASE_URL, filterStatus, dateRange, searchTerm]);
+
+// Loads the first page along with the totals for the current filters
+const fetchOrders = useCallback(async () => {
+    setLoading(true);
+    setError(null);
+    
+    try {
+    const page = await fetchOrderPage(null);
+    setOrders(page.orders);
+    setSummary(page.summary);
+    setNextCursor(page.nextCursor);
     setLoading(false);
     } catch (err) {
     console.error('Error fetching orders:', err);
     setError(err.message || 'Failed to fetch orders. Please try again.');
     setLoading(false);
     }
-}, [API_BASE_URL, filterStatus, dateRange, searchTerm]);
+}, [fetchOrderPage]);
+
+// Appends the next page to the orders already shown
+const loadMoreOrders = useCallback(async () => {
+    if (!nextCursor || loadingMore) {
+        return;
+    }
+    setLoadingMore(true);
+    
+    try {
+    const page = await fetchOrderPage(nextCursor);
+    setOrders(current => [...current, ...page.orders]);
+    setNextCursor(page.nextCursor);
+    } catch (err) {
+    console.error('Error loading more orders:', err);
+    setError(err.message || 'Failed to load more orders. Please try again.');
+    } finally {
+    setLoadingMore(false);
+    }
+}, [fetchOrderPage, nextCursor, loadingMore]);
 
 // Fetch orders on component mount
 useEffect(() => {
@@ -143,6 +178,10 @@ const updateOrderStatus = async (orderNumber, newStatus) => {
 return (
     <OrderManagement 
     orders={orders}
+    summary={summary}
+    hasMore={Boolean(nextCursor)}
+    loadingMore={loadingMore}
+    loadMoreOrders={loadMoreOrders}
     loading={loading}
     error={error}
     fetchOrders={fetchOrders}
@@ -6,6 +6,10 @@ import 'react-toastify/dist/ReactToastify.css';
 
 const OrderManagement = ({
         orders = [],
+        summary = null,
+        hasMore = false,
+        loadingMore = false,
+        loadMoreOrders,
         loading = false,
         error = null,
         fetchOrders,
@@ -19,6 +23,8 @@ const OrderManagement = ({
     }) => {
         const [localOrders, setLocalOrders] = useState(orders); // Renamed from setOrders to localOrders/setLocalOrders
         const [isUpdating, setIsUpdating] = useState(null);
+        const [selectedOrders, setSelectedOrders] = useState([]);
+        const [bulkStatus, setBulkStatus] = useState('processing');
         const [expandedOrder, setExpandedOrder] = useState(null);
         const [isFilterOpen, setIsFilterOpen] = useState(false);
         const [searchField, setSearchField] = useState('all');
@@ -36,6 +42,8 @@ const OrderManagement = ({
         // Update localOrders when the orders prop changes
         useEffect(() => {
             setLocalOrders(orders);
+            // Drop selections of orders no longer listed
+            setSelectedOrders(prev => prev.filter(number => orders.some(o => o.order_number === number)));
         }, [orders]);
     
         // New effect to visually indicate when advanced filters are applied
@@ -232,6 +240,40 @@ const OrderManagement = ({
             }
         };
     
+        const toggleOrderSelected = (orderNumber) => {
+            setSelectedOrders(prev =>
+                prev.includes(orderNumber) ? prev.filter(number => number !== orderNumber) : [...prev, orderNumber]
+            );
+        };
+
+        const toggleAllOrdersSelected = () => {
+            setSelectedOrders(prev => prev.length === orders.length ? [] : orders.map(o => o.order_number));
+        };
+
+        // Move every selected order to one status with a single request
+        const updateSelectedOrders = async () => {
+            if (selectedOrders.length === 0) return;
+            try {
+                setIsUpdating('bulk');
+                const response = await axios.patch('/orders/status', {
+                    order_numbers: selectedOrders,
+                    status: bulkStatus
+                });
+                const { updated, unchanged, not_found } = response.data;
+                toast.success(`${updated} orders updated${unchanged ? `, ${unchanged} already ${bulkStatus}` : ''}`);
+                if (not_found) {
+                    toast.warn(`${not_found} orders were not found`);
+                }
+                setSelectedOrders([]);
+                await fetchOrders();
+            } catch (error) {
+                console.error('Error updating order statuses:', error);
+                toast.error(error.response?.data?.message || "Failed to update order statuses");
+            } finally {
+                setIsUpdating(null);
+            }
+        };
+
         // The function to update order item status with optimistic updates
         const updateOrderItem = async (orderNumber, itemId, newStatus) => {
             try {
@@ -557,7 +599,7 @@ const OrderManagement = ({
                     </div>
                     <div className="ml-4">
                     <h3 className="text-sm font-medium text-gray-500">Total Orders</h3>
-                    <p className="text-lg font-semibold text-gray-900">{orders.length}</p>
+                    <p className="text-lg font-semibold text-gray-900">{summary ? summary.count : orders.length}</p>
                     </div>
                 </div>
                 </div>
@@ -569,7 +611,7 @@ const OrderManagement = ({
                     <div className="ml-4">
                     <h3 className="text-sm font-medium text-gray-500">Pending</h3>
                     <p className="text-lg font-semibold text-gray-900">
-                        {orders.filter(o => o.order_status === 'pending').length}
+                        {summary ? (summary.status_counts.pending || 0) : orders.filter(o => o.order_status === 'pending').length}
                     </p>
                     </div>
                 </div>
@@ -582,7 +624,7 @@ const OrderManagement = ({
                     <div className="ml-4">
                     <h3 className="text-sm font-medium text-gray-500">Shipping</h3>
                     <p className="text-lg font-semibold text-gray-900">
-                        {orders.filter(o => o.order_status === 'shipped').length}
+                        {summary ? (summary.status_counts.shipped || 0) : orders.filter(o => o.order_status === 'shipped').length}
                     </p>
                     </div>
                 </div>
@@ -595,13 +637,45 @@ const OrderManagement = ({
                     <div className="ml-4">
                     <h3 className="text-sm font-medium text-gray-500">Revenue</h3>
                     <p className="text-lg font-semibold text-gray-900">
-                        {formatCurrency(orders.reduce((sum, order) => sum + parseFloat(order.total_amount), 0))}
+                        {formatCurrency(summary ? summary.revenue : orders.reduce((sum, order) => sum + parseFloat(order.total_amount), 0))}
                     </p>
                     </div>
                 </div>
                 </div>
             </div>
 
+            {/* Bulk Actions */}
+            {selectedOrders.length > 0 && (
+                <div className="bg-blue-50 border-b border-blue-200 px-4 py-3 sm:px-6 flex items-center gap-3">
+                <span className="text-sm font-medium text-blue-900">{selectedOrders.length} selected</span>
+                <select
+                    value={bulkStatus}
+                    onChange={(e) => setBulkStatus(e.target.value)}
+                    className="block text-sm border-gray-300 rounded-md shadow-sm focus:border-blue-500 focus:ring-blue-500"
+                    disabled={isUpdating === 'bulk'}
+                >
+                    <option value="pending">Pending</option>
+                    <option value="processing">Processing</option>
+                    <option value="shipped">Shipped</option>
+                    <option value="delivered">Delivered</option>
+                    <option value="cancelled">Cancelled</option>
+                </select>
+                <button
+                    onClick={updateSelectedOrders}
+                    disabled={isUpdating === 'bulk'}
+                    className="px-4 py-2 border border-transparent text-sm font-medium rounded-md shadow-sm text-white bg-blue-600 hover:bg-blue-700 disabled:opacity-50"
+                >
+                    {isUpdating === 'bulk' ? 'Updating...' : 'Update Status'}
+                </button>
+                <button
+                    onClick={() => setSelectedOrders([])}
+                    className="text-sm text-gray-600 hover:text-gray-900"
+                >
+                    Clear
+                </button>
+                </div>
+            )}
+
             {/* Orders Table */}
             <div className="overflow-x-auto">
                 {loading ? (
@@ -629,6 +703,14 @@ const OrderManagement = ({
                 <table className="min-w-full divide-y divide-gray-200">
                     <thead className="bg-gray-50">
                     <tr>
+                        <th scope="col" className="pl-6 py-3 text-left">
+                        <input
+                            type="checkbox"
+                            checked={orders.length > 0 && selectedOrders.length === orders.length}
+                            onChange={toggleAllOrdersSelected}
+                            aria-label="Select all orders"
+                        />
+                        </th>
                         <th scope="col" className="px-6 py-3 text-left text-xs font-medium text-gray-500 uppercase tracking-wider">
                         Order
                         </th>
@@ -656,6 +738,14 @@ const OrderManagement = ({
                     {orders.map((order) => (
                         <React.Fragment key={order.order_number}>
                         <tr className="hover:bg-gray-50">
+                            <td className="pl-6 py-4 whitespace-nowrap">
+                            <input
+                                type="checkbox"
+                                checked={selectedOrders.includes(order.order_number)}
+                                onChange={() => toggleOrderSelected(order.order_number)}
+                                aria-label={`Select order ${order.order_number}`}
+                            />
+                            </td>
                             <td className="px-6 py-4 whitespace-nowrap">
                             <div className="flex items-center">
                                 <FileText className="flex-shrink-0 h-5 w-5 text-gray-400" />
@@ -715,7 +805,7 @@ const OrderManagement = ({
                         </tr>
                         {expandedOrder === order.order_number && (
                             <tr>
-                            <td colSpan="7" className="px-6 py-4 bg-gray-50">
+                            <td colSpan="8" className="px-6 py-4 bg-gray-50">
                                 <div className="border rounded-lg overflow-hidden bg-white">
                                 {/* Order Details */}
                                 <div className="px-4 py-3 bg-gray-100 border-b">
@@ -940,37 +1030,19 @@ const OrderManagement = ({
             {/* Pagination */}
             {!loading && orders.length > 0 && (
                 <div className="bg-white px-4 py-3 flex items-center justify-between border-t border-gray-200 sm:px-6">
-                <div className="flex-1 flex justify-between sm:hidden">
-                    <button className="relative inline-flex items-center px-4 py-2 border border-gray-300 text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50">
-                    Previous
-                    </button>
-                    <button className="ml-3 relative inline-flex items-center px-4 py-2 border border-gray-300 text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50">
-                    Next
+                <p className="text-sm text-gray-700">
+                    Showing <span className="font-medium">1</span> to <span className="font-medium">{orders.length}</span> of{' '}
+                    <span className="font-medium">{summary ? summary.count : orders.length}</span> results
+                </p>
+                {hasMore && (
+                    <button
+                    onClick={loadMoreOrders}
+                    disabled={loadingMore}
+                    className="relative inline-flex items-center px-4 py-2 border border-gray-300 text-sm font-medium rounded-md text-gray-700 bg-white hover:bg-gray-50 disabled:opacity-50"
+                    >
+                    {loadingMore ? 'Loading...' : 'Load more'}
                     </button>
-                </div>
-                <div className="hidden sm:flex-1 sm:flex sm:items-center sm:justify-between">
-                    <div>
-                    <p className="text-sm text-gray-700">
-                        Showing <span className="font-medium">1</span> to <span className="font-medium">{orders.length}</span> of{' '}
-                        <span className="font-medium">{orders.length}</span> results
-                    </p>
-                    </div>
-                    <div>
-                    <nav className="relative z-0 inline-flex rounded-md shadow-sm -space-x-px" aria-label="Pagination">
-                        <button className="relative inline-flex items-center px-2 py-2 rounded-l-md border border-gray-300 bg-white text-sm font-medium text-gray-500 hover:bg-gray-50">
-                        <span className="sr-only">Previous</span>
-                        <ChevronUp className="h-5 w-5 rotate-90" />
-                        </button>
-                        <button className="relative inline-flex items-center px-4 py-2 border border-gray-300 bg-white text-sm font-medium text-gray-700 hover:bg-gray-50">
-                        1
-                        </button>
-                        <button className="relative inline-flex items-center px-2 py-2 rounded-r-md border border-gray-300 bg-white text-sm font-medium text-gray-500 hover:bg-gray-50">
-                        <span className="sr-only">Next</span>
-                        <ChevronDown className="h-5 w-5 rotate-90" />
-                        </button>
-                    </nav>
-                    </div>
-                </div>
+                )}
                 </div>
             )}
             </div>
@@ -127,9 +127,9 @@ function ShowCourseComponent({ filterCourseFunction, addCourseToCartFunction })
                     {product.images && product.images.length > 0 ? (
                         <img
                             src={
-                                product.images[0].startsWith('http')
-                                    ? product.images[0]
-                                    : `https://shopping-cart-5wj4.onrender.com${product.images[0].startsWith('/') ? '' : '/'}${product.images[0]}`
+                                (product.thumbnail || product.images[0]).startsWith('http')
+                                    ? (product.thumbnail || product.images[0])
+                                    : `https://shopping-cart-5wj4.onrender.com${(product.thumbnail || product.images[0]).startsWith('/') ? '' : '/'}${product.thumbnail || product.images[0]}`
                             }
                             alt={product.name}
                             className="product-image"
@@ -1,5 +1,6 @@
-from flask import Flask, jsonify, request, send_from_directory 
-from flask_mysqldb import MySQL
+from flask import Flask, Request, jsonify, request, send_file, g
+import MySQLdb
+import MySQLdb.cursors
 from flask_cors import CORS
 import os
 from dotenv import load_dotenv
@@ -11,12 +12,32 @@ import logging
 import string
 from decimal import Decimal
 import json
+import base64
 import re
 import secrets
+import math
+import bisect
+import threading
+import time
+from collections import OrderedDict, deque
+import hashlib
+import io
+import csv
+import gzip
+import shutil
+import tempfile
+import mimetypes
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import multiprocessing
+import numpy as np
 import cloudinary
 import cloudinary.uploader
+import cloudinary.api
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
+from werkzeug.utils import secure_filename, safe_join
+from werkzeug.http import is_resource_modified
+from PIL import Image, ImageOps, UnidentifiedImageError
+from spec_validation import specification_errors
 
 app = Flask(__name__)
 CORS(app)
@@ -33,11 +54,364 @@ app.config['MYSQL_CURSORCLASS'] = 'DictCursor'
 app.config['UPLOAD_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static/uploads')
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max upload size
 
+# Configure the in-process catalog response cache
+app.config['CATALOG_CACHE_MAX_ENTRIES'] = int(os.getenv('CATALOG_CACHE_MAX_ENTRIES', 512))
+# Each gunicorn worker has its own cache, so entries also expire after a TTL
+# to bound staleness caused by writes handled by another worker
+app.config['CATALOG_CACHE_TTL'] = float(os.getenv('CATALOG_CACHE_TTL', 60))
+# max-age sent in Cache-Control for read endpoints that carry an ETag
+app.config['CATALOG_HTTP_MAX_AGE'] = int(os.getenv('CATALOG_HTTP_MAX_AGE', 0))
+
 # Ensure upload directory exists
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+# Configure the MySQL connection pool
+app.config['MYSQL_POOL_MIN_SIZE'] = int(os.getenv('MYSQL_POOL_MIN_SIZE', 2))
+app.config['MYSQL_POOL_MAX_SIZE'] = int(os.getenv('MYSQL_POOL_MAX_SIZE', 10))
+# Connections older than this many seconds are closed and replaced
+app.config['MYSQL_POOL_RECYCLE'] = int(os.getenv('MYSQL_POOL_RECYCLE', 1800))
+# Seconds a request waits for a free connection before giving up
+app.config['MYSQL_POOL_WAIT_TIMEOUT'] = float(os.getenv('MYSQL_POOL_WAIT_TIMEOUT', 5))
+# Idle connections are pinged before reuse when idle for longer than this
+app.config['MYSQL_POOL_PING_INTERVAL'] = int(os.getenv('MYSQL_POOL_PING_INTERVAL', 30))
+
+class PoolTimeoutError(Exception):
+    """Raised when no database connection becomes free within the wait timeout"""
+
+class PooledConnection:
+    """
+    A pooled MySQLdb connection handed out for the duration of one app
+    context. Cursors opened through it are tracked so that any left open by
+    a handler are closed before the connection goes back to the pool.
+    """
+
+    def __init__(self, raw, created_at):
+        self.raw = raw
+        self.created_at = created_at
+        self.last_used = time.monotonic()
+        self._cursors = []
+
+    def cursor(self):
+        cursor = self.raw.cursor()
+        self._cursors.append(cursor)
+        return cursor
+
+    def commit(self):
+        self.raw.commit()
+
+    def rollback(self):
+        self.raw.rollback()
+
+    def close_cursors(self):
+        for cursor in self._cursors:
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._cursors = []
+
+class ConnectionPool:
+    """Thread-safe, size-bounded pool of MySQLdb connections"""
+
+    def __init__(self, connect, min_size, max_size, recycle, wait_timeout, ping_interval,
+                 connection_class=PooledConnection):
+        self._connect = connect
+        self._connection_class = connection_class
+        self.min_size = min_size
+        self.max_size = max_size
+        self.recycle = recycle
+        self.wait_timeout = wait_timeout
+        self.ping_interval = ping_interval
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._warmed = False
+        self._cond = threading.Condition()
+        # Metrics
+        self.acquired = 0
+        self.created = 0
+        self.recycled = 0
+        self.failed_health_checks = 0
+        self.waits = 0
+        self.timeouts = 0
+        self.total_wait_time = 0.0
+        self.max_wait_time = 0.0
+
+    def _open(self):
+        conn = self._connection_class(self._connect(), time.monotonic())
+        with self._cond:
+            self.created += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def warm(self):
+        """Open connections up to min_size so early requests skip the handshake"""
+        while True:
+            # Claim one slot per connection being opened so a failed connect
+            # gives back exactly what it took
+            with self._cond:
+                if self._size >= self.min_size:
+                    self._warmed = True
+                    return
+                self._size += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append(conn)
+                self._cond.notify()
+
+    def acquire(self):
+        if not self._warmed:
+            self.warm()
+        started = time.monotonic()
+        deadline = started + self.wait_timeout
+        conn = None
+        waited = False
+        with self._cond:
+            while True:
+                if self._idle:
+                    # LIFO keeps recently used connections hot and lets spare ones age out
+                    conn = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise PoolTimeoutError(
+                        f'No database connection available after {self.wait_timeout}s '
+                        f'({self.max_size} in use)'
+                    )
+                if not waited:
+                    waited = True
+                    self.waits += 1
+                self._cond.wait(remaining)
+            self._in_use += 1
+            self.acquired += 1
+            wait_time = time.monotonic() - started
+            self.total_wait_time += wait_time
+            self.max_wait_time = max(self.max_wait_time, wait_time)
+
+        try:
+            now = time.monotonic()
+            if conn is not None and now - conn.created_at > self.recycle:
+                self._close_raw(conn)
+                with self._cond:
+                    self.recycled += 1
+                conn = None
+            elif conn is not None and now - conn.last_used > self.ping_interval:
+                try:
+                    conn.raw.ping()
+                except Exception:
+                    self._close_raw(conn)
+                    with self._cond:
+                        self.failed_health_checks += 1
+                    conn = None
+            if conn is None:
+                conn = self._open()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+                self._size -= 1
+                self._cond.notify()
+            raise
+        return conn
+
+    def _close_raw(self, conn):
+        try:
+            conn.raw.close()
+        except Exception:
+            pass
+
+    def release(self, conn):
+        """Return a connection, ending any open transaction first"""
+        conn.close_cursors()
+        try:
+            conn.rollback()
+        except Exception:
+            with self._cond:
+                self._in_use -= 1
+            self._discard(conn)
+            return
+        conn.last_used = time.monotonic()
+        with self._cond:
+            self._in_use -= 1
+            self._idle.append(conn)
+            self._cond.notify()
+
+    def discard(self, conn):
+        """Close a checked-out connection instead of returning it to the pool"""
+        with self._cond:
+            self._in_use -= 1
+        self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+                'saturation': (self._in_use / self.max_size) if self.max_size else 0.0,
+                'acquired': self.acquired,
+                'created': self.created,
+                'recycled': self.recycled,
+                'failed_health_checks': self.failed_health_checks,
+                'waits': self.waits,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': (self.total_wait_time / self.acquired * 1000) if self.acquired else 0.0,
+                'max_wait_ms': self.max_wait_time * 1000,
+            }
+
+def connect_mysql():
+    return MySQLdb.connect(
+        host=app.config['MYSQL_HOST'],
+        user=app.config['MYSQL_USER'],
+        passwd=app.config['MYSQL_PASSWORD'],
+        db=app.config['MYSQL_DB'],
+        cursorclass=MySQLdb.cursors.DictCursor,
+        charset='utf8mb4'
+    )
+
 # Initialize MySQL
-mysql = MySQL(app)
+db_pool = ConnectionPool(
+    connect_mysql,
+    min_size=app.config['MYSQL_POOL_MIN_SIZE'],
+    max_size=app.config['MYSQL_POOL_MAX_SIZE'],
+    recycle=app.config['MYSQL_POOL_RECYCLE'],
+    wait_timeout=app.config['MYSQL_POOL_WAIT_TIMEOUT'],
+    ping_interval=app.config['MYSQL_POOL_PING_INTERVAL']
+)
+
+def get_db():
+    """Pooled connection bound to the current app context"""
+    if 'db_conn' not in g:
+        g.db_conn = db_pool.acquire()
+    return g.db_conn
+
+def get_cursor():
+    """Open a cursor on the current app context's pooled connection"""
+    return get_db().cursor()
+
+@app.teardown_appcontext
+def release_db_connection(exception):
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        db_pool.release(conn)
+
+# Route handlers re-raise PoolTimeoutError ahead of their catch-all
+# `except Exception` so that saturation is reported as 503 rather than 500
+@app.errorhandler(PoolTimeoutError)
+def handle_pool_timeout(error):
+    app.logger.warning(f"Database pool saturated: {str(error)}")
+    return jsonify({'message': 'Database is busy, please retry', 'error': str(error)}), 503
+
+@app.route('/db/pool-stats', methods=['GET'])
+def get_db_pool_stats():
+    return jsonify(db_pool.stats()), 200
+
+class CatalogCache:
+    """
+    Size-bounded LRU cache of serialized catalog responses.
+
+    Every entry is stored with the version of each tag it depends on
+    (e.g. 'products', 'product:12', 'category-listing:3'). Invalidating a tag bumps
+    its version, which makes exactly the entries depending on it stale
+    without touching the rest of the cache.
+    """
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._tag_versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                body, tag_versions, expires_at = entry
+                fresh = expires_at > time.monotonic() and all(
+                    self._tag_versions.get(tag, 0) == version for tag, version in tag_versions.items()
+                )
+                if fresh:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return body
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, body, tags):
+        with self._lock:
+            tag_versions = {tag: self._tag_versions.get(tag, 0) for tag in tags}
+            self._entries[key] = (body, tag_versions, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                self._tag_versions[tag] = self._tag_versions.get(tag, 0) + 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': (self.hits / lookups) if lookups else 0.0,
+            }
+
+catalog_cache = CatalogCache(app.config['CATALOG_CACHE_MAX_ENTRIES'], app.config['CATALOG_CACHE_TTL'])
+
+def catalog_cache_key(endpoint, *parts):
+    """Cache key for a catalog endpoint, independent of query argument order"""
+    return (endpoint, parts, tuple(sorted(request.args.items(multi=True))))
+
+def json_etag(body):
+    """Strong ETag for a serialized JSON body"""
+    return hashlib.sha256(body).hexdigest()[:32]
+
+def conditional_json_response(body, etag=None, public=True):
+    """
+    Wrap a serialized JSON body in a response carrying a strong ETag and
+    Cache-Control headers, answering 304 Not Modified when the client's
+    If-None-Match already matches.
+    """
+    response = app.response_class(body, status=200, mimetype='application/json')
+    response.set_etag(etag or json_etag(body))
+    # Clients and shared caches may store the body but must revalidate it,
+    # which costs a 304 once the ETag matches
+    response.cache_control.public = public
+    response.cache_control.private = not public
+    response.cache_control.no_cache = True
+    response.cache_control.max_age = app.config['CATALOG_HTTP_MAX_AGE']
+    return response.make_conditional(request)
 
 # Helper function to check if file extension is allowed
 def allowed_file(filename):
@@ -49,13 +423,687 @@ cloudinary.config(
     api_key=os.getenv('CLOUDINARY_API_KEY'),
     api_secret=os.getenv('CLOUDINARY_API_SECRET')
 )
+
+# Configure streamed multipart uploads
+# File parts are validated while the body is parsed, so a disallowed or
+# oversized file is rejected without reading the rest of the request.
+# MAX_CONTENT_LENGTH remains the per-request quota.
+app.config['UPLOAD_MAX_FILE_SIZE'] = int(os.getenv('UPLOAD_MAX_FILE_SIZE', 8 * 1024 * 1024))
+app.config['UPLOAD_MAX_FILES'] = int(os.getenv('UPLOAD_MAX_FILES', 10))
+# Bytes of each file kept in memory before it spills to a temporary file
+app.config['UPLOAD_SPOOL_MAX_MEMORY'] = int(os.getenv('UPLOAD_SPOOL_MAX_MEMORY', 256 * 1024))
+# Limit on the non-file form fields held in memory
+app.config['MAX_FORM_MEMORY_SIZE'] = 512 * 1024
+
+# Leading bytes of each allowed image type
+IMAGE_SIGNATURES = {
+    'png': (b'\x89PNG\r\n\x1a\n',),
+    'jpg': (b'\xff\xd8\xff',),
+    'jpeg': (b'\xff\xd8\xff',),
+    'gif': (b'GIF87a', b'GIF89a'),
+}
+IMAGE_SIGNATURE_LENGTH = 12
+
+class UploadRejected(Exception):
+    """Raised while a multipart body is parsed when a file part breaks the upload rules"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+def image_signature_matches(extension, head):
+    if extension == 'webp':
+        return head[:4] == b'RIFF' and head[8:12] == b'WEBP'
+    return any(head.startswith(signature) for signature in IMAGE_SIGNATURES.get(extension, ()))
+
+class ValidatingUploadFile:
+    """
+    Spooled temporary file that receives one file part. The magic bytes are
+    checked against the extension as soon as the first chunk arrives and the
+    per-file quota is enforced on every write.
+    """
+
+    def __init__(self, filename, extension):
+        self.filename = filename
+        self.extension = extension
+        self.file = tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_MAX_MEMORY'])
+        self.head = b''
+        self.validated = False
+        self.size = 0
+
+    def validate(self):
+        if not image_signature_matches(self.extension, self.head):
+            raise UploadRejected(f'{self.filename} is not a valid {self.extension} image', 415)
+        self.validated = True
+
+    def write(self, data):
+        if not self.validated:
+            self.head += data[:IMAGE_SIGNATURE_LENGTH - len(self.head)]
+            if len(self.head) >= IMAGE_SIGNATURE_LENGTH:
+                self.validate()
+        self.size += len(data)
+        if self.size > app.config['UPLOAD_MAX_FILE_SIZE']:
+            raise UploadRejected(f"{self.filename} exceeds the {app.config['UPLOAD_MAX_FILE_SIZE']} byte file limit", 413)
+        return self.file.write(data)
+
+    def seek(self, *args):
+        # The parser rewinds each part once it is complete, which is the
+        # last chance to check files shorter than the signature
+        if not self.validated:
+            self.validate()
+        return self.file.seek(*args)
+
+    def detach(self):
+        """Hand the underlying file to a background job; closing the request no longer closes it"""
+        file, self.file = self.file, None
+        return file
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+
+    def __getattr__(self, name):
+        return getattr(self.file, name)
+
+# Endpoints whose file parts are data files rather than images
+DATA_FILE_ENDPOINTS = {'import_products'}
+
+class UploadRequest(Request):
+    """Request whose multipart file parts go through ValidatingUploadFile"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Browsers send an empty part for a file input left blank
+        if not filename:
+            return tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_MAX_MEMORY'])
+        # Data files sent to bulk endpoints are not images and are only spooled
+        if self.endpoint in DATA_FILE_ENDPOINTS:
+            return tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_MAX_MEMORY'])
+        self.upload_file_count = getattr(self, 'upload_file_count', 0) + 1
+        if self.upload_file_count > app.config['UPLOAD_MAX_FILES']:
+            raise UploadRejected(f"At most {app.config['UPLOAD_MAX_FILES']} files may be uploaded at once", 413)
+        if not allowed_file(filename):
+            raise UploadRejected(f'File type not allowed: {filename}', 415)
+        return ValidatingUploadFile(filename, filename.rsplit('.', 1)[1].lower())
+
+app.request_class = UploadRequest
+
+@app.before_request
+def parse_multipart_uploads():
+    # Parse uploads before the view runs so rejections surface through the
+    # UploadRejected handler rather than a view's generic error handling
+    if request.endpoint in DATA_FILE_ENDPOINTS:
+        request.max_content_length = app.config['IMPORT_MAX_CONTENT_LENGTH']
+    if request.mimetype == 'multipart/form-data':
+        request.files
+
+@app.errorhandler(UploadRejected)
+def handle_upload_rejected(e):
+    return jsonify({'message': e.message}), e.status
+
+@app.errorhandler(413)
+def handle_request_too_large(e):
+    return jsonify({'message': f"Request exceeds the {request.max_content_length} byte upload limit"}), 413
+
+def detach_upload_stream(image_file):
+    """A file object holding the upload that stays open after the request ends"""
+    if isinstance(image_file.stream, ValidatingUploadFile):
+        stream = image_file.stream.detach()
+    else:
+        stream = tempfile.SpooledTemporaryFile(max_size=app.config['UPLOAD_SPOOL_MAX_MEMORY'])
+        shutil.copyfileobj(image_file.stream, stream)
+    stream.seek(0)
+    return stream
+
+# Configure background image uploads
+# Uploads to Cloudinary run on a bounded thread pool so a request carrying
+# several large images returns as soon as the product row is written
+app.config['IMAGE_UPLOAD_WORKERS'] = int(os.getenv('IMAGE_UPLOAD_WORKERS', 4))
+# Finished upload jobs are kept this many seconds for the status endpoint
+app.config['IMAGE_UPLOAD_JOB_TTL'] = int(os.getenv('IMAGE_UPLOAD_JOB_TTL', 3600))
+
+image_upload_executor = ThreadPoolExecutor(
+    max_workers=app.config['IMAGE_UPLOAD_WORKERS'],
+    thread_name_prefix='image-upload'
+)
+image_upload_jobs = {}
+image_upload_jobs_lock = threading.Lock()
+
+def upload_product_image(stream, filename):
+    """Upload one image to Cloudinary and return its URL (swap out in tests to avoid the network)"""
+    try:
+        upload_result = cloudinary.uploader.upload(stream, folder="products/")
+        return upload_result['secure_url']
+    finally:
+        stream.close()
+
+def read_image_files(files):
+    """Take over the spooled files of the allowed uploads, since the request closes its own once it returns"""
+    return [
+        (secure_filename(image_file.filename), detach_upload_stream(image_file))
+        for image_file in files
+        if image_file and allowed_file(image_file.filename)
+    ]
+
+def prune_image_upload_jobs():
+    cutoff = time.time() - app.config['IMAGE_UPLOAD_JOB_TTL']
+    with image_upload_jobs_lock:
+        for product_id, job in list(image_upload_jobs.items()):
+            if job['finished_at'] is not None and job['finished_at'] < cutoff:
+                del image_upload_jobs[product_id]
+
+def start_image_uploads(product_id, images, replace):
+    """
+    Upload images concurrently and attach them to the product when all have finished.
+    The first image becomes the primary one when the product has no images yet or
+    when `replace` is set, in which case the previous images are dropped.
+    """
+    prune_image_upload_jobs()
+    job = {
+        'status': 'pending',
+        'total': len(images),
+        'completed': 0,
+        'images': [None] * len(images),
+        'errors': [],
+        'replace': replace,
+        'started_at': time.time(),
+        'finished_at': None
+    }
+    with image_upload_jobs_lock:
+        image_upload_jobs[product_id] = job
+
+    def on_done(index, filename, future):
+        url = error = None
+        try:
+            url = future.result()
+        except Exception as e:
+            app.logger.error(f"Error uploading image {filename} for product {product_id}: {str(e)}")
+            error = {'filename': filename, 'error': str(e)}
+        # image_upload_status reads the job from request threads
+        with image_upload_jobs_lock:
+            job['images'][index] = url
+            if error:
+                job['errors'].append(error)
+            job['completed'] += 1
+            finished = job['completed'] == job['total']
+        if finished:
+            finish_image_uploads(product_id, job)
+
+    for index, (filename, stream) in enumerate(images):
+        future = image_upload_executor.submit(upload_product_image, stream, filename)
+        future.add_done_callback(lambda future, index=index, filename=filename: on_done(index, filename, future))
+    return job
+
+def finish_image_uploads(product_id, job):
+    """Write the uploaded image URLs of a finished job in one transaction"""
+    with image_upload_jobs_lock:
+        image_urls = [url for url in job['images'] if url]
+    failure = None
+    try:
+        with app.app_context():
+            if image_urls:
+                cursor = get_cursor()
+                cursor.execute('SELECT id FROM products WHERE id = %s FOR UPDATE', (product_id,))
+                if cursor.fetchone():
+                    if job['replace']:
+                        cursor.execute('SELECT image_url FROM product_images WHERE product_id = %s', (product_id,))
+                        old_urls = [row['image_url'] for row in cursor.fetchall()]
+                        cursor.execute('DELETE FROM product_images WHERE product_id = %s', (product_id,))
+                        enqueue_asset_deletions(cursor, old_urls)
+                        has_primary = False
+                    else:
+                        cursor.execute(
+                            'SELECT COUNT(*) AS count FROM product_images WHERE product_id = %s AND is_primary = TRUE',
+                            (product_id,)
+                        )
+                        has_primary = cursor.fetchone()['count'] > 0
+                    cursor.executemany(
+                        'INSERT INTO product_images (product_id, image_url, is_primary) VALUES (%s, %s, %s)',
+                        [(product_id, url, idx == 0 and not has_primary) for idx, url in enumerate(image_urls)]
+                    )
+                    if not has_primary:
+                        cursor.execute('UPDATE products SET image = %s WHERE id = %s', (image_urls[0], product_id))
+                get_db().commit()
+                cursor.close()
+                if job['replace']:
+                    asset_deletion_wakeup.set()
+                catalog_cache.invalidate(f'product:{product_id}')
+                reindex_products([product_id])
+    except Exception as e:
+        app.logger.error(f"Error saving uploaded images for product {product_id}: {str(e)}")
+        failure = {'error': str(e)}
+    finally:
+        with image_upload_jobs_lock:
+            if failure:
+                job['errors'].append(failure)
+                job['status'] = 'failed'
+            else:
+                job['status'] = 'failed' if job['errors'] and not image_urls else ('partial' if job['errors'] else 'completed')
+            job['finished_at'] = time.time()
+
+def image_upload_status(product_id):
+    with image_upload_jobs_lock:
+        job = image_upload_jobs.get(product_id)
+        if job is None:
+            return None
+        return {
+            'status': job['status'],
+            'total': job['total'],
+            'completed': job['completed'],
+            'images': [url for url in job['images'] if url],
+            'errors': list(job['errors'])
+        }
+
+# Uploads are stored under the SHA-256 of their bytes as <hash>.<ext>, in
+# UPLOAD_FOLDER/<hash[0:2]>/<hash[2:4]>/. Files saved before this scheme keep
+# their original names at the top of UPLOAD_FOLDER.
+CONTENT_HASH_FILENAME_RE = re.compile(r'^([0-9a-f]{64})\.([a-z0-9]+)$')
+UPLOAD_URL_HASH_RE = re.compile(r'/static/uploads/([0-9a-f]{64})\.[a-z0-9]+$')
+# Content-addressed responses never change, so caches may keep them for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+# Rows hold the references to an upload (upload_blobs.ref_count counts them).
+# A stored file nothing references yet is kept this many seconds after its
+# last upload so the client can save the row that uses it.
+app.config['UPLOAD_CLAIM_GRACE'] = int(os.getenv('UPLOAD_CLAIM_GRACE', 24 * 3600))
+
+def upload_path(filename):
+    """Disk path of an uploaded file, or None when the name escapes UPLOAD_FOLDER"""
+    match = CONTENT_HASH_FILENAME_RE.match(filename)
+    if match:
+        content_hash = match.group(1)
+        return os.path.join(app.config['UPLOAD_FOLDER'], content_hash[:2], content_hash[2:4], filename)
+    return safe_join(app.config['UPLOAD_FOLDER'], filename)
+
+def store_upload(file):
+    """
+    Save an uploaded file under its content hash. No reference is taken: the
+    row that ends up using the URL does that with retain_upload_refs.
+    Returns (filename, created); created is False when identical bytes were
+    already stored.
+    """
+    incoming = os.path.join(app.config['UPLOAD_FOLDER'], '.incoming')
+    os.makedirs(incoming, exist_ok=True)
+    temp_path = os.path.join(incoming, uuid.uuid4().hex)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(temp_path, 'wb') as out:
+            for chunk in iter(lambda: file.stream.read(1 << 16), b''):
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+        content_hash = digest.hexdigest()
+        extension = file.filename.rsplit('.', 1)[1].lower()
+
+        cursor = get_cursor()
+        # The row lock taken here serializes this with collect_unreferenced_uploads
+        # removing the same file; uploading again restarts the claim grace period
+        cursor.execute('''
+            INSERT INTO upload_blobs (content_hash, extension, size, ref_count)
+            VALUES (%s, %s, %s, 0)
+            ON DUPLICATE KEY UPDATE stored_at = CURRENT_TIMESTAMP
+        ''', (content_hash, extension, size))
+        # The same bytes uploaded as .jpeg and .jpg share the first extension seen
+        cursor.execute('SELECT extension FROM upload_blobs WHERE content_hash = %s', (content_hash,))
+        filename = f"{content_hash}.{cursor.fetchone()['extension']}"
+        path = upload_path(filename)
+        created = not os.path.exists(path)
+        if created:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(temp_path, path)
+        get_db().commit()
+        cursor.close()
+        return filename, created
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def upload_ref_counts(urls):
+    """content hash -> number of the URLs pointing at that content-addressed upload"""
+    counts = {}
+    for url in urls:
+        match = UPLOAD_URL_HASH_RE.search(url or '')
+        if match:
+            counts[match.group(1)] = counts.get(match.group(1), 0) + 1
+    return counts
+
+def retain_upload_refs(cursor, urls):
+    """Take one reference per URL for the row that now uses it; commits with the caller's transaction"""
+    counts = upload_ref_counts(urls)
+    if counts:
+        cursor.executemany(
+            'UPDATE upload_blobs SET ref_count = ref_count + %s WHERE content_hash = %s',
+            [(count, content_hash) for content_hash, count in counts.items()]
+        )
+
+def release_upload_refs(cursor, urls):
+    """Drop one reference per URL a row stopped using; commits with the caller's transaction"""
+    counts = upload_ref_counts(urls)
+    if counts:
+        cursor.executemany(
+            'UPDATE upload_blobs SET ref_count = GREATEST(ref_count - %s, 0) WHERE content_hash = %s',
+            [(count, content_hash) for content_hash, count in counts.items()]
+        )
+    return list(counts)
+
+def upload_file_paths(content_hash, extension):
+    """The stored original and every cached derivative of an upload"""
+    paths = [upload_path(f'{content_hash}.{extension}')]
+    shard = os.path.join(app.config['DERIVATIVE_FOLDER'], content_hash[:2])
+    if os.path.isdir(shard):
+        paths += [os.path.join(shard, name) for name in os.listdir(shard) if name.startswith(content_hash)]
+    return paths
+
+def collect_unreferenced_uploads(content_hashes=None):
+    """Delete the files and derivatives of uploads nothing references any more"""
+    cursor = get_cursor()
+    query = '''
+        SELECT content_hash, extension FROM upload_blobs
+        WHERE ref_count = 0 AND stored_at < NOW() - INTERVAL %s SECOND
+    '''
+    params = (app.config['UPLOAD_CLAIM_GRACE'],)
+    if content_hashes is not None:
+        if not content_hashes:
+            return 0
+        query += f" AND content_hash IN ({','.join(['%s'] * len(content_hashes))})"
+        params += tuple(content_hashes)
+    cursor.execute(query + ' FOR UPDATE SKIP LOCKED', params)
+    rows = cursor.fetchall()
+    if not rows:
+        get_db().commit()
+        cursor.close()
+        return 0
+    # Drop the rows first: if this transaction fails, every file a row
+    # points at is still on disk
+    format_strings = ','.join(['%s'] * len(rows))
+    hashes = tuple(row['content_hash'] for row in rows)
+    cursor.execute(f'DELETE FROM upload_blobs WHERE content_hash IN ({format_strings})', hashes)
+    get_db().commit()
+    # The same bytes may have been uploaded again since the commit. Locking
+    # the keys (a gap lock where no row exists) holds such an upload back
+    # while the files go, and a hash that reappeared keeps its file.
+    cursor.execute(f'SELECT content_hash FROM upload_blobs WHERE content_hash IN ({format_strings}) FOR UPDATE', hashes)
+    stored_again = {row['content_hash'] for row in cursor.fetchall()}
+    for row in rows:
+        if row['content_hash'] in stored_again:
+            continue
+        for path in upload_file_paths(row['content_hash'], row['extension']):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+    get_db().commit()
+    cursor.close()
+    return len(rows)
+
+def release_uploads(cursor, urls):
+    """Release references in the caller's open transaction, then commit and remove orphaned files past their grace period"""
+    released = release_upload_refs(cursor, urls)
+    get_db().commit()
+    if released:
+        try:
+            collect_unreferenced_uploads(released)
+        except Exception as e:
+            app.logger.error(f"Error removing unreferenced uploads: {str(e)}")
+
+@app.cli.command('gc-uploads')
+def gc_uploads_command():
+    """Remove every content-addressed upload whose reference count dropped to zero"""
+    print(f'Removed {collect_unreferenced_uploads()} unreferenced uploads')
+
+# Configure local image derivatives
+# Resized copies of files in UPLOAD_FOLDER are cached under the SHA-256 of
+# the original, so replacing an original never serves a stale derivative
+app.config['DERIVATIVE_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static/derivatives')
+app.config['IMAGE_DERIVATIVE_WIDTHS'] = sorted(int(w) for w in os.getenv('IMAGE_DERIVATIVE_WIDTHS', '160,320,640,1024').split(','))
+app.config['IMAGE_DERIVATIVE_WORKERS'] = int(os.getenv('IMAGE_DERIVATIVE_WORKERS', 2))
+app.config['IMAGE_DERIVATIVE_QUALITY'] = int(os.getenv('IMAGE_DERIVATIVE_QUALITY', 80))
+# Width of the thumbnail URL returned with each product for listing grids
+app.config['PRODUCT_THUMBNAIL_WIDTH'] = int(os.getenv('PRODUCT_THUMBNAIL_WIDTH', 320))
+os.makedirs(app.config['DERIVATIVE_FOLDER'], exist_ok=True)
+
+# format -> (Pillow format name, mimetype)
+DERIVATIVE_FORMATS = {'webp': ('WEBP', 'image/webp'), 'jpeg': ('JPEG', 'image/jpeg')}
+
+image_derivative_executor = ThreadPoolExecutor(
+    max_workers=app.config['IMAGE_DERIVATIVE_WORKERS'],
+    thread_name_prefix='image-derivative'
+)
+# path -> (mtime_ns, size, sha256) so originals are hashed once per change
+upload_hashes = {}
+upload_hashes_lock = threading.Lock()
+
+def upload_content_hash(path):
+    match = CONTENT_HASH_FILENAME_RE.match(os.path.basename(path))
+    if match:
+        return match.group(1)
+    stat = os.stat(path)
+    with upload_hashes_lock:
+        cached = upload_hashes.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    content_hash = digest.hexdigest()
+    with upload_hashes_lock:
+        upload_hashes[path] = (stat.st_mtime_ns, stat.st_size, content_hash)
+    return content_hash
+
+def snap_derivative_width(width):
+    """Round a requested width up to a configured one so the cache holds a fixed set of sizes"""
+    widths = app.config['IMAGE_DERIVATIVE_WIDTHS']
+    index = bisect.bisect_left(widths, width)
+    return widths[min(index, len(widths) - 1)]
+
+def derivative_path(content_hash, width, fmt):
+    return os.path.join(app.config['DERIVATIVE_FOLDER'], content_hash[:2], f'{content_hash}-{width}.{fmt}')
+
+def generate_derivative(source_path, content_hash, width, fmt):
+    """Write one resized copy of source_path unless it is already cached and return its path"""
+    target = derivative_path(content_hash, width, fmt)
+    if os.path.exists(target):
+        return target
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        # Never upscale; a narrow original is only re-encoded
+        if image.width > width:
+            image = image.resize((width, max(1, round(image.height * width / image.width))), Image.LANCZOS)
+        if fmt == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif fmt == 'webp' and image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        # Write to a temporary name first so readers never see a partial file
+        temp_path = f'{target}.{uuid.uuid4().hex}.tmp'
+        image.save(temp_path, format=DERIVATIVE_FORMATS[fmt][0], quality=app.config['IMAGE_DERIVATIVE_QUALITY'])
+        os.replace(temp_path, target)
+    return target
+
+def generate_all_derivatives(source_path):
+    """Pre-render every configured width and format of an upload"""
+    try:
+        content_hash = upload_content_hash(source_path)
+        for width in app.config['IMAGE_DERIVATIVE_WIDTHS']:
+            for fmt in DERIVATIVE_FORMATS:
+                generate_derivative(source_path, content_hash, width, fmt)
+    except Exception as e:
+        app.logger.error(f"Error generating derivatives of {source_path}: {str(e)}")
+
+def responsive_image_url(url, width):
+    """URL of a copy of an image at most `width` pixels wide, or the URL itself when it cannot be resized"""
+    if not url:
+        return url
+    if '/static/uploads/' in url:
+        prefix, filename = url.split('/static/uploads/', 1)
+        if filename and '/' not in filename:
+            return f'{prefix}/static/uploads/{snap_derivative_width(width)}/{filename}'
+    elif 'res.cloudinary.com' in url and '/upload/' in url:
+        # Cloudinary resizes and picks the format on its CDN
+        prefix, rest = url.split('/upload/', 1)
+        return f'{prefix}/upload/c_limit,w_{width},f_auto,q_auto/{rest}'
+    return url
+
+def preferred_derivative_format():
+    fmt = request.args.get('format')
+    if fmt in DERIVATIVE_FORMATS:
+        return fmt
+    # Only an explicit image/webp counts; */* is also sent by clients that cannot decode it
+    if any(value == 'image/webp' and quality > 0 for value, quality in request.accept_mimetypes):
+        return 'webp'
+    return 'jpeg'
+
+# Configure static file delivery
+# '' streams files from the Python worker. 'x-sendfile' (Apache mod_xsendfile,
+# lighttpd) and 'x-accel' (nginx) hand the transfer to the front-end server.
+app.config['STATIC_SENDFILE_MODE'] = os.getenv('STATIC_SENDFILE_MODE', '').lower()
+app.config['USE_X_SENDFILE'] = app.config['STATIC_SENDFILE_MODE'] == 'x-sendfile'
+# For 'x-accel': an nginx `internal` location whose alias is STATIC_ACCEL_ROOT, e.g.
+#   location /internal-static/ { internal; alias /srv/app/server/; }
+app.config['STATIC_ACCEL_PREFIX'] = os.getenv('STATIC_ACCEL_PREFIX', '/internal-static')
+app.config['STATIC_ACCEL_ROOT'] = os.getenv('STATIC_ACCEL_ROOT', os.path.dirname(os.path.abspath(__file__)))
+
+# Content-Encoding -> suffix of a precompressed sibling file, in order of preference
+PRECOMPRESSED_VARIANTS = (('br', '.br'), ('gzip', '.gz'))
+# Types worth compressing; images and archives are already compressed
+COMPRESSIBLE_MIMETYPES = ('text/', 'application/json', 'application/javascript', 'image/svg+xml')
+
+def precompressed_variant(path):
+    """(path, encoding) of the best precompressed sibling the client accepts, or (path, None)"""
+    for encoding, suffix in PRECOMPRESSED_VARIANTS:
+        if request.accept_encodings[encoding] and os.path.isfile(path + suffix):
+            return path + suffix, encoding
+    return path, None
+
+def serve_file(path, mimetype=None, etag=None, max_age=None, immutable=False):
+    """
+    Send a file with conditional and Range request support, preferring a
+    precompressed .br/.gz sibling and offloading the transfer to the
+    front-end server when STATIC_SENDFILE_MODE is set
+    """
+    mimetype = mimetype or mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    mode = app.config['STATIC_SENDFILE_MODE']
+    if mode == 'x-accel':
+        # nginx answers Range requests and picks .br/.gz siblings itself
+        # (gzip_static/brotli_static); only conditional requests are answered here
+        stat = os.stat(path)
+        etag = etag or f'{stat.st_mtime_ns:x}-{stat.st_size:x}'
+        last_modified = datetime.datetime.fromtimestamp(stat.st_mtime, datetime.timezone.utc)
+        if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+            response = app.response_class(status=304)
+        else:
+            response = app.response_class(mimetype=mimetype)
+            relative = os.path.relpath(path, app.config['STATIC_ACCEL_ROOT']).replace(os.sep, '/')
+            response.headers['X-Accel-Redirect'] = f"{app.config['STATIC_ACCEL_PREFIX'].rstrip('/')}/{relative}"
+        response.set_etag(etag)
+        response.last_modified = last_modified
+    else:
+        encoding = None
+        if mimetype.startswith(COMPRESSIBLE_MIMETYPES):
+            path, encoding = precompressed_variant(path)
+        # Each encoding is a different representation and needs its own ETag
+        if etag and encoding:
+            etag = f'{etag}-{encoding}'
+        # send_file handles If-None-Match/If-Modified-Since and Range, and
+        # emits X-Sendfile instead of the body when USE_X_SENDFILE is set
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=etag or True, max_age=max_age)
+        if encoding:
+            response.content_encoding = encoding
+        if mimetype.startswith(COMPRESSIBLE_MIMETYPES):
+            response.vary.add('Accept-Encoding')
+    if immutable:
+        response.cache_control.no_cache = False
+        response.cache_control.public = True
+        response.cache_control.max_age = IMMUTABLE_MAX_AGE
+        response.cache_control.immutable = True
+    elif max_age is not None:
+        response.cache_control.max_age = max_age
+    return response
+
+@app.cli.command('precompress-static')
+def precompress_static_command():
+    """Write .gz siblings of compressible files under static/ for serve_file to pick up"""
+    written = 0
+    for root, dirs, names in os.walk(app.static_folder):
+        for name in names:
+            path = os.path.join(root, name)
+            mimetype = mimetypes.guess_type(path)[0] or ''
+            if not mimetype.startswith(COMPRESSIBLE_MIMETYPES):
+                continue
+            target = path + '.gz'
+            if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                continue
+            with open(path, 'rb') as src, gzip.open(target, 'wb', compresslevel=9) as dst:
+                shutil.copyfileobj(src, dst)
+            written += 1
+    print(f'Wrote {written} precompressed files')
+
+def serve_static_file(filename):
+    """Flask's /static/<path:filename> route, answered by serve_file so precompressed siblings are used"""
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'message': 'File not found'}), 404
+    return serve_file(path, max_age=app.get_send_file_max_age(filename))
+
+app.view_functions['static'] = serve_static_file
+
 # Additional route to serve uploaded files directly
 @app.route('/static/uploads/<filename>')
 def uploaded_file(filename):
-    return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+    if CONTENT_HASH_FILENAME_RE.match(filename):
+        path = upload_path(filename)
+        if not os.path.isfile(path):
+            return jsonify({'message': 'Image not found'}), 404
+        return serve_file(path, etag=filename.split('.')[0], immutable=True)
+    path = upload_path(filename)
+    if path is None or not os.path.isfile(path):
+        return jsonify({'message': 'Image not found'}), 404
+    return serve_file(path)
 
     logging.basicConfig(level=logging.ERROR)
 
+# Resized copies of uploads: /static/uploads/<width>/<filename>
+@app.route('/static/uploads/<int:width>/<filename>')
+def uploaded_file_derivative(width, filename):
+    source_path = upload_path(filename)
+    if source_path is None or not os.path.isfile(source_path):
+        return jsonify({'message': 'Image not found'}), 404
+    try:
+        fmt = preferred_derivative_format()
+        width = snap_derivative_width(width)
+        content_hash = upload_content_hash(source_path)
+        path = derivative_path(content_hash, width, fmt)
+        if not os.path.exists(path):
+            # Generated on first request for uploads that predate derivatives;
+            # the pool bounds how many resizes run at once
+            path = image_derivative_executor.submit(generate_derivative, source_path, content_hash, width, fmt).result()
+        response = serve_file(
+            path,
+            mimetype=DERIVATIVE_FORMATS[fmt][1],
+            etag=f'{content_hash[:16]}-{width}-{fmt}',
+            immutable=bool(CONTENT_HASH_FILENAME_RE.match(filename))
+        )
+        response.vary.add('Accept')
+        return response
+    except UnidentifiedImageError:
+        return jsonify({'message': 'File is not a supported image'}), 415
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error serving derivative of {filename}: {str(e)}")
+        return jsonify({'message': 'Failed to resize image', 'error': str(e)}), 500
+
+@app.cli.command('generate-image-derivatives')
+def generate_image_derivatives_command():
+    """Pre-render derivatives of every file already in UPLOAD_FOLDER"""
+    paths = []
+    for root, dirs, names in os.walk(app.config['UPLOAD_FOLDER']):
+        dirs[:] = [d for d in dirs if d != '.incoming']
+        paths += [os.path.join(root, name) for name in names if allowed_file(name)]
+    list(image_derivative_executor.map(generate_all_derivatives, paths))
+    print(f'Generated derivatives for {len(paths)} uploads')
+
     # Helper Functions
 def generate_order_number():
     """Generate a unique order number"""
@@ -114,7 +1162,7 @@ def login():
 
     # Check if user exists
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         cursor.execute(
             'SELECT id, password FROM users WHERE email = %s',
             (email,)
@@ -137,6 +1185,8 @@ def login():
         
         # If we got here, authentication failed
         return jsonify({'message': 'Invalid credentials'}), 401
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'An error occurred. Please try again.', 'error': str(e)}), 500
 
@@ -145,82 +1195,1009 @@ def parse_bool(val):
         return val
     return str(val).lower() in ("true", "1", "yes")
 
+def fetch_product_images(cursor, product_ids):
+    """Return {product_id: [image_url, ...]} for the given products using one IN (...) query"""
+    images_by_product = {}
+    if not product_ids:
+        return images_by_product
+    format_strings = ','.join(['%s'] * len(product_ids))
+    cursor.execute(
+        # (product_id, id) order comes straight from ix_product_images_product_id
+        f'SELECT product_id, image_url FROM product_images WHERE product_id IN ({format_strings}) ORDER BY product_id, id',
+        tuple(product_ids)
+    )
+    for row in cursor.fetchall():
+        images_by_product.setdefault(row['product_id'], []).append(row['image_url'])
+    return images_by_product
+
+def format_product(product, image_urls):
+    """Shape a products row (joined with category_name) for the JSON response"""
+    # Optionally add category_id for frontend mapping/filtering
+    product['category_id'] = product.get('category_id')
+    product['images'] = image_urls if image_urls else ([product['image']] if product.get('image') else [])
+    # Listing grids load this instead of the full-size first image
+    product['thumbnail'] = responsive_image_url(product['images'][0], app.config['PRODUCT_THUMBNAIL_WIDTH']) if product['images'] else None
+    if product.get('specifications'):
+        try:
+            product['specifications'] = json.loads(product['specifications'])
+        except Exception:
+            product['specifications'] = None
+    return product
+
+# Columns of the products table that may be requested with ?fields=
+PRODUCT_COLUMNS = [
+    'id', 'name', 'price', 'image', 'category_id', 'description', 'rating',
+    'full_description', 'specifications', 'in_stock', 'stock_count', 'sku'
+]
+# Fields added to each product by the API rather than read from products
+PRODUCT_DERIVED_FIELDS = ['category_name', 'images', 'thumbnail']
+
+# sort_by value -> (column, direction). id is always the tiebreaker so that
+# every ordering is total and can be resumed from a cursor.
+PRODUCT_SORTS = {
+    'name': ('name', 'ASC'),
+    'price-low': ('price', 'ASC'),
+    'price-high': ('price', 'DESC'),
+    'rating': ('rating', 'DESC'),
+    None: ('id', 'DESC'),
+}
+MAX_PRODUCT_PAGE_SIZE = 200
+
+def encode_cursor(payload):
+    """Encode a keyset position as an opaque URL-safe token"""
+    raw = json.dumps(payload, default=str, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Decode a token produced by encode_cursor, raising ValueError if it is malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(payload, dict):
+        raise ValueError('Invalid cursor')
+    return payload
+
+def keyset_condition(column, direction, last_value, last_id):
+    """
+    Build the WHERE fragment selecting rows after (last_value, last_id) for
+    ORDER BY column direction, id direction. MySQL sorts NULLs first in
+    ascending order and last in descending order, which is handled here.
+    """
+    op = '>' if direction == 'ASC' else '<'
+    if column == 'id':
+        return f'p.id {op} %s', [last_id]
+    if last_value is None:
+        if direction == 'ASC':
+            # NULL block comes first, then every non-NULL value
+            return f'((p.{column} IS NULL AND p.id {op} %s) OR p.{column} IS NOT NULL)', [last_id]
+        return f'(p.{column} IS NULL AND p.id {op} %s)', [last_id]
+    condition = f'(p.{column} {op} %s OR (p.{column} = %s AND p.id {op} %s)'
+    if direction == 'DESC':
+        condition += f' OR p.{column} IS NULL'
+    return condition + ')', [last_value, last_value, last_id]
+
+def parse_product_fields(fields_param):
+    """Parse ?fields=a,b,c into a list, or None when every field is wanted"""
+    if not fields_param:
+        return None
+    fields = [f.strip() for f in fields_param.split(',') if f.strip()]
+    unknown = [f for f in fields if f not in PRODUCT_COLUMNS and f not in PRODUCT_DERIVED_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return fields
+
 @app.route('/products', methods=['GET'])
 def get_products():
     try:
-        cursor = mysql.connection.cursor()
+        cache_key = catalog_cache_key('products')
+        cached = catalog_cache.get(cache_key)
+        if cached is not None:
+            return conditional_json_response(*cached)
+
         # Filtering parameters
         category_id = request.args.get('category_id', type=int)
         min_price = request.args.get('min_price', type=float)
         max_price = request.args.get('max_price', type=float)
         sort_by = request.args.get('sort_by')  # name, price-low, price-high, rating
+        min_rating = request.args.get('min_rating', type=float)
+        in_stock_param = request.args.get('in_stock')
+        in_stock = parse_bool(in_stock_param) if in_stock_param is not None else None
+        # Pagination / projection / facet parameters
+        limit = request.args.get('limit', type=int)
+        after = request.args.get('after')
+        with_facets = parse_bool(request.args.get('facets', 'false'))
 
-        query = 'SELECT * FROM products WHERE 1=1'
+        if sort_by not in PRODUCT_SORTS:
+            sort_by = None
+        sort_column, sort_direction = PRODUCT_SORTS[sort_by]
+
+        try:
+            fields = parse_product_fields(request.args.get('fields'))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        paginate = limit is not None or after is not None
+        if paginate:
+            if limit is None:
+                limit = MAX_PRODUCT_PAGE_SIZE
+            if limit <= 0:
+                return jsonify({'message': 'limit must be positive'}), 400
+            limit = min(limit, MAX_PRODUCT_PAGE_SIZE)
+
+        # Only read the columns that will be returned, plus what the
+        # cursor and the images fallback need
+        if fields is None:
+            columns = 'p.*'
+        else:
+            wanted = {'id', 'category_id', sort_column}
+            wanted.update(f for f in fields if f in PRODUCT_COLUMNS)
+            if 'images' in fields or 'thumbnail' in fields:
+                wanted.add('image')
+            columns = ', '.join(f'p.{c}' for c in PRODUCT_COLUMNS if c in wanted)
+
+        # Category names come from a join instead of one lookup per product
+        query = f'''
+            SELECT {columns}, c.name AS category_name
+            FROM products p
+            LEFT JOIN categories c ON c.id = p.category_id
+            WHERE 1=1
+        '''
         params = []
 
         if category_id:
-            query += ' AND category_id = %s'
+            query += ' AND p.category_id = %s'
             params.append(category_id)
         if min_price is not None:
-            query += ' AND price >= %s'
+            query += ' AND p.price >= %s'
             params.append(min_price)
         if max_price is not None:
-            query += ' AND price <= %s'
+            query += ' AND p.price <= %s'
             params.append(max_price)
-        if sort_by == 'name':
-            query += ' ORDER BY name ASC'
-        elif sort_by == 'price-low':
-            query += ' ORDER BY price ASC'
-        elif sort_by == 'price-high':
-            query += ' ORDER BY price DESC'
-        elif sort_by == 'rating':
-            query += ' ORDER BY rating DESC'
+        if min_rating is not None:
+            query += ' AND p.rating >= %s'
+            params.append(min_rating)
+        if in_stock is True:
+            query += ' AND p.in_stock = 1 AND p.stock_count > 0'
+        elif in_stock is False:
+            query += ' AND NOT (p.in_stock = 1 AND p.stock_count > 0)'
+
+        if after:
+            try:
+                position = decode_cursor(after)
+                if position.get('sort') != sort_by or 'id' not in position:
+                    raise ValueError('Cursor does not match sort_by')
+                condition, condition_params = keyset_condition(
+                    sort_column, sort_direction, position.get('value'), int(position['id'])
+                )
+            except (ValueError, TypeError) as e:
+                return jsonify({'message': str(e)}), 400
+            query += f' AND {condition}'
+            params.extend(condition_params)
+
+        if sort_column == 'id':
+            query += f' ORDER BY p.id {sort_direction}'
         else:
-            query += ' ORDER BY id DESC'
+            query += f' ORDER BY p.{sort_column} {sort_direction}, p.id {sort_direction}'
+        if paginate:
+            # Read one extra row to know whether another page exists
+            query += ' LIMIT %s'
+            params.append(limit + 1)
 
+        cursor = get_cursor()
         cursor.execute(query, tuple(params))
         products = cursor.fetchall()
 
-        # Fetch product images & category names
-        for product in products:
-            # Add category_name
-            product['category_name'] = get_category_name(product['category_id'])
-            # Optionally add category_id for frontend mapping/filtering
-            product['category_id'] = product.get('category_id')
-            # Images
-            cursor.execute('SELECT image_url FROM product_images WHERE product_id = %s', (product['id'],))
-            images = cursor.fetchall()
-            product['images'] = [img['image_url'] for img in images] if images else ([product['image']] if product['image'] else [])
-            if product.get('specifications'):
-                try:
-                    product['specifications'] = json.loads(product['specifications'])
-                except Exception:
-                    product['specifications'] = None
+        next_cursor = None
+        if paginate and len(products) > limit:
+            products = products[:limit]
+            last = products[-1]
+            next_cursor = encode_cursor({'sort': sort_by, 'value': last.get(sort_column), 'id': last['id']})
+
+        # Fetch the images of every listed product in a single query
+        if fields is None or 'images' in fields or 'thumbnail' in fields:
+            images_by_product = fetch_product_images(cursor, [product['id'] for product in products])
+        else:
+            images_by_product = {}
+
+        facets = None
+        if with_facets:
+            ensure_facet_index(cursor)
+            facets = facet_index.counts(category_id, min_price, max_price, min_rating, in_stock)
         cursor.close()
-        return jsonify(products), 200
+
+        for product in products:
+            format_product(product, images_by_product.get(product['id']))
+        # Entries depend on the products and category names they show, and on
+        # which products their filters select. A category filter only selects
+        # from that category, so writes elsewhere leave the entry alone; facet
+        # counts span the whole catalog. Orders and stock holds only bump
+        # 'stock', which matters to listings selecting by stock.
+        cache_tags = {f"product:{product['id']}" for product in products}
+        cache_tags |= {f"category:{product['category_id']}" for product in products}
+        cache_tags.add(f'category-listing:{category_id}' if category_id and not with_facets else 'products')
+        if in_stock is not None or with_facets:
+            cache_tags.add('stock')
+        if fields is not None:
+            products = [{f: product.get(f) for f in fields} for product in products]
+
+        if paginate:
+            payload = {'data': products, 'next_cursor': next_cursor, 'success': True}
+            if with_facets:
+                payload['facets'] = facets
+            response = jsonify(payload)
+        elif with_facets:
+            response = jsonify({'data': products, 'facets': facets, 'success': True})
+        else:
+            response = jsonify(products)
+        body = response.get_data()
+        etag = json_etag(body)
+        catalog_cache.set(cache_key, (body, etag), cache_tags)
+        return conditional_json_response(body, etag)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to fetch products', 'error': str(e)}), 500
 
+# Product search
+# Full rebuilds pick up writes handled by other gunicorn workers
+app.config['SEARCH_INDEX_MAX_AGE'] = int(os.getenv('SEARCH_INDEX_MAX_AGE', 300))
+
+SEARCH_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+# Per-field term weights: a match in the name counts more than one in the long description
+SEARCH_FIELD_WEIGHTS = {
+    'name': 3.0,
+    'description': 1.5,
+    'specifications': 1.0,
+    'full_description': 1.0,
+}
+SEARCH_INDEX_COLUMNS = 'id, name, description, full_description, specifications, price, category_id'
+MAX_SEARCH_PAGE_SIZE = 100
+
+def tokenize(text):
+    return SEARCH_TOKEN_RE.findall(text.lower()) if text else []
+
+def specifications_text(specifications):
+    """Flatten the specifications JSON into searchable text"""
+    if not specifications:
+        return ''
+    try:
+        value = json.loads(specifications) if isinstance(specifications, str) else specifications
+    except Exception:
+        return str(specifications)
+    parts = []
+    stack = [value]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, dict):
+            parts.extend(str(key) for key in item)
+            stack.extend(item.values())
+        elif isinstance(item, list):
+            stack.extend(item)
+        elif item is not None:
+            parts.append(str(item))
+    return ' '.join(parts)
+
+class InMemoryIndex:
+    """
+    Age tracking and background rebuilds shared by the in-memory product
+    indexes. Subclasses guard their contents with self._lock and set
+    built_at at the end of build().
+    """
+
+    def __init__(self, max_age):
+        self.max_age = max_age
+        self.built_at = None
+        self._refreshing = False
+        self._lock = threading.RLock()
+
+    def is_stale(self):
+        return self.built_at is None or time.monotonic() - self.built_at > self.max_age
+
+    def refresh_in_background(self, load):
+        """Rebuild with load(cursor) on a worker thread while requests keep using the current contents"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def refresh():
+            conn = None
+            try:
+                conn = db_pool.acquire()
+                cursor = conn.cursor()
+                load(cursor)
+            except Exception as e:
+                app.logger.error(f"Error rebuilding {type(self).__name__}: {str(e)}")
+            finally:
+                if conn is not None:
+                    db_pool.release(conn)
+                with self._lock:
+                    self._refreshing = False
+
+        threading.Thread(target=refresh, daemon=True).start()
+
+class ProductSearchIndex(InMemoryIndex):
+    """
+    In-memory inverted index over product text, ranked with BM25.
+
+    Every product occupies a slot in column arrays (price, category, alive)
+    and each posting stores the BM25 term-frequency component of its slot,
+    computed from the field-weighted term frequency. A query therefore adds
+    idf * weight into a dense score vector per term and filters and ranks
+    with vectorized NumPy operations. Documents are updated incrementally;
+    a full rebuild also refreshes the average length used in the weights.
+    """
+
+    k1 = 1.2
+    b = 0.75
+
+    def __init__(self, max_age):
+        super().__init__(max_age)
+        self._reset(0)
+
+    def _reset(self, capacity):
+        capacity = max(capacity, 1024)
+        self._postings = {}      # term -> {slot: weight}
+        self._arrays = {}        # term -> (slots, weights) NumPy views of the postings
+        self._doc_terms = {}     # slot -> {term: weighted tf}
+        self._slots = {}         # product_id -> slot
+        self._free_slots = []
+        self._size = 0
+        self._total_length = 0.0
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._lengths = np.zeros(capacity, dtype=np.float64)
+        self._prices = np.full(capacity, np.nan)
+        self._categories = np.full(capacity, -1, dtype=np.int64)
+        self._alive = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        capacity = len(self._ids) * 2
+        for name, fill in (('_ids', 0), ('_lengths', 0.0), ('_prices', np.nan), ('_categories', -1), ('_alive', False)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _analyze(self, row):
+        terms = {}
+        for field, weight in SEARCH_FIELD_WEIGHTS.items():
+            text = row.get(field)
+            if field == 'specifications':
+                text = specifications_text(text)
+            for token in tokenize(text):
+                terms[token] = terms.get(token, 0.0) + weight
+        return terms
+
+    def _avg_length(self):
+        return (self._total_length / len(self._slots)) if self._slots else 1.0
+
+    def _remove_locked(self, product_id):
+        slot = self._slots.pop(product_id, None)
+        if slot is None:
+            return
+        for term in self._doc_terms.pop(slot):
+            postings = self._postings[term]
+            del postings[slot]
+            self._arrays.pop(term, None)
+            if not postings:
+                del self._postings[term]
+        self._total_length -= self._lengths[slot]
+        self._alive[slot] = False
+        self._free_slots.append(slot)
+
+    def _add_locked(self, row, terms=None, avg_length=None):
+        terms = terms if terms is not None else self._analyze(row)
+        if self._free_slots:
+            slot = self._free_slots.pop()
+        else:
+            if self._size == len(self._ids):
+                self._grow()
+            slot = self._size
+            self._size += 1
+        length = sum(terms.values())
+        self._slots[row['id']] = slot
+        self._doc_terms[slot] = terms
+        self._ids[slot] = row['id']
+        self._lengths[slot] = length
+        self._prices[slot] = float(row['price']) if row.get('price') is not None else np.nan
+        self._categories[slot] = row['category_id'] if row.get('category_id') is not None else -1
+        self._alive[slot] = True
+        self._total_length += length
+        avg_length = avg_length or self._avg_length()
+        norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[slot] = tf * (self.k1 + 1) / (tf + norm)
+            self._arrays.pop(term, None)
+
+    def build(self, rows):
+        """Replace the whole index with the given product rows"""
+        analyzed = [(row, self._analyze(row)) for row in rows]
+        total = sum(sum(terms.values()) for _, terms in analyzed)
+        avg_length = (total / len(analyzed)) if analyzed and total else 1.0
+        with self._lock:
+            self._reset(len(analyzed) * 2)
+            for row, terms in analyzed:
+                self._add_locked(row, terms, avg_length)
+            # Long posting lists are the slow ones to convert, so do it up front
+            for term, postings in self._postings.items():
+                if len(postings) >= 256:
+                    self._term_arrays(term)
+            self.built_at = time.monotonic()
+
+    def upsert(self, row):
+        with self._lock:
+            self._remove_locked(row['id'])
+            self._add_locked(row)
+
+    def remove(self, product_id):
+        with self._lock:
+            self._remove_locked(product_id)
+
+    def _term_arrays(self, term):
+        arrays = self._arrays.get(term)
+        if arrays is None:
+            postings = self._postings[term]
+            arrays = (
+                np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                np.fromiter(postings.values(), dtype=np.float64, count=len(postings)),
+            )
+            self._arrays[term] = arrays
+        return arrays
+
+    def search(self, query, category_id=None, min_price=None, max_price=None, offset=0, limit=20):
+        """
+        Return (total, [(product_id, score), ...]) for the requested page of
+        products matching any query term, best first.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            doc_count = len(self._slots)
+            scores = np.zeros(self._size)
+            for term in terms:
+                if term not in self._postings:
+                    continue
+                slots, weights = self._term_arrays(term)
+                df = len(slots)
+                idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+                # Slots are unique within a posting list, so fancy-index += is safe
+                scores[slots] += idf * weights
+            mask = (scores > 0) & self._alive[:self._size]
+            if category_id:
+                mask &= self._categories[:self._size] == category_id
+            # NaN prices compare False, so unpriced products drop out of price filters
+            if min_price is not None:
+                mask &= self._prices[:self._size] >= min_price
+            if max_price is not None:
+                mask &= self._prices[:self._size] <= max_price
+            candidates = np.flatnonzero(mask)
+            ids = self._ids[candidates]
+        total = len(candidates)
+        wanted = min(offset + limit, total)
+        if wanted <= 0:
+            return total, []
+        candidate_scores = scores[candidates]
+        if wanted < total:
+            top = np.argpartition(-candidate_scores, wanted - 1)[:wanted]
+        else:
+            top = np.arange(total)
+        # Highest score first, newest product first on ties
+        order = top[np.lexsort((-ids[top], -candidate_scores[top]))]
+        page = order[offset:offset + limit]
+        return total, [(int(ids[i]), float(candidate_scores[i])) for i in page]
+
+search_index = ProductSearchIndex(app.config['SEARCH_INDEX_MAX_AGE'])
+
+def load_search_index(cursor):
+    cursor.execute(f'SELECT {SEARCH_INDEX_COLUMNS} FROM products')
+    search_index.build(cursor.fetchall())
+
+def ensure_search_index(cursor):
+    """Build the search index on first use and refresh it once older than SEARCH_INDEX_MAX_AGE"""
+    if search_index.built_at is None:
+        load_search_index(cursor)
+    elif search_index.is_stale():
+        search_index.refresh_in_background(load_search_index)
+
+def reindex_products(product_ids):
+    """Refresh the search and suggestion entries of the given products after a write"""
+    if not product_ids:
+        return
+    format_strings = ','.join(['%s'] * len(product_ids))
+    cursor = get_cursor()
+    if search_index.built_at is not None:
+        cursor.execute(f'SELECT {SEARCH_INDEX_COLUMNS} FROM products WHERE id IN ({format_strings})', tuple(product_ids))
+        rows = {row['id']: row for row in cursor.fetchall()}
+        for product_id in product_ids:
+            if product_id in rows:
+                search_index.upsert(rows[product_id])
+            else:
+                search_index.remove(product_id)
+    if product_suggest_index.built_at is not None:
+        cursor.execute(f'SELECT {SUGGEST_PRODUCT_COLUMNS} FROM products WHERE id IN ({format_strings})', tuple(product_ids))
+        rows = {row['id']: row for row in cursor.fetchall()}
+        category_deltas = {}
+        for product_id in product_ids:
+            previous = product_suggest_index.get(product_id)
+            row = rows.get(product_id)
+            if row is not None:
+                # Units sold only change with orders; keep the count from the
+                # last build rather than summing order_items again
+                product_suggest_index.upsert(suggest_entry({**row, 'sales': previous['sales'] if previous else 0}))
+            else:
+                product_suggest_index.remove(product_id)
+            # Move the product between the counts shown next to category suggestions
+            old_category = previous['category_id'] if previous else None
+            new_category = row['category_id'] if row is not None else None
+            if old_category != new_category:
+                category_deltas[old_category] = category_deltas.get(old_category, 0) - 1
+                category_deltas[new_category] = category_deltas.get(new_category, 0) + 1
+        for category_id, delta in category_deltas.items():
+            if category_id is not None and delta:
+                category_suggest_index.adjust(category_id, 'productCount', delta)
+    refresh_product_facets(cursor, product_ids)
+    cursor.close()
+
+# Typeahead suggestions
+SUGGEST_RANKS = ('rating', 'sales')
+MAX_SUGGESTIONS = 20
+
+class PrefixIndex(InMemoryIndex):
+    """
+    Sorted-array index answering "entries with a word starting with prefix,
+    top k by score".
+
+    Every word of every name is a row in a sorted key list, so a prefix is
+    a contiguous range found with two bisections. Scores are kept in NumPy
+    arrays aligned with the rows, and the top of the range is picked with
+    argpartition instead of scanning it in Python. Rows are inserted and
+    removed in place, so single products can be updated without a rebuild.
+    """
+
+    def __init__(self, max_age, ranks):
+        super().__init__(max_age)
+        self.ranks = ranks
+        self._keys = []          # sorted word keys, one row per (word, entry)
+        self._owners = []        # entry id of each row
+        self._entries = {}       # entry id -> entry dict
+        self._scores = {rank: np.zeros(0) for rank in ranks}  # rank -> array aligned with rows
+
+    @staticmethod
+    def _words(name):
+        return sorted(set(tokenize(name)))
+
+    def _remove_locked(self, entry_id):
+        entry = self._entries.pop(entry_id, None)
+        if entry is None:
+            return
+        positions = []
+        for word in self._words(entry['name']):
+            position = bisect.bisect_left(self._keys, word)
+            while position < len(self._keys) and self._keys[position] == word:
+                if self._owners[position] == entry_id:
+                    positions.append(position)
+                    break
+                position += 1
+        for position in sorted(positions, reverse=True):
+            del self._keys[position]
+            del self._owners[position]
+        for rank in self.ranks:
+            self._scores[rank] = np.delete(self._scores[rank], positions)
+
+    def _insert_locked(self, entry):
+        self._entries[entry['id']] = entry
+        for word in self._words(entry['name']):
+            position = bisect.bisect_right(self._keys, word)
+            self._keys.insert(position, word)
+            self._owners.insert(position, entry['id'])
+            for rank in self.ranks:
+                self._scores[rank] = np.insert(self._scores[rank], position, float(entry.get(rank) or 0))
+
+    def build(self, entries):
+        rows = sorted((word, entry['id']) for entry in entries for word in self._words(entry['name']))
+        entries_by_id = {entry['id']: entry for entry in entries}
+        scores = {
+            rank: np.array([float(entries_by_id[owner].get(rank) or 0) for _, owner in rows], dtype=np.float64)
+            for rank in self.ranks
+        }
+        with self._lock:
+            self._entries = entries_by_id
+            self._keys = [word for word, _ in rows]
+            self._owners = [owner for _, owner in rows]
+            self._scores = scores
+            self.built_at = time.monotonic()
+
+    def upsert(self, entry):
+        with self._lock:
+            self._remove_locked(entry['id'])
+            self._insert_locked(entry)
+
+    def remove(self, entry_id):
+        with self._lock:
+            self._remove_locked(entry_id)
+
+    def get(self, entry_id):
+        with self._lock:
+            return self._entries.get(entry_id)
+
+    def adjust(self, entry_id, field, delta):
+        """Add delta to a numeric field of an entry, if it is indexed"""
+        with self._lock:
+            entry = self._entries.get(entry_id)
+            if entry is not None:
+                self._remove_locked(entry_id)
+                self._insert_locked({**entry, field: entry[field] + delta})
+
+    def complete(self, query, limit, rank):
+        words = tokenize(query)
+        if not words:
+            return []
+        # Look up the range of the longest (most selective) word; every
+        # other word must also start one of the entry's words
+        lead = max(words, key=len)
+        with self._lock:
+            start = bisect.bisect_left(self._keys, lead)
+            end = bisect.bisect_left(self._keys, lead + '\uffff', start)
+            scores = self._scores[rank][start:end]
+            results = []
+            seen = set()
+            # One entry may match through several words, and multi-word
+            # queries reject some candidates, so widen the window until
+            # enough entries are found or the range is exhausted
+            wanted = min(len(scores), limit * 4)
+            while wanted > 0:
+                if wanted < len(scores):
+                    top = np.argpartition(-scores, wanted - 1)[:wanted]
+                else:
+                    top = np.arange(len(scores))
+                for offset in top[np.argsort(-scores[top], kind='stable')]:
+                    entry_id = self._owners[start + offset]
+                    if entry_id in seen:
+                        continue
+                    seen.add(entry_id)
+                    entry = self._entries[entry_id]
+                    if len(words) > 1:
+                        name_words = tokenize(entry['name'])
+                        if not all(any(w.startswith(q) for w in name_words) for q in words):
+                            continue
+                    results.append(entry)
+                    if len(results) == limit:
+                        return results
+                if wanted == len(scores):
+                    break
+                wanted = min(len(scores), wanted * 4)
+        return results
+
+product_suggest_index = PrefixIndex(app.config['SEARCH_INDEX_MAX_AGE'], SUGGEST_RANKS)
+category_suggest_index = PrefixIndex(app.config['SEARCH_INDEX_MAX_AGE'], ('productCount',))
+
+SUGGEST_PRODUCT_COLUMNS = 'id, name, price, image, rating, category_id'
+# Units sold per product come from order_items so suggestions can rank by sales
+SUGGEST_PRODUCT_QUERY = '''
+    SELECT p.id, p.name, p.price, p.image, p.rating, p.category_id, COALESCE(s.sold, 0) AS sales
+    FROM products p
+    LEFT JOIN (
+        SELECT product_id, SUM(quantity) AS sold FROM order_items GROUP BY product_id
+    ) s ON s.product_id = p.id
+'''
+
+def suggest_entry(row):
+    return {
+        'id': row['id'],
+        'name': row['name'] or '',
+        'price': float(row['price']) if row['price'] is not None else None,
+        'image': row['image'],
+        'rating': float(row['rating']) if row['rating'] is not None else None,
+        'sales': int(row['sales']),
+        'category_id': row['category_id'],
+    }
+
+CATEGORY_SUGGEST_QUERY = '''
+    SELECT c.id, c.name, c.icon, COUNT(p.id) AS productCount
+    FROM categories c
+    LEFT JOIN products p ON p.category_id = c.id
+'''
+
+def category_suggest_entry(row):
+    return {'id': row['id'], 'name': row['name'] or '', 'icon': row['icon'], 'productCount': int(row['productCount'])}
+
+def load_category_suggestions(cursor):
+    cursor.execute(CATEGORY_SUGGEST_QUERY + ' GROUP BY c.id, c.name, c.icon')
+    category_suggest_index.build([category_suggest_entry(row) for row in cursor.fetchall()])
+
+def load_suggest_index(cursor):
+    cursor.execute(SUGGEST_PRODUCT_QUERY)
+    product_suggest_index.build([suggest_entry(row) for row in cursor.fetchall()])
+    load_category_suggestions(cursor)
+
+def refresh_category_suggestion(category_id):
+    """Patch one category's suggestion after a category write, if they have been built"""
+    if category_suggest_index.built_at is not None:
+        cursor = get_cursor()
+        cursor.execute(CATEGORY_SUGGEST_QUERY + ' WHERE c.id = %s GROUP BY c.id, c.name, c.icon', (category_id,))
+        row = cursor.fetchone()
+        cursor.close()
+        if row:
+            category_suggest_index.upsert(category_suggest_entry(row))
+        else:
+            category_suggest_index.remove(category_id)
+
+@app.route('/products/suggest', methods=['GET'])
+def suggest_products():
+    try:
+        q = (request.args.get('q') or '').strip()
+        limit = min(max(request.args.get('limit', 8, type=int), 1), MAX_SUGGESTIONS)
+        rank = request.args.get('rank', 'rating')
+        if rank not in SUGGEST_RANKS:
+            return jsonify({'message': f'rank must be one of: {", ".join(SUGGEST_RANKS)}'}), 400
+        if not q:
+            return jsonify({'products': [], 'categories': [], 'success': True}), 200
+
+        if product_suggest_index.built_at is None:
+            cursor = get_cursor()
+            load_suggest_index(cursor)
+            cursor.close()
+        elif product_suggest_index.is_stale():
+            product_suggest_index.refresh_in_background(load_suggest_index)
+
+        return jsonify({
+            'products': product_suggest_index.complete(q, limit, rank),
+            'categories': category_suggest_index.complete(q, limit, 'productCount'),
+            'success': True
+        }), 200
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        return jsonify({'message': 'Failed to fetch suggestions', 'error': str(e)}), 500
+
+@app.route('/products/search', methods=['GET'])
+def search_products():
+    try:
+        q = (request.args.get('q') or '').strip()
+        category_id = request.args.get('category_id', type=int)
+        min_price = request.args.get('min_price', type=float)
+        max_price = request.args.get('max_price', type=float)
+        limit = min(max(request.args.get('limit', 20, type=int), 1), MAX_SEARCH_PAGE_SIZE)
+        offset = max(request.args.get('offset', 0, type=int), 0)
+
+        if not q:
+            return jsonify({'message': 'Search query q is required'}), 400
+
+        cursor = get_cursor()
+        ensure_search_index(cursor)
+        total, page = search_index.search(q, category_id, min_price, max_price, offset, limit)
+
+        products = []
+        if page:
+            page_ids = [product_id for product_id, _ in page]
+            format_strings = ','.join(['%s'] * len(page_ids))
+            cursor.execute(f'''
+                SELECT p.*, c.name AS category_name
+                FROM products p
+                LEFT JOIN categories c ON c.id = p.category_id
+                WHERE p.id IN ({format_strings})
+            ''', tuple(page_ids))
+            rows = {row['id']: row for row in cursor.fetchall()}
+            images_by_product = fetch_product_images(cursor, page_ids)
+            for product_id, score in page:
+                product = rows.get(product_id)
+                # Skip products deleted by another worker since the last rebuild
+                if product is None:
+                    continue
+                format_product(product, images_by_product.get(product_id))
+                product['score'] = round(score, 4)
+                products.append(product)
+        cursor.close()
+
+        return jsonify({'data': products, 'total': total, 'success': True}), 200
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        return jsonify({'message': 'Failed to search products', 'error': str(e)}), 500
+
+# Facet counts
+# Price bucket boundaries; the last bucket is open-ended
+FACET_PRICE_EDGES = [0, 25, 50, 100, 250, 500]
+# "n stars & up" rating bands
+FACET_RATING_BANDS = [4, 3, 2, 1]
+FACET_INDEX_COLUMNS = 'id, category_id, price, rating, in_stock, stock_count'
+
+class ProductFacetIndex(InMemoryIndex):
+    """
+    Column-oriented copy of the facetable product attributes.
+
+    Each product occupies a slot in NumPy arrays (category, price, rating,
+    in-stock), so a filter is a boolean mask and facet counts are a
+    bincount/sum over the masked columns instead of a COUNT(*) per value.
+    """
+
+    def __init__(self, max_age):
+        super().__init__(max_age)
+        self._reset(0)
+
+    def _reset(self, capacity):
+        capacity = max(capacity, 1024)
+        self._slots = {}
+        self._free_slots = []
+        self._size = 0
+        self._categories = np.full(capacity, -1, dtype=np.int64)
+        self._prices = np.full(capacity, np.nan)
+        self._ratings = np.full(capacity, np.nan)
+        self._in_stock = np.zeros(capacity, dtype=bool)
+        self._alive = np.zeros(capacity, dtype=bool)
+
+    def _grow(self):
+        capacity = len(self._alive) * 2
+        for name, fill in (('_categories', -1), ('_prices', np.nan), ('_ratings', np.nan), ('_in_stock', False), ('_alive', False)):
+            old = getattr(self, name)
+            new = np.full(capacity, fill, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _set_locked(self, row):
+        slot = self._slots.get(row['id'])
+        if slot is None:
+            if self._free_slots:
+                slot = self._free_slots.pop()
+            else:
+                if self._size == len(self._alive):
+                    self._grow()
+                slot = self._size
+                self._size += 1
+            self._slots[row['id']] = slot
+        self._categories[slot] = row['category_id'] if row.get('category_id') is not None else -1
+        self._prices[slot] = float(row['price']) if row.get('price') is not None else np.nan
+        self._ratings[slot] = float(row['rating']) if row.get('rating') is not None else np.nan
+        self._in_stock[slot] = bool(row.get('in_stock')) and (row.get('stock_count') or 0) > 0
+        self._alive[slot] = True
+
+    def build(self, rows):
+        with self._lock:
+            self._reset(len(rows) * 2)
+            for row in rows:
+                self._set_locked(row)
+            self.built_at = time.monotonic()
+
+    def upsert(self, row):
+        with self._lock:
+            self._set_locked(row)
+
+    def remove(self, product_id):
+        with self._lock:
+            slot = self._slots.pop(product_id, None)
+            if slot is not None:
+                self._alive[slot] = False
+                self._free_slots.append(slot)
+
+    def counts(self, category_id=None, min_price=None, max_price=None, min_rating=None, in_stock=None):
+        """
+        Facet counts for the given filters. Each facet is counted with every
+        filter applied except its own, so the sidebar can show how many
+        products each alternative value would give.
+        """
+        with self._lock:
+            size = self._size
+            alive = self._alive[:size]
+            categories = self._categories[:size]
+            prices = self._prices[:size]
+            ratings = self._ratings[:size]
+            stock = self._in_stock[:size]
+
+            masks = {'category': alive.copy(), 'price': alive.copy(), 'rating': alive.copy(), 'in_stock': alive.copy()}
+            # NaN compares False, so unpriced/unrated products drop out of those filters
+            if category_id:
+                category_mask = categories == category_id
+                for facet in ('price', 'rating', 'in_stock'):
+                    masks[facet] &= category_mask
+            if min_price is not None or max_price is not None:
+                price_mask = np.ones(size, dtype=bool)
+                if min_price is not None:
+                    price_mask &= prices >= min_price
+                if max_price is not None:
+                    price_mask &= prices <= max_price
+                for facet in ('category', 'rating', 'in_stock'):
+                    masks[facet] &= price_mask
+            if min_rating is not None:
+                rating_mask = ratings >= min_rating
+                for facet in ('category', 'price', 'in_stock'):
+                    masks[facet] &= rating_mask
+            if in_stock is not None:
+                stock_mask = stock == in_stock
+                for facet in ('category', 'price', 'rating'):
+                    masks[facet] &= stock_mask
+
+            # Category ids are shifted by one so products without a category (-1) land in bin 0
+            category_bins = np.bincount(categories[masks['category']] + 1)
+            category_counts = [
+                {'value': int(value) - 1 if value else None, 'count': int(count)}
+                for value, count in enumerate(category_bins) if count
+            ]
+
+            priced = prices[masks['price']]
+            priced = priced[~np.isnan(priced)]
+            price_bins = np.bincount(np.digitize(priced, FACET_PRICE_EDGES[1:]), minlength=len(FACET_PRICE_EDGES))
+            price_counts = [
+                {
+                    'min': FACET_PRICE_EDGES[i],
+                    'max': FACET_PRICE_EDGES[i + 1] if i + 1 < len(FACET_PRICE_EDGES) else None,
+                    'count': int(price_bins[i])
+                }
+                for i in range(len(FACET_PRICE_EDGES))
+            ]
+
+            rated = ratings[masks['rating']]
+            rating_counts = [{'min': band, 'count': int(np.count_nonzero(rated >= band))} for band in FACET_RATING_BANDS]
+
+            in_stock_total = int(np.count_nonzero(stock[masks['in_stock']]))
+            stock_counts = {
+                'true': in_stock_total,
+                'false': int(np.count_nonzero(masks['in_stock'])) - in_stock_total
+            }
+
+        return {
+            'category': category_counts,
+            'price': price_counts,
+            'rating': rating_counts,
+            'in_stock': stock_counts,
+        }
+
+facet_index = ProductFacetIndex(app.config['SEARCH_INDEX_MAX_AGE'])
+
+def load_facet_index(cursor):
+    cursor.execute(f'SELECT {FACET_INDEX_COLUMNS} FROM products')
+    facet_index.build(cursor.fetchall())
+
+def ensure_facet_index(cursor):
+    """Build the facet index on first use and refresh it once older than SEARCH_INDEX_MAX_AGE"""
+    if facet_index.built_at is None:
+        load_facet_index(cursor)
+    elif facet_index.is_stale():
+        facet_index.refresh_in_background(load_facet_index)
+
+def refresh_product_facets(cursor, product_ids):
+    """Re-read the facet columns of the given products (e.g. after stock changed)"""
+    if facet_index.built_at is None or not product_ids:
+        return
+    product_ids = list(product_ids)
+    format_strings = ','.join(['%s'] * len(product_ids))
+    cursor.execute(f'SELECT {FACET_INDEX_COLUMNS} FROM products WHERE id IN ({format_strings})', tuple(product_ids))
+    rows = {row['id']: row for row in cursor.fetchall()}
+    for product_id in product_ids:
+        if product_id in rows:
+            facet_index.upsert(rows[product_id])
+        else:
+            facet_index.remove(product_id)
+
 @app.route('/products/<int:id>', methods=['GET'])
 def get_product(id):
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute('SELECT * FROM products WHERE id = %s', (id,))
+        cache_key = catalog_cache_key('product', id)
+        cached = catalog_cache.get(cache_key)
+        if cached is not None:
+            return conditional_json_response(*cached)
+
+        cursor = get_cursor()
+        cursor.execute('''
+            SELECT p.*, c.name AS category_name
+            FROM products p
+            LEFT JOIN categories c ON c.id = p.category_id
+            WHERE p.id = %s
+        ''', (id,))
         product = cursor.fetchone()
         if not product:
+            cursor.close()
             return jsonify({'message': 'Product not found'}), 404
-        product['category_name'] = get_category_name(product['category_id'])
-        product['category_id'] = product.get('category_id')
-        cursor.execute('SELECT image_url FROM product_images WHERE product_id = %s', (id,))
-        images = cursor.fetchall()
-        product['images'] = [img['image_url'] for img in images] if images else ([product['image']] if product['image'] else [])
-        if product.get('specifications'):
-            try:
-                product['specifications'] = json.loads(product['specifications'])
-            except Exception:
-                product['specifications'] = None
+        images_by_product = fetch_product_images(cursor, [id])
+        format_product(product, images_by_product.get(id))
         cursor.close()
-        return jsonify(product), 200
+        response = jsonify(product)
+        body = response.get_data()
+        etag = json_etag(body)
+        catalog_cache.set(cache_key, (body, etag), {f'product:{id}', f"category:{product['category_id']}"})
+        return conditional_json_response(body, etag)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to fetch product', 'error': str(e)}), 500
 
@@ -239,19 +2216,6 @@ def add_product():
         specifications = request.form.get('specifications')
         images = request.files.getlist('images')
 
-        image_url = None
-        image_urls = []
-
-        # Upload images to Cloudinary
-        if images:
-            for idx, image_file in enumerate(images):
-                if image_file and allowed_file(image_file.filename):
-                    upload_result = cloudinary.uploader.upload(image_file, folder="products/")
-                    url = upload_result['secure_url']
-                    if idx == 0:
-                        image_url = url
-                    image_urls.append(url)
-
         # Validate required fields
         if not all([name, price is not None, category_id, description]):
             return jsonify({'message': 'name, price, category_id, and description are required'}), 400
@@ -263,38 +2227,48 @@ def add_product():
             except Exception:
                 return jsonify({'message': 'specifications must be valid JSON'}), 400
 
-        # Insert product into DB
-        cursor = mysql.connection.cursor()
+        image_files = read_image_files(images)
+
+        # Insert product into DB; images are attached once their uploads finish
+        cursor = get_cursor()
         cursor.execute(
             '''
             INSERT INTO products (name, price, image, category_id, description, rating, full_description, specifications, in_stock, stock_count)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             ''',
-            (name, price, image_url, category_id, description, rating, full_description, specifications, in_stock, stock_count)
+            (name, price, None, category_id, description, rating, full_description, specifications, in_stock, stock_count)
         )
         product_id = cursor.lastrowid
 
-        # Save all image URLs in product_images table
-        for idx, url in enumerate(image_urls):
-            cursor.execute(
-                'INSERT INTO product_images (product_id, image_url, is_primary) VALUES (%s, %s, %s)',
-                (product_id, url, idx == 0)
-            )
-
-        mysql.connection.commit()
+        get_db().commit()
         cursor.close()
+        # A new product changes unfiltered listings, its category's listings
+        # and its category's product count
+        catalog_cache.invalidate('products', f'category-listing:{category_id}', 'categories')
+        reindex_products([product_id])
+
+        if image_files:
+            start_image_uploads(product_id, image_files, replace=False)
+            return jsonify({
+                'id': product_id,
+                'images': [],
+                'image_upload': image_upload_status(product_id)
+            }), 202
 
-        return jsonify({'id': product_id, 'images': image_urls}), 201
+        return jsonify({'id': product_id, 'images': []}), 201
 
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to add product', 'error': str(e)}), 500
 
 @app.route('/products/<int:id>', methods=['PUT', 'PATCH'])
 def update_product(id):
     try:
-        cursor = mysql.connection.cursor()
-        cursor.execute('SELECT id FROM products WHERE id = %s', (id,))
-        if not cursor.fetchone():
+        cursor = get_cursor()
+        cursor.execute('SELECT id, category_id FROM products WHERE id = %s', (id,))
+        existing = cursor.fetchone()
+        if not existing:
             return jsonify({'message': 'Product not found'}), 404
 
         data = request.form
@@ -315,32 +2289,10 @@ def update_product(id):
                 update_fields.append(f"{field} = %s")
                 update_values.append(value)
 
-        # Handle new image uploads
+        # New images are uploaded in the background and attached when done
         images = request.files.getlist('images')
         replace_images = data.get('replace_images', 'false').lower() in ['true', '1', 'yes']
-        image_urls = []
-
-        if images:
-            if replace_images:
-                # Delete old product_images
-                cursor.execute('DELETE FROM product_images WHERE product_id = %s', (id,))
-
-            for idx, image_file in enumerate(images):
-                if image_file and allowed_file(image_file.filename):
-                    upload_result = cloudinary.uploader.upload(image_file, folder="products/")
-                    url = upload_result['secure_url']
-                    image_urls.append(url)
-
-                    # Insert new image into product_images table
-                    cursor.execute(
-                        'INSERT INTO product_images (product_id, image_url, is_primary) VALUES (%s, %s, %s)',
-                        (id, url, idx == 0)
-                    )
-
-            if replace_images and image_urls:
-                # Also update the main image in products table
-                update_fields.append("image = %s")
-                update_values.append(image_urls[0])
+        image_files = read_image_files(images)
 
         # Run update if there are changes
         if update_fields:
@@ -348,28 +2300,237 @@ def update_product(id):
             update_values.append(id)
             cursor.execute(query, update_values)
 
-        mysql.connection.commit()
+        get_db().commit()
         cursor.close()
+        # Only the listings of the categories the product leaves or joins go stale
+        catalog_cache.invalidate(
+            'products', f'product:{id}',
+            f"category-listing:{existing['category_id']}",
+            f"category-listing:{data.get('category_id', existing['category_id'], type=int)}"
+        )
+        reindex_products([id])
+        if 'category_id' in data:
+            # Moving a product changes the product counts of categories
+            catalog_cache.invalidate('categories')
+        if image_files:
+            start_image_uploads(id, image_files, replace=replace_images)
+            return jsonify({
+                'message': 'Product updated successfully',
+                'image_upload': image_upload_status(id)
+            }), 202
         return jsonify({'message': 'Product updated successfully'}), 200
 
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to update product', 'error': str(e)}), 500
 
+@app.route('/products/<int:id>/image-uploads', methods=['GET'])
+def get_image_upload_status(id):
+    status = image_upload_status(id)
+    if status is None:
+        return jsonify({'message': 'No image upload found for this product'}), 404
+    return jsonify(status), 200
+
 def extract_cloudinary_public_id(image_url):
     try:
         parts = image_url.split('/')
-        public_id_with_ext = '/'.join(parts[parts.index('upload') + 1:])
+        parts = parts[parts.index('upload') + 1:]
+        # Skip the version segment (v1234567890) that precedes the public id
+        if parts and re.fullmatch(r'v\d+', parts[0]):
+            parts = parts[1:]
+        public_id_with_ext = '/'.join(parts)
         public_id = '.'.join(public_id_with_ext.split('.')[:-1])
         return public_id
     except Exception:
         return None
+
+# Configure the Cloudinary asset deletion queue
+# Deletions are recorded in the asset_deletions table in the same transaction
+# as the rows that referenced the assets, and a background worker removes them
+app.config['ASSET_DELETION_BATCH_SIZE'] = int(os.getenv('ASSET_DELETION_BATCH_SIZE', 100))  # Cloudinary's per-call limit
+app.config['ASSET_DELETION_MAX_ATTEMPTS'] = int(os.getenv('ASSET_DELETION_MAX_ATTEMPTS', 8))
+app.config['ASSET_DELETION_RETRY_BASE'] = int(os.getenv('ASSET_DELETION_RETRY_BASE', 30))
+app.config['ASSET_DELETION_RETRY_MAX'] = int(os.getenv('ASSET_DELETION_RETRY_MAX', 6 * 3600))
+# Seconds the worker sleeps when the queue is empty
+app.config['ASSET_DELETION_POLL_INTERVAL'] = float(os.getenv('ASSET_DELETION_POLL_INTERVAL', 10))
+# Off for processes that should not drain the queue (CLI checks, tests)
+app.config['ASSET_DELETION_WORKER'] = parse_bool(os.getenv('ASSET_DELETION_WORKER', 'true'))
+# Seconds a claimed batch stays hidden from other workers while it is processed
+ASSET_DELETION_LEASE = 300
+
+asset_deletion_wakeup = threading.Event()
+asset_deletion_worker = None
+asset_deletion_worker_lock = threading.Lock()
+
+def enqueue_asset_deletions(cursor, image_urls):
+    """Queue the Cloudinary assets behind image_urls for deletion; commits with the caller's transaction"""
+    public_ids = sorted({public_id for public_id in map(extract_cloudinary_public_id, image_urls) if public_id})
+    if public_ids:
+        cursor.executemany('INSERT INTO asset_deletions (public_id) VALUES (%s)', [(pid,) for pid in public_ids])
+    return len(public_ids)
+
+def destroy_cloudinary_assets(public_ids):
+    """Delete a batch of assets and return {public_id: status} (swap out in tests to avoid the network)"""
+    return cloudinary.api.delete_resources(public_ids).get('deleted', {})
+
+def asset_deletion_backoff(attempts):
+    delay = min(app.config['ASSET_DELETION_RETRY_BASE'] * 2 ** (attempts - 1), app.config['ASSET_DELETION_RETRY_MAX'])
+    return int(delay * random.uniform(0.75, 1.0))
+
+def claim_asset_deletions():
+    """Lease a batch of due deletions so concurrent workers pick different rows"""
+    conn = db_pool.acquire()
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id, public_id, attempts FROM asset_deletions
+            WHERE dead_lettered_at IS NULL AND next_attempt_at <= NOW()
+            ORDER BY next_attempt_at, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        ''', (app.config['ASSET_DELETION_BATCH_SIZE'],))
+        rows = cursor.fetchall()
+        if rows:
+            format_strings = ','.join(['%s'] * len(rows))
+            cursor.execute(
+                f'UPDATE asset_deletions SET next_attempt_at = DATE_ADD(NOW(), INTERVAL %s SECOND) WHERE id IN ({format_strings})',
+                (ASSET_DELETION_LEASE, *[row['id'] for row in rows])
+            )
+        conn.commit()
+        return rows
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        db_pool.release(conn)
+
+def record_asset_deletions(rows, statuses, error):
+    """Drop finished deletions and reschedule or dead-letter the rest"""
+    done = [row['id'] for row in rows if statuses.get(row['public_id']) in ('deleted', 'not_found')]
+    retries = []
+    dead = []
+    for row in rows:
+        if row['id'] in done:
+            continue
+        attempts = row['attempts'] + 1
+        row_error = error or f"Cloudinary returned {statuses.get(row['public_id'], 'no status')}"
+        if attempts >= app.config['ASSET_DELETION_MAX_ATTEMPTS']:
+            dead.append((attempts, row_error, row['id']))
+        else:
+            retries.append((attempts, row_error, asset_deletion_backoff(attempts), row['id']))
+
+    conn = db_pool.acquire()
+    cursor = conn.cursor()
+    try:
+        if done:
+            format_strings = ','.join(['%s'] * len(done))
+            cursor.execute(f'DELETE FROM asset_deletions WHERE id IN ({format_strings})', tuple(done))
+        if retries:
+            cursor.executemany('''
+                UPDATE asset_deletions
+                SET attempts = %s, last_error = %s, next_attempt_at = DATE_ADD(NOW(), INTERVAL %s SECOND)
+                WHERE id = %s
+            ''', retries)
+        if dead:
+            cursor.executemany(
+                'UPDATE asset_deletions SET attempts = %s, last_error = %s, dead_lettered_at = NOW() WHERE id = %s',
+                dead
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        db_pool.release(conn)
+    for attempts, row_error, row_id in dead:
+        app.logger.error(f"Giving up on Cloudinary asset deletion {row_id} after {attempts} attempts: {row_error}")
+
+def drain_asset_deletions():
+    """Process one batch of due deletions and return how many were claimed"""
+    rows = claim_asset_deletions()
+    if not rows:
+        return 0
+    # No database connection is held during the remote call
+    try:
+        statuses = destroy_cloudinary_assets([row['public_id'] for row in rows])
+        error = None
+    except Exception as e:
+        app.logger.warning(f"Could not delete Cloudinary assets: {e}")
+        statuses = {}
+        error = str(e)
+    record_asset_deletions(rows, statuses, error)
+    return len(rows)
+
+def run_asset_deletion_worker():
+    while True:
+        try:
+            claimed = drain_asset_deletions()
+        except Exception as e:
+            app.logger.error(f"Error draining asset deletion queue: {str(e)}")
+            claimed = 0
+        if claimed < app.config['ASSET_DELETION_BATCH_SIZE']:
+            asset_deletion_wakeup.wait(app.config['ASSET_DELETION_POLL_INTERVAL'])
+            asset_deletion_wakeup.clear()
+
+def ensure_asset_deletion_worker():
+    global asset_deletion_worker
+    if asset_deletion_worker is not None and asset_deletion_worker.is_alive():
+        return
+    with asset_deletion_worker_lock:
+        if asset_deletion_worker is None or not asset_deletion_worker.is_alive():
+            asset_deletion_worker = threading.Thread(target=run_asset_deletion_worker, name='asset-deletions', daemon=True)
+            asset_deletion_worker.start()
+
+@app.before_request
+def start_asset_deletion_worker():
+    if app.config['ASSET_DELETION_WORKER']:
+        ensure_asset_deletion_worker()
+
+@app.route('/assets/deletion-queue', methods=['GET'])
+def get_asset_deletion_queue():
+    try:
+        cursor = get_cursor()
+        cursor.execute('''
+            SELECT
+                SUM(dead_lettered_at IS NULL) AS pending,
+                SUM(dead_lettered_at IS NOT NULL) AS dead_lettered,
+                MIN(CASE WHEN dead_lettered_at IS NULL THEN created_at END) AS oldest_pending
+            FROM asset_deletions
+        ''')
+        stats = cursor.fetchone()
+        cursor.close()
+        return jsonify({
+            'pending': int(stats['pending'] or 0),
+            'dead_lettered': int(stats['dead_lettered'] or 0),
+            'oldest_pending': stats['oldest_pending'].isoformat() if stats['oldest_pending'] else None
+        }), 200
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error fetching asset deletion queue: {str(e)}")
+        return jsonify({'message': 'Failed to fetch asset deletion queue', 'error': str(e)}), 500
+
+@app.cli.command('drain-asset-deletions')
+def drain_asset_deletions_command():
+    """Delete every due Cloudinary asset in the queue and exit"""
+    total = 0
+    while True:
+        claimed = drain_asset_deletions()
+        total += claimed
+        if claimed < app.config['ASSET_DELETION_BATCH_SIZE']:
+            break
+    print(f'Processed {total} queued asset deletions')
+
 @app.route('/products/<int:id>', methods=['DELETE'])
 def delete_product(id):
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
 
         # Get product's main image
-        cursor.execute('SELECT image FROM products WHERE id = %s', (id,))
+        cursor.execute('SELECT image, category_id FROM products WHERE id = %s', (id,))
         product = cursor.fetchone()
         if not product:
             return jsonify({'message': 'Product not found'}), 404
@@ -378,28 +2539,293 @@ def delete_product(id):
         cursor.execute('SELECT image_url FROM product_images WHERE product_id = %s', (id,))
         images = cursor.fetchall()
 
-        # Delete product and images from DB
+        # Delete product and images from DB and queue the Cloudinary assets
+        # for the background worker in the same transaction
+        image_urls = [product['image']] if product['image'] else []
+        image_urls += [img['image_url'] for img in images]
         cursor.execute('DELETE FROM products WHERE id = %s', (id,))
         cursor.execute('DELETE FROM product_images WHERE product_id = %s', (id,))
-        mysql.connection.commit()
+        enqueued = enqueue_asset_deletions(cursor, image_urls)
+        get_db().commit()
         cursor.close()
+        catalog_cache.invalidate('products', f'product:{id}', f"category-listing:{product['category_id']}", 'categories')
+        reindex_products([id])
+        if enqueued:
+            asset_deletion_wakeup.set()
 
-        # Delete all images from Cloudinary
-        image_urls = [product['image']] if product['image'] else []
-        image_urls += [img['image_url'] for img in images]
+        return jsonify({'message': 'Product deleted successfully'}), 200
+
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        return jsonify({'message': 'Failed to delete product', 'error': str(e)}), 500
+
+# Bulk product import
+app.config['IMPORT_MAX_CONTENT_LENGTH'] = int(os.getenv('IMPORT_MAX_CONTENT_LENGTH', 200 * 1024 * 1024))
+app.config['IMPORT_VALIDATION_WORKERS'] = int(os.getenv('IMPORT_VALIDATION_WORKERS', os.cpu_count() or 2))
+IMPORT_COLUMNS = [
+    'id', 'sku', 'name', 'price', 'category_id', 'description', 'rating',
+    'full_description', 'specifications', 'in_stock', 'stock_count'
+]
+IMPORT_REQUIRED_COLUMNS = ['name', 'price', 'category_id', 'description']
+# Rows per executemany; MySQLdb further splits each batch into multi-row
+# INSERT statements that fit its statement size limit
+IMPORT_BATCH_SIZE = 1000
+# Below this much specifications JSON, parsing inline is faster than
+# shipping the strings to worker processes
+IMPORT_PARALLEL_VALIDATION_BYTES = 1024 * 1024
+IMPORT_VALIDATION_CHUNK_SIZE = 2000
+# Imports writing more products than this rebuild the search indexes in the
+# background instead of patching them product by product
+IMPORT_REINDEX_LIMIT = 1000
+MAX_IMPORT_ERRORS = 1000
+
+spec_validation_pool = None
+spec_validation_pool_lock = threading.Lock()
+
+def get_spec_validation_pool():
+    global spec_validation_pool
+    with spec_validation_pool_lock:
+        if spec_validation_pool is None:
+            # forkserver children start from a clean interpreter instead of
+            # inheriting this process's threads and held locks. The fork
+            # server preloads only spec_validation (by default it imports
+            # __main__, which may be app.py); see spec_validation's docstring
+            # for what each worker still imports.
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(['spec_validation'])
+            spec_validation_pool = ProcessPoolExecutor(
+                max_workers=app.config['IMPORT_VALIDATION_WORKERS'],
+                mp_context=context
+            )
+    return spec_validation_pool
+
+def validate_specifications(values):
+    """Parse error (or None) for every specifications value, in worker processes when there is enough JSON"""
+    if sum(len(value) for value in values if value) < IMPORT_PARALLEL_VALIDATION_BYTES:
+        return specification_errors(values)
+    chunks = [values[i:i + IMPORT_VALIDATION_CHUNK_SIZE] for i in range(0, len(values), IMPORT_VALIDATION_CHUNK_SIZE)]
+    errors = []
+    for chunk_errors in get_spec_validation_pool().map(specification_errors, chunks):
+        errors.extend(chunk_errors)
+    return errors
+
+def read_import_records():
+    """
+    [(row number, dict or parse error)] from an uploaded .csv/.ndjson file or
+    a text/csv or application/x-ndjson body. Rows are numbered from 1,
+    not counting the CSV header.
+    """
+    upload = request.files.get('file')
+    if upload:
+        name = upload.filename.lower()
+        fmt = 'ndjson' if name.endswith(('.ndjson', '.jsonl')) else ('csv' if name.endswith('.csv') else None)
+        stream = upload.stream
+    else:
+        fmt = {'text/csv': 'csv', 'application/x-ndjson': 'ndjson', 'application/jsonl': 'ndjson'}.get(request.mimetype)
+        stream = io.BufferedReader(request.stream)
+    if fmt is None:
+        raise ValueError('Upload a .csv or .ndjson file, or send a text/csv or application/x-ndjson body')
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    records = []
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            # Empty CSV cells mean "not given"
+            records.append((number, {k: v for k, v in row.items() if k and v not in (None, '')}))
+    else:
+        number = 0
+        for line in text:
+            if not line.strip():
+                continue
+            number += 1
+            try:
+                row = json.loads(line)
+                records.append((number, row if isinstance(row, dict) else 'Each line must be a JSON object'))
+            except ValueError as e:
+                records.append((number, f'Invalid JSON: {e}'))
+    text.detach()
+    return records
+
+def normalize_import_row(raw, category_ids):
+    """Validated {column: value} for the columns given in one import row; raises ValueError"""
+    row = {column: raw[column] for column in IMPORT_COLUMNS if raw.get(column) is not None}
+    missing = [column for column in IMPORT_REQUIRED_COLUMNS if column not in row]
+    if missing:
+        raise ValueError(f"{', '.join(missing)} required")
+    try:
+        if 'id' in row:
+            row['id'] = int(row['id'])
+        row['price'] = float(row['price'])
+        row['category_id'] = int(row['category_id'])
+        if 'rating' in row:
+            row['rating'] = float(row['rating'])
+        if 'stock_count' in row:
+            row['stock_count'] = int(row['stock_count'])
+    except (TypeError, ValueError):
+        raise ValueError('id, price, category_id, rating and stock_count must be numbers')
+    if row['price'] < 0:
+        raise ValueError('price must not be negative')
+    if row['category_id'] not in category_ids:
+        raise ValueError(f"Unknown category_id {row['category_id']}")
+    for column in ('sku', 'name', 'description', 'full_description'):
+        if column in row:
+            row[column] = str(row[column]).strip()
+    if row.get('sku') == '':
+        del row['sku']
+    # Without a key a re-imported row would insert the product again
+    if 'id' not in row and 'sku' not in row:
+        raise ValueError('id or sku required')
+    if not row['name']:
+        raise ValueError('name must not be empty')
+    if 'in_stock' in row:
+        row['in_stock'] = parse_bool(row['in_stock'])
+    if 'specifications' in row and not isinstance(row['specifications'], str):
+        # NDJSON rows may carry specifications as an object
+        row['specifications'] = json.dumps(row['specifications'])
+    return row
+
+def import_key_conflicts(cursor, records):
+    """
+    {row number: error} for rows whose id and sku point at different
+    products, either in the database or in an earlier row of the import.
+    ON DUPLICATE KEY UPDATE would otherwise update whichever product MySQL
+    finds first.
+    """
+    skus = list({row['sku'] for _, row in records if 'sku' in row})
+    owners = {}
+    for batch in chunked(skus):
+        format_strings = ','.join(['%s'] * len(batch))
+        cursor.execute(f'SELECT id, sku FROM products WHERE sku IN ({format_strings})', tuple(batch))
+        owners.update((row['sku'], row['id']) for row in cursor.fetchall())
+    conflicts = {}
+    first_rows = {}  # sku -> (row number, product id) of its first row
+    for number, row in records:
+        if 'sku' not in row:
+            continue
+        owner = owners.get(row['sku'])
+        if 'id' in row and owner is not None and owner != row['id']:
+            conflicts[number] = f"sku {row['sku']} belongs to product {owner}, not {row['id']}"
+            continue
+        # None stands for the product a new sku creates
+        product_id = row['id'] if 'id' in row else owner
+        first_number, first_id = first_rows.setdefault(row['sku'], (number, product_id))
+        if first_id != product_id:
+            conflicts[number] = f"sku {row['sku']} is given for a different product in row {first_number}"
+    return conflicts
 
-        for url in image_urls:
-            public_id = extract_cloudinary_public_id(url)
-            if public_id:
+def upsert_product_rows(cursor, columns, rows):
+    """
+    Insert rows, updating the product with the same id or sku when there is
+    one. Returns the MySQL affected-row count.
+    """
+    # A row matched by id may change the product's sku
+    updates = ', '.join(f'{column} = VALUES({column})' for column in columns if column != 'id')
+    cursor.executemany(f'''
+        INSERT INTO products ({', '.join(columns)})
+        VALUES ({', '.join(['%s'] * len(columns))})
+        ON DUPLICATE KEY UPDATE {updates}
+    ''', [tuple(row[column] for column in columns) for row in rows])
+    return cursor.rowcount
+
+def reindex_imported_products(cursor, rows):
+    """Patch the search indexes for a small import, or rebuild them in the background for a large one"""
+    if len(rows) <= IMPORT_REINDEX_LIMIT:
+        product_ids = {row['id'] for row in rows if 'id' in row}
+        skus = list({row['sku'] for row in rows if 'id' not in row})
+        for batch in chunked(skus):
+            format_strings = ','.join(['%s'] * len(batch))
+            cursor.execute(f'SELECT id FROM products WHERE sku IN ({format_strings})', tuple(batch))
+            product_ids.update(row['id'] for row in cursor.fetchall())
+        reindex_products(sorted(product_ids))
+        return
+    for index, load in ((search_index, load_search_index), (product_suggest_index, load_suggest_index), (facet_index, load_facet_index)):
+        if index.built_at is not None:
+            index.refresh_in_background(load)
+
+@app.route('/products/import', methods=['POST'])
+def import_products():
+    try:
+        try:
+            records = read_import_records()
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        cursor = get_cursor()
+        cursor.execute('SELECT id FROM categories')
+        category_ids = {row['id'] for row in cursor.fetchall()}
+
+        errors = []
+        valid = []
+        for number, raw in records:
+            if isinstance(raw, str):
+                errors.append({'row': number, 'error': raw})
+                continue
+            try:
+                valid.append((number, normalize_import_row(raw, category_ids)))
+            except ValueError as e:
+                errors.append({'row': number, 'error': str(e)})
+
+        spec_errors = validate_specifications([row.get('specifications') for _, row in valid])
+        checked = []
+        for (number, row), spec_error in zip(valid, spec_errors):
+            if spec_error:
+                errors.append({'row': number, 'error': f'specifications must be valid JSON: {spec_error}'})
+            else:
+                checked.append((number, row))
+
+        conflicts = import_key_conflicts(cursor, checked)
+        errors.extend({'row': number, 'error': conflicts[number]} for number, _ in checked if number in conflicts)
+        checked = [(number, row) for number, row in checked if number not in conflicts]
+
+        # Rows giving the same columns share one statement shape
+        groups = {}
+        for number, row in checked:
+            columns = tuple(column for column in IMPORT_COLUMNS if column in row)
+            groups.setdefault(columns, []).append((number, row))
+
+        conn = get_db()
+        written = []
+        for columns, group in groups.items():
+            for batch in chunked(group, IMPORT_BATCH_SIZE):
                 try:
-                    cloudinary.uploader.destroy(public_id)
-                except Exception as err:
-                    app.logger.warning(f"Could not delete Cloudinary image {public_id}: {err}")
+                    upsert_product_rows(cursor, columns, [row for _, row in batch])
+                    conn.commit()
+                    written.extend(row for _, row in batch)
+                except MySQLdb.Error:
+                    conn.rollback()
+                    # Retry the batch row by row to find out which rows the database rejects
+                    for number, row in batch:
+                        try:
+                            upsert_product_rows(cursor, columns, [row])
+                            conn.commit()
+                            written.append(row)
+                        except MySQLdb.Error as e:
+                            conn.rollback()
+                            errors.append({'row': number, 'error': str(e)})
 
-        return jsonify({'message': 'Product deleted successfully'}), 200
+        if written:
+            # Updated rows may have left categories the import does not name
+            catalog_cache.invalidate(
+                'products', 'categories', *[f'category-listing:{category_id}' for category_id in category_ids]
+            )
+            reindex_imported_products(cursor, written)
+        cursor.close()
 
+        errors.sort(key=lambda error: error['row'])
+        return jsonify({
+            'received': len(records),
+            'upserted': len(written),
+            'failed': len(errors),
+            'errors': errors[:MAX_IMPORT_ERRORS],
+            'errors_truncated': len(errors) > MAX_IMPORT_ERRORS,
+            'success': not errors
+        }), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
-        return jsonify({'message': 'Failed to delete product', 'error': str(e)}), 500
+        app.logger.error(f"Error importing products: {str(e)}")
+        return jsonify({'message': 'Failed to import products', 'error': str(e)}), 500
 
 @app.route('/products/check-stock', methods=['POST'])
 def check_product_stock():
@@ -431,7 +2857,9 @@ def check_product_stock():
         if not id_list:
             return jsonify({'message': 'No valid product IDs provided'}), 400
 
-        cursor = mysql.connection.cursor()
+        # Advisory check only: create_order and /products/reserve re-check
+        # stock under row locks before taking units
+        cursor = get_cursor()
         format_strings = ','.join(['%s'] * len(id_list))
         query = f'SELECT id, name, stock_count, in_stock FROM products WHERE id IN ({format_strings})'
         cursor.execute(query, tuple(id_list))
@@ -472,9 +2900,216 @@ def check_product_stock():
 
         return jsonify(result), 200
 
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to check product stock', 'error': str(e)}), 500
 
+# Stock reservation helpers
+# Holds take units out of products.stock_count as soon as they are granted,
+# so stock_count is always the number of units still available to sell.
+# A hold that is not turned into an order before it expires gives its units back.
+STOCK_RESERVATION_TTL = int(os.getenv('STOCK_RESERVATION_TTL', 900))  # 15 minutes
+MAX_STOCK_RESERVATION_TTL = 3600
+EXPIRED_RESERVATION_BATCH_SIZE = 500
+
+def adjust_stock_locked(cursor, deltas):
+    """
+    Take {product_id: units} out of stock inside the caller's transaction
+    (negative units are given back).
+
+    The product rows are locked with SELECT ... FOR UPDATE in ascending id
+    order, so concurrent checkouts acquire locks in the same order and
+    cannot deadlock, and only checkouts sharing a product wait on each other.
+    Returns the list of shortages; when it is non-empty nothing was changed.
+    """
+    product_ids = sorted(deltas)
+    if not product_ids:
+        return []
+    format_strings = ','.join(['%s'] * len(product_ids))
+    cursor.execute(
+        f'SELECT id, name, stock_count, in_stock FROM products WHERE id IN ({format_strings}) ORDER BY id FOR UPDATE',
+        tuple(product_ids)
+    )
+    rows = {row['id']: row for row in cursor.fetchall()}
+
+    shortages = []
+    for pid in product_ids:
+        requested = deltas[pid]
+        if requested <= 0:
+            continue
+        product = rows.get(pid)
+        if not product or not product['in_stock'] or product['stock_count'] < requested:
+            shortages.append({
+                'id': pid,
+                'name': product['name'] if product else None,
+                'requested': requested,
+                'available': product['stock_count'] if product else 0
+            })
+    if shortages:
+        return shortages
+
+    changes = {pid: units for pid, units in deltas.items() if units and pid in rows}
+    if changes:
+        case_sql = ' '.join(['WHEN %s THEN %s'] * len(changes))
+        case_params = [value for pair in changes.items() for value in pair]
+        format_strings = ','.join(['%s'] * len(changes))
+        cursor.execute(f'''
+            UPDATE products SET stock_count = stock_count - CASE id {case_sql} END
+            WHERE id IN ({format_strings})
+        ''', tuple(case_params) + tuple(changes))
+    return []
+
+def release_reservation_rows(cursor, rows):
+    """
+    Give the units of the given (locked) reservation rows back to stock and
+    delete them. Returns the ids of the products whose stock changed.
+    """
+    if not rows:
+        return []
+    returned = {}
+    for row in rows:
+        returned[row['product_id']] = returned.get(row['product_id'], 0) - row['quantity']
+    adjust_stock_locked(cursor, returned)
+    format_strings = ','.join(['%s'] * len(rows))
+    cursor.execute(
+        f'DELETE FROM stock_reservations WHERE id IN ({format_strings})',
+        tuple(row['id'] for row in rows)
+    )
+    return list(returned)
+
+def release_expired_reservations(conn):
+    """
+    Return the units of expired holds to stock in a short transaction of its own.
+    SKIP LOCKED lets concurrent workers release different holds without
+    waiting on each other or on holds being turned into orders.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute('''
+            SELECT id, product_id, quantity FROM stock_reservations
+            WHERE expires_at <= NOW()
+            ORDER BY expires_at, id
+            LIMIT %s
+            FOR UPDATE SKIP LOCKED
+        ''', (EXPIRED_RESERVATION_BATCH_SIZE,))
+        released_ids = release_reservation_rows(cursor, cursor.fetchall())
+        conn.commit()
+        if released_ids:
+            catalog_cache.invalidate('stock', *[f'product:{pid}' for pid in released_ids])
+            refresh_product_facets(cursor, released_ids)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+def parse_stock_items(items):
+    """Sum {product_id: quantity} from request items, accepting productId or product_id"""
+    quantities = {}
+    for item in items:
+        pid = item.get('productId', item.get('product_id'))
+        qty = item.get('quantity', 1)
+        pid_int = int(pid)
+        qty_int = int(qty)
+        if pid_int <= 0 or qty_int <= 0:
+            raise ValueError('Product ids and quantities must be positive')
+        quantities[pid_int] = quantities.get(pid_int, 0) + qty_int
+    return quantities
+
+@app.route('/products/reserve', methods=['POST'])
+def reserve_stock():
+    conn = None
+    cursor = None
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('items'), list) or not data['items']:
+            return jsonify({'message': 'No items provided'}), 400
+        try:
+            quantities = parse_stock_items(data['items'])
+            ttl = int(data.get('ttl_seconds', STOCK_RESERVATION_TTL))
+        except (ValueError, TypeError):
+            return jsonify({'message': 'Invalid product id, quantity or ttl_seconds'}), 400
+        if ttl <= 0:
+            return jsonify({'message': 'ttl_seconds must be positive'}), 400
+        ttl = min(ttl, MAX_STOCK_RESERVATION_TTL)
+
+        conn = get_db()
+        release_expired_reservations(conn)
+
+        cursor = conn.cursor()
+        shortages = adjust_stock_locked(cursor, quantities)
+        if shortages:
+            conn.rollback()
+            return jsonify({'message': 'Insufficient stock', 'out_of_stock': shortages}), 409
+
+        reservation_token = secrets.token_urlsafe(24)
+        cursor.executemany('''
+            INSERT INTO stock_reservations (reservation_token, product_id, quantity, expires_at)
+            VALUES (%s, %s, %s, DATE_ADD(NOW(), INTERVAL %s SECOND))
+        ''', [(reservation_token, pid, qty, ttl) for pid, qty in sorted(quantities.items())])
+        cursor.execute(
+            'SELECT MIN(expires_at) AS expires_at FROM stock_reservations WHERE reservation_token = %s',
+            (reservation_token,)
+        )
+        expires_at = cursor.fetchone()['expires_at']
+        conn.commit()
+        catalog_cache.invalidate('stock', *[f'product:{pid}' for pid in quantities])
+        refresh_product_facets(cursor, quantities)
+
+        return jsonify({
+            'reservation_token': reservation_token,
+            'expires_at': expires_at.isoformat() if expires_at else None,
+            'items': [{'product_id': pid, 'quantity': qty} for pid, qty in sorted(quantities.items())]
+        }), 201
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error reserving stock: {str(e)}")
+        if conn:
+            try:
+                conn.rollback()
+            except Exception as rollback_error:
+                app.logger.error(f"Error during rollback: {str(rollback_error)}")
+        return jsonify({'message': 'Failed to reserve stock', 'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+
+@app.route('/reservations/<string:reservation_token>', methods=['DELETE'])
+def release_stock_reservation(reservation_token):
+    conn = None
+    cursor = None
+    try:
+        conn = get_db()
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id, product_id, quantity FROM stock_reservations WHERE reservation_token = %s ORDER BY id FOR UPDATE',
+            (reservation_token,)
+        )
+        rows = cursor.fetchall()
+        if not rows:
+            conn.rollback()
+            return jsonify({'message': 'Reservation not found'}), 404
+        released_ids = release_reservation_rows(cursor, rows)
+        conn.commit()
+        catalog_cache.invalidate('stock', *[f'product:{pid}' for pid in released_ids])
+        refresh_product_facets(cursor, released_ids)
+        return jsonify({'message': 'Reservation released'}), 200
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error releasing reservation: {str(e)}")
+        if conn:
+            try:
+                conn.rollback()
+            except Exception as rollback_error:
+                app.logger.error(f"Error during rollback: {str(rollback_error)}")
+        return jsonify({'message': 'Failed to release reservation', 'error': str(e)}), 500
+    finally:
+        if cursor:
+            cursor.close()
+
 # Category Management Routes
 # Helper: Get product count for a category
 # --- Image upload endpoint ---
@@ -485,22 +3120,27 @@ def upload_image():
     file = request.files['image']
     if file.filename == '':
         return jsonify({'message': 'No selected file'}), 400
-    filename = secure_filename(file.filename)
-    save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(save_path)
+    if not allowed_file(file.filename):
+        return jsonify({'message': 'File type not allowed'}), 400
+    try:
+        filename, created = store_upload(file)
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error storing upload: {str(e)}")
+        return jsonify({'message': 'Failed to store upload', 'error': str(e)}), 500
+    if created:
+        image_derivative_executor.submit(generate_all_derivatives, upload_path(filename))
     url = f'http://127.0.0.1:5000/static/uploads/{filename}'
-    return jsonify({'url': url}), 200
+    return jsonify({
+        'url': url,
+        'thumbnail': responsive_image_url(url, app.config['PRODUCT_THUMBNAIL_WIDTH']),
+        'deduplicated': not created
+    }), 200
 
 # --- CRUD endpoints for categories ---
-def get_product_count(category_id):
-    cursor = mysql.connection.cursor()
-    cursor.execute('SELECT COUNT(*) as count FROM products WHERE category_id = %s', (category_id,))
-    result = cursor.fetchone()
-    cursor.close()
-    return result['count'] if result and 'count' in result else 0
-
 def get_category_name(category_id):
-    cursor = mysql.connection.cursor()
+    cursor = get_cursor()
     cursor.execute('SELECT name FROM categories WHERE id = %s', (category_id,))
     result = cursor.fetchone()
     cursor.close()
@@ -508,12 +3148,26 @@ def get_category_name(category_id):
 
 @app.route('/categories', methods=['GET'])
 def get_categories():
-    cursor = mysql.connection.cursor()
-    cursor.execute('SELECT * FROM categories')
+    cache_key = catalog_cache_key('categories')
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return conditional_json_response(*cached)
+
+    cursor = get_cursor()
+    # Product counts for every category come from one grouped query
+    cursor.execute('''
+        SELECT c.*, COALESCE(pc.product_count, 0) AS productCount
+        FROM categories c
+        LEFT JOIN (
+            SELECT category_id, COUNT(*) AS product_count
+            FROM products
+            GROUP BY category_id
+        ) pc ON pc.category_id = c.id
+        ORDER BY c.id
+    ''')
     categories = cursor.fetchall()
     cursor.close()
     for category in categories:
-        category['productCount'] = get_product_count(category['id'])
         # Default/fix icon if not set or invalid
         if not category.get('icon') or category['icon'] in ('?', '????'):
             # Try to assign a default by name
@@ -525,7 +3179,15 @@ def get_categories():
                 category['icon'] = '🏠'
             else:
                 category['icon'] = '🛒'
-    return jsonify({'data': categories, 'success': True}), 200
+    response = jsonify({'data': categories, 'success': True})
+    body = response.get_data()
+    etag = json_etag(body)
+    catalog_cache.set(cache_key, (body, etag), {'categories'})
+    return conditional_json_response(body, etag)
+
+@app.route('/catalog/cache-stats', methods=['GET'])
+def get_catalog_cache_stats():
+    return jsonify(catalog_cache.stats()), 200
 
 @app.route('/categories', methods=['POST'])
 def add_category():
@@ -536,13 +3198,17 @@ def add_category():
     icon = data.get('icon', '🛒')
     if not name or not name.strip():
         return jsonify({'message': 'Category name is required', 'success': False}), 400
-    cursor = mysql.connection.cursor()
+    cursor = get_cursor()
     cursor.execute(
         'INSERT INTO categories (name, description, image, icon) VALUES (%s, %s, %s, %s)',
         (name.strip(), description.strip(), image.strip(), icon.strip())
     )
-    mysql.connection.commit()
+    category_id = cursor.lastrowid
+    retain_upload_refs(cursor, [image.strip()])
+    get_db().commit()
     cursor.close()
+    catalog_cache.invalidate('categories')
+    refresh_category_suggestion(category_id)
     return jsonify({'message': 'Category added', 'success': True}), 201
 
 @app.route('/categories/<int:id>', methods=['PUT'])
@@ -554,19 +3220,34 @@ def update_category(id):
     icon = data.get('icon', '🛒')
     if not name or not name.strip():
         return jsonify({'message': 'Category name is required', 'success': False}), 400
-    cursor = mysql.connection.cursor()
+    cursor = get_cursor()
+    cursor.execute('SELECT image FROM categories WHERE id=%s FOR UPDATE', (id,))
+    previous = cursor.fetchone()
     cursor.execute('UPDATE categories SET name=%s, description=%s, image=%s, icon=%s WHERE id=%s',
                    (name.strip(), description.strip(), image.strip(), icon.strip(), id))
-    mysql.connection.commit()
+    # The category moves its reference from the replaced image's upload to the new one
+    if previous and previous['image'] != image.strip():
+        retain_upload_refs(cursor, [image.strip()])
+        release_uploads(cursor, [previous['image']])
+    else:
+        get_db().commit()
     cursor.close()
+    # Products embed the category name, so only that category's products go stale
+    catalog_cache.invalidate('categories', f'category:{id}')
+    refresh_category_suggestion(id)
     return jsonify({'message': 'Category updated', 'success': True}), 200
 
 @app.route('/categories/<int:id>', methods=['DELETE'])
 def delete_category(id):
-    cursor = mysql.connection.cursor()
+    cursor = get_cursor()
+    cursor.execute('SELECT image FROM categories WHERE id=%s FOR UPDATE', (id,))
+    previous = cursor.fetchone()
     cursor.execute('DELETE FROM categories WHERE id=%s', (id,))
-    mysql.connection.commit()
+    release_uploads(cursor, [previous['image']] if previous else [])
     cursor.close()
+    # Its products lose their category_id, so listings filtered on it empty out
+    catalog_cache.invalidate('categories', f'category:{id}', f'category-listing:{id}')
+    refresh_category_suggestion(id)
     return jsonify({'message': 'Category deleted', 'success': True}), 200
 
 
@@ -574,12 +3255,14 @@ def delete_category(id):
 @app.route('/users', methods=['GET'])
 def get_users():
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         # Don't return password hashes in the API response
         cursor.execute('SELECT id, username, email FROM users')
         users = cursor.fetchall()
         cursor.close()
         return jsonify(users), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to fetch users', 'error': str(e)}), 500
 
@@ -602,7 +3285,7 @@ def add_user():
         return jsonify({'message': 'Password must be at least 6 characters long'}), 400
 
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         
         # Check if email already exists
         cursor.execute('SELECT id FROM users WHERE email = %s', (email,))
@@ -616,26 +3299,30 @@ def add_user():
             'INSERT INTO users (username, email, password) VALUES (%s, %s, %s)',
             (username, email, hashed_password)
         )
-        mysql.connection.commit()
+        get_db().commit()
         user_id = cursor.lastrowid
         cursor.close()
         return jsonify({'message': 'User added', 'id': user_id}), 201
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to add user', 'error': str(e)}), 500
 
 @app.route('/users/<int:id>', methods=['DELETE'])
 def delete_user(id):
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         # Check if user exists
         cursor.execute('SELECT id FROM users WHERE id = %s', (id,))
         if not cursor.fetchone():
             return jsonify({'message': 'User not found'}), 404
             
         cursor.execute('DELETE FROM users WHERE id = %s', (id,))
-        mysql.connection.commit()
+        get_db().commit()
         cursor.close()
         return jsonify({'message': 'User deleted'}), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to delete user', 'error': str(e)}), 500
 
@@ -643,11 +3330,13 @@ def delete_user(id):
 @app.route('/roles', methods=['GET'])
 def get_roles():
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         cursor.execute('SELECT * FROM roles')
         roles = cursor.fetchall()
         cursor.close()
         return jsonify(roles), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to fetch roles', 'error': str(e)}), 500
 
@@ -662,15 +3351,17 @@ def add_role():
         return jsonify({'message': 'Name and description are required'}), 400
 
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         cursor.execute(
             'INSERT INTO roles (name, description) VALUES (%s, %s)',
             (name, description)
         )
-        mysql.connection.commit()
+        get_db().commit()
         role_id = cursor.lastrowid
         cursor.close()
         return jsonify({'message': 'Role added', 'id': role_id}), 201
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to add role', 'error': str(e)}), 500
 
@@ -678,11 +3369,13 @@ def add_role():
 @app.route('/roles/<int:id>', methods=['DELETE'])
 def delete_role(id):
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         cursor.execute('DELETE FROM roles WHERE id = %s', (id,))
-        mysql.connection.commit()
+        get_db().commit()
         cursor.close()
         return jsonify({'message': 'Role deleted'}), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to delete role', 'error': str(e)}), 500
     
@@ -690,11 +3383,13 @@ def delete_role(id):
 @app.route('/sales', methods=['GET'])
 def get_sales():
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         cursor.execute('SELECT * FROM sales')
         sales = cursor.fetchall()
         cursor.close()
         return jsonify(sales), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to fetch sales', 'error': str(e)}), 500
 
@@ -710,15 +3405,19 @@ def add_sale():
         return jsonify({'message': 'Product ID, quantity, and total price are required'}), 400
 
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         cursor.execute(
             'INSERT INTO sales (product_id, quantity, total_price) VALUES (%s, %s, %s)',
             (product_id, quantity, total_price)
         )
-        mysql.connection.commit()
         sale_id = cursor.lastrowid
+        record_sales_rollup(cursor, [(product_id, quantity, total_price)])
+        get_db().commit()
         cursor.close()
+        catalog_cache.invalidate('sales')
         return jsonify({'message': 'Sale added', 'id': sale_id}), 201
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to add sale', 'error': str(e)}), 500
 
@@ -726,20 +3425,368 @@ def add_sale():
 @app.route('/sales/<int:id>', methods=['DELETE'])
 def delete_sale(id):
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
+        cursor.execute(
+            'SELECT product_id, quantity, total_price, DATE(sold_at) AS day FROM sales WHERE id = %s FOR UPDATE',
+            (id,)
+        )
+        sale = cursor.fetchone()
+        if not sale:
+            return jsonify({'message': 'Sale not found'}), 404
         cursor.execute('DELETE FROM sales WHERE id = %s', (id,))
-        mysql.connection.commit()
+        record_sales_rollup(cursor, [(sale['product_id'], sale['quantity'], sale['total_price'])], day=sale['day'], sign=-1)
+        get_db().commit()
         cursor.close()
+        catalog_cache.invalidate('sales')
         return jsonify({'message': 'Sale deleted'}), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to delete sale', 'error': str(e)}), 500
 
+# Sales analytics
+# Revenue is merchandise revenue: order item totals plus sales recorded
+# through POST /sales, before discounts, tax and shipping. Cancelled and
+# refunded orders are taken out when they reach that status (and put back
+# if they leave it). Both sources are folded into per-day rollups in the
+# transaction that records them, so the endpoints below never scan sales
+# or order_items.
+ANALYTICS_GRANULARITIES = ('day', 'week', 'month')
+MAX_ANALYTICS_RANGE_DAYS = 3 * 366
+DEFAULT_ANALYTICS_RANGE_DAYS = 30
+# Every rollup key is split over this many rows (the shard column) and each
+# write picks one at random, so concurrent checkouts on the same day rarely
+# wait on the same row lock. Readers sum the shards.
+app.config['ROLLUP_SHARDS'] = int(os.getenv('ROLLUP_SHARDS', 8))
+
+def rollup_shard():
+    return random.randrange(app.config['ROLLUP_SHARDS'])
+
+def record_sales_rollup(cursor, lines, day=None, sign=1, orders=1):
+    """
+    Fold the lines [(product_id, units, revenue)] of `orders` orders or sales
+    into the rollups; sign=-1 takes them out again. day=None uses the
+    database's current date, which is what orders.created_at and
+    sales.sold_at are stamped with.
+    """
+    if not lines:
+        return
+    day_sql = 'CURDATE()' if day is None else '%s'
+    day_params = () if day is None else (day,)
+    shard = rollup_shard()
+    totals = {}
+    for product_id, units, revenue in lines:
+        product_id = int(product_id)
+        prev_units, prev_revenue, prev_lines = totals.get(product_id, (0, Decimal('0'), 0))
+        totals[product_id] = (prev_units + int(units), prev_revenue + Decimal(str(revenue)), prev_lines + 1)
+    # Product rows are locked in id order so concurrent writers cannot deadlock
+    cursor.executemany(f'''
+        INSERT INTO product_sales_rollups (day, product_id, shard, units, revenue, line_count)
+        VALUES ({day_sql}, %s, %s, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE
+            units = units + VALUES(units),
+            revenue = revenue + VALUES(revenue),
+            line_count = line_count + VALUES(line_count)
+    ''', [
+        (*day_params, product_id, shard, sign * units, sign * revenue, sign * line_count)
+        for product_id, (units, revenue, line_count) in sorted(totals.items())
+    ])
+    cursor.execute(f'''
+        INSERT INTO sales_daily_rollups (day, shard, order_count, revenue)
+        VALUES ({day_sql}, %s, %s, %s)
+        ON DUPLICATE KEY UPDATE order_count = order_count + VALUES(order_count), revenue = revenue + VALUES(revenue)
+    ''', (*day_params, shard, sign * orders, sign * sum(revenue for _, revenue, _ in totals.values())))
+
+def move_order_sales(cursor, orders, sign):
+    """Take the items of orders (rows with id and day) out of the sales rollups, or put them back with sign=1"""
+    days = {order['id']: order['day'] for order in orders}
+    lines_by_day = {}
+    orders_by_day = {}
+    for batch in chunked(list(days)):
+        format_strings = ','.join(['%s'] * len(batch))
+        cursor.execute(
+            f'SELECT order_id, product_id, quantity, total_price FROM order_items WHERE order_id IN ({format_strings})',
+            tuple(batch)
+        )
+        for row in cursor.fetchall():
+            day = days[row['order_id']]
+            lines_by_day.setdefault(day, []).append((row['product_id'], row['quantity'], row['total_price']))
+            orders_by_day.setdefault(day, set()).add(row['order_id'])
+    # Days in order, so writers touching several days lock their rows in the same order
+    for day in sorted(lines_by_day):
+        record_sales_rollup(cursor, lines_by_day[day], day=day, sign=sign, orders=len(orders_by_day[day]))
+
+def parse_analytics_range():
+    """(start, end) dates from ?start=&end= (YYYY-MM-DD, inclusive), defaulting to the last 30 days"""
+    try:
+        end = datetime.date.fromisoformat(request.args['end']) if request.args.get('end') else datetime.date.today()
+        start = (datetime.date.fromisoformat(request.args['start']) if request.args.get('start')
+                 else end - datetime.timedelta(days=DEFAULT_ANALYTICS_RANGE_DAYS - 1))
+    except ValueError:
+        raise ValueError('start and end must be dates in YYYY-MM-DD format')
+    if start > end:
+        raise ValueError('start must not be after end')
+    if (end - start).days >= MAX_ANALYTICS_RANGE_DAYS:
+        raise ValueError(f'The date range may span at most {MAX_ANALYTICS_RANGE_DAYS} days')
+    return start, end
+
+def period_starts(days, granularity):
+    """Map datetime64[D] days to the first day of their day/week/month; weeks start on Monday"""
+    if granularity == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    if granularity == 'week':
+        # 1970-01-01 was a Thursday
+        return days - ((days.astype('int64') + 3) % 7).astype('timedelta64[D]')
+    return days
+
+def group_sums(keys, *values):
+    """Unique keys and the sum of each value array per key"""
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, [np.bincount(inverse, weights=v, minlength=len(unique)) for v in values]
+
+def load_product_sales(cursor, start, end):
+    cursor.execute(
+        'SELECT day, product_id, units, revenue FROM product_sales_rollups WHERE day BETWEEN %s AND %s',
+        (start, end)
+    )
+    rows = cursor.fetchall()
+    return (
+        np.array([row['day'] for row in rows], dtype='datetime64[D]'),
+        np.array([row['product_id'] for row in rows], dtype=np.int64),
+        np.array([row['units'] for row in rows], dtype=np.float64),
+        np.array([row['revenue'] for row in rows], dtype=np.float64),
+    )
+
+def load_daily_orders(cursor, start, end):
+    cursor.execute(
+        'SELECT day, order_count, revenue FROM sales_daily_rollups WHERE day BETWEEN %s AND %s',
+        (start, end)
+    )
+    rows = cursor.fetchall()
+    return (
+        np.array([row['day'] for row in rows], dtype='datetime64[D]'),
+        np.array([row['order_count'] for row in rows], dtype=np.float64),
+        np.array([row['revenue'] for row in rows], dtype=np.float64),
+    )
+
+def average_order_value(revenue, orders):
+    return round(float(revenue) / float(orders), 2) if orders else 0.0
+
+def sales_revenue_series(cursor, start, end):
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ANALYTICS_GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(ANALYTICS_GRANULARITIES)}")
+    days, _, units, _ = load_product_sales(cursor, start, end)
+    order_days, order_counts, revenue = load_daily_orders(cursor, start, end)
+
+    # Every period in the range is listed, including those without sales
+    periods = np.unique(period_starts(np.arange(start, end + datetime.timedelta(days=1), dtype='datetime64[D]'), granularity))
+    unit_periods, (unit_sums,) = group_sums(period_starts(days, granularity), units)
+    order_periods, (order_sums, revenue_sums) = group_sums(period_starts(order_days, granularity), order_counts, revenue)
+    period_units = np.zeros(len(periods))
+    period_units[np.searchsorted(periods, unit_periods)] = unit_sums
+    period_orders = np.zeros(len(periods))
+    period_revenue = np.zeros(len(periods))
+    positions = np.searchsorted(periods, order_periods)
+    period_orders[positions] = order_sums
+    period_revenue[positions] = revenue_sums
+
+    return {
+        'granularity': granularity,
+        'data': [
+            {
+                'period': str(periods[i]),
+                'revenue': round(float(period_revenue[i]), 2),
+                'orders': int(period_orders[i]),
+                'units': int(period_units[i]),
+                'average_order_value': average_order_value(period_revenue[i], period_orders[i])
+            }
+            for i in range(len(periods))
+        ]
+    }
+
+def product_details(cursor, product_ids):
+    """{product_id: row} with name and category of the given products, read in batches"""
+    details = {}
+    for batch in chunked(list(product_ids), IN_CLAUSE_BATCH_SIZE):
+        format_strings = ','.join(['%s'] * len(batch))
+        cursor.execute(f'''
+            SELECT p.id, p.name, p.category_id, c.name AS category_name
+            FROM products p
+            LEFT JOIN categories c ON c.id = p.category_id
+            WHERE p.id IN ({format_strings})
+        ''', tuple(batch))
+        details.update({row['id']: row for row in cursor.fetchall()})
+    return details
+
+def sales_by_product(cursor, start, end):
+    sort = request.args.get('sort', 'revenue')
+    if sort not in ('revenue', 'units'):
+        raise ValueError('sort must be revenue or units')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 100)
+    _, product_ids, units, revenue = load_product_sales(cursor, start, end)
+    ids, (unit_sums, revenue_sums) = group_sums(product_ids, units, revenue)
+    ranking = unit_sums if sort == 'units' else revenue_sums
+    # argpartition finds the top N without sorting every product
+    if len(ids) > limit:
+        top = np.argpartition(-ranking, limit - 1)[:limit]
+    else:
+        top = np.arange(len(ids))
+    top = top[np.lexsort((ids[top], -ranking[top]))]
+    details = product_details(cursor, ids[top].tolist())
+    return {
+        'sort': sort,
+        'data': [
+            {
+                'product_id': int(ids[i]),
+                'name': details.get(int(ids[i]), {}).get('name'),
+                'category_id': details.get(int(ids[i]), {}).get('category_id'),
+                'units': int(unit_sums[i]),
+                'revenue': round(float(revenue_sums[i]), 2)
+            }
+            for i in top
+        ]
+    }
+
+def sales_by_category(cursor, start, end):
+    _, product_ids, units, revenue = load_product_sales(cursor, start, end)
+    ids, (unit_sums, revenue_sums) = group_sums(product_ids, units, revenue)
+    details = product_details(cursor, ids.tolist())
+    # Products that no longer exist or have no category are grouped under -1
+    categories = np.array([details.get(int(pid), {}).get('category_id') or -1 for pid in ids], dtype=np.int64)
+    category_ids, (category_units, category_revenue) = group_sums(categories, unit_sums, revenue_sums)
+    names = {row['category_id']: row['category_name'] for row in details.values()}
+    order = np.argsort(-category_revenue, kind='stable')
+    return {
+        'data': [
+            {
+                'category_id': int(category_ids[i]) if category_ids[i] != -1 else None,
+                'name': names.get(int(category_ids[i])) if category_ids[i] != -1 else 'Uncategorized',
+                'units': int(category_units[i]),
+                'revenue': round(float(category_revenue[i]), 2)
+            }
+            for i in order
+        ]
+    }
+
+def sales_summary(cursor, start, end):
+    _, _, units, _ = load_product_sales(cursor, start, end)
+    _, order_counts, revenue = load_daily_orders(cursor, start, end)
+    total_revenue = revenue.sum()
+    total_orders = order_counts.sum()
+    return {
+        'revenue': round(float(total_revenue), 2),
+        'orders': int(total_orders),
+        'units': int(units.sum()),
+        'average_order_value': average_order_value(total_revenue, total_orders)
+    }
+
+def analytics_response(endpoint, build, tags=frozenset({'sales'})):
+    """Run an analytics builder over the requested range, cached until a write to what it reads"""
+    cache_key = catalog_cache_key(endpoint)
+    cached = catalog_cache.get(cache_key)
+    if cached is not None:
+        return conditional_json_response(*cached, public=False)
+    try:
+        start, end = parse_analytics_range()
+        cursor = get_cursor()
+        payload = build(cursor, start, end)
+        cursor.close()
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    payload.update({'start': start.isoformat(), 'end': end.isoformat(), 'success': True})
+    body = jsonify(payload).get_data()
+    etag = json_etag(body)
+    catalog_cache.set(cache_key, (body, etag), set(tags))
+    return conditional_json_response(body, etag, public=False)
+
+@app.route('/analytics/sales/revenue', methods=['GET'])
+def get_sales_revenue():
+    try:
+        return analytics_response('analytics-revenue', sales_revenue_series)
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error fetching revenue analytics: {str(e)}")
+        return jsonify({'message': 'Failed to fetch revenue analytics', 'error': str(e)}), 500
+
+@app.route('/analytics/sales/products', methods=['GET'])
+def get_sales_by_product():
+    try:
+        return analytics_response('analytics-products', sales_by_product)
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error fetching product sales analytics: {str(e)}")
+        return jsonify({'message': 'Failed to fetch product sales analytics', 'error': str(e)}), 500
+
+@app.route('/analytics/sales/categories', methods=['GET'])
+def get_sales_by_category():
+    try:
+        return analytics_response('analytics-categories', sales_by_category)
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error fetching category sales analytics: {str(e)}")
+        return jsonify({'message': 'Failed to fetch category sales analytics', 'error': str(e)}), 500
+
+@app.route('/analytics/sales/summary', methods=['GET'])
+def get_sales_summary():
+    try:
+        return analytics_response('analytics-summary', sales_summary)
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error fetching sales summary: {str(e)}")
+        return jsonify({'message': 'Failed to fetch sales summary', 'error': str(e)}), 500
+
+@app.cli.command('rebuild-sales-rollups')
+def rebuild_sales_rollups_command():
+    """Recompute the sales rollup tables from orders, order_items and sales"""
+    cursor = get_cursor()
+    cursor.execute('DELETE FROM product_sales_rollups')
+    cursor.execute(f'''
+        INSERT INTO product_sales_rollups (day, product_id, units, revenue, line_count)
+        SELECT day, product_id, SUM(units), SUM(revenue), COUNT(*)
+        FROM (
+            SELECT DATE(o.created_at) AS day, oi.product_id, oi.quantity AS units, oi.total_price AS revenue
+            FROM order_items oi
+            JOIN orders o ON o.id = oi.order_id
+            WHERE o.order_status NOT IN ({VOID_ORDER_STATUS_SQL})
+            UNION ALL
+            SELECT DATE(s.sold_at), s.product_id, s.quantity, s.total_price
+            FROM sales s
+        ) AS lines
+        GROUP BY day, product_id
+    ''')
+    cursor.execute('DELETE FROM sales_daily_rollups')
+    cursor.execute(f'''
+        INSERT INTO sales_daily_rollups (day, order_count, revenue)
+        SELECT day, SUM(order_count), SUM(revenue)
+        FROM (
+            SELECT DATE(o.created_at) AS day, COUNT(DISTINCT o.id) AS order_count, SUM(oi.total_price) AS revenue
+            FROM orders o
+            JOIN order_items oi ON oi.order_id = o.id
+            WHERE o.order_status NOT IN ({VOID_ORDER_STATUS_SQL})
+            GROUP BY DATE(o.created_at)
+            UNION ALL
+            SELECT DATE(s.sold_at), COUNT(*), SUM(s.total_price)
+            FROM sales s
+            GROUP BY DATE(s.sold_at)
+        ) AS days
+        GROUP BY day
+    ''')
+    get_db().commit()
+    cursor.close()
+    print('Rebuilt sales rollups')
+
+
 
 # Coupon Management API
 @app.route('/coupons', methods=['GET'])
 def get_coupons():
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         
         # Get query parameters for filtering
         is_active = request.args.get('is_active')
@@ -765,13 +3812,15 @@ def get_coupons():
         cursor.close()
         
         return jsonify(coupons), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to fetch coupons', 'error': str(e)}), 500
 
 @app.route('/coupons/<string:code>', methods=['GET'])
 def get_coupon_by_code(code):
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         cursor.execute('SELECT * FROM coupons WHERE code = %s', (code,))
         coupon = cursor.fetchone()
         cursor.close()
@@ -780,6 +3829,8 @@ def get_coupon_by_code(code):
             return jsonify({'message': 'Coupon not found'}), 404
             
         return jsonify(coupon), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to fetch coupon', 'error': str(e)}), 500
 
@@ -826,7 +3877,7 @@ def create_coupon():
         max_discount = data.get('max_discount')
         is_active = data.get('is_active', True)
         
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         
         # Check if coupon code already exists
         cursor.execute('SELECT id FROM coupons WHERE code = %s', (data['code'],))
@@ -845,13 +3896,15 @@ def create_coupon():
         ))
         
         coupon_id = cursor.lastrowid
-        mysql.connection.commit()
+        get_db().commit()
         cursor.close()
         
         return jsonify({
             'message': 'Coupon created successfully',
             'id': coupon_id
         }), 201
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to create coupon', 'error': str(e)}), 500
 
@@ -859,7 +3912,7 @@ def create_coupon():
 def update_coupon(id):
     try:
         data = request.get_json()
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         
         # Check if coupon exists
         cursor.execute('SELECT * FROM coupons WHERE id = %s', (id,))
@@ -982,17 +4035,19 @@ def update_coupon(id):
         update_values.append(id)
         cursor.execute(query, update_values)
         
-        mysql.connection.commit()
+        get_db().commit()
         cursor.close()
         
         return jsonify({'message': 'Coupon updated successfully'}), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to update coupon', 'error': str(e)}), 500
 
 @app.route('/coupons/<int:id>', methods=['DELETE'])
 def delete_coupon(id):
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         
         # Check if coupon exists
         cursor.execute('SELECT id FROM coupons WHERE id = %s', (id,))
@@ -1004,7 +4059,7 @@ def delete_coupon(id):
         if cursor.fetchone():
             # Instead of deleting, deactivate the coupon
             cursor.execute('UPDATE coupons SET is_active = FALSE WHERE id = %s', (id,))
-            mysql.connection.commit()
+            get_db().commit()
             cursor.close()
             return jsonify({
                 'message': 'Coupon is in use by existing orders. It has been deactivated instead of deleted.'
@@ -1012,10 +4067,12 @@ def delete_coupon(id):
             
         # Delete the coupon
         cursor.execute('DELETE FROM coupons WHERE id = %s', (id,))
-        mysql.connection.commit()
+        get_db().commit()
         cursor.close()
         
         return jsonify({'message': 'Coupon deleted successfully'}), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to delete coupon', 'error': str(e)}), 500
 
@@ -1035,7 +4092,7 @@ def validate_coupon():
         except ValueError:
             return jsonify({'message': 'Subtotal must be a valid number'}), 400
             
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         cursor.execute('SELECT * FROM coupons WHERE code = %s', (data['code'],))
         coupon = cursor.fetchone()
         cursor.close()
@@ -1084,6 +4141,8 @@ def validate_coupon():
             'discount_amount': float(discount),
             'message': 'Coupon is valid'
         }), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({'message': 'Failed to validate coupon', 'error': str(e)}), 500
 
@@ -1091,7 +4150,37 @@ def validate_coupon():
 def generate_order_number():
     """Generate a unique order number"""
     timestamp = datetime.datetime.now().strftime('%Y%m%d%H%M%S')
-    return f"ORD-{timestamp}"
+    # Random suffix keeps numbers unique (orders.order_number has a unique
+    # index) when several orders are placed within the same second
+    random_part = ''.join(random.choices(string.digits, k=4))
+    return f"ORD-{timestamp}-{random_part}"
+
+ORDER_NUMBER_ATTEMPTS = 5
+
+def insert_order(cursor, values):
+    """Insert an orders row under a fresh order number, retrying when the number is taken
+
+    values holds every orders column after order_number. A duplicate key only
+    fails the statement, so the surrounding transaction keeps its locks.
+    """
+    for attempt in range(ORDER_NUMBER_ATTEMPTS):
+        order_number = generate_order_number()
+        try:
+            cursor.execute('''
+                INSERT INTO orders (
+                    order_number, customer_name, customer_email, customer_phone, shipping_address,
+                    shipping_city, shipping_state, shipping_country, shipping_zip_code,
+                    delivery_method, delivery_instructions, is_gift, gift_message,
+                    subtotal, shipping_cost, tax_amount, discount_amount, total_amount,
+                    payment_method, payment_status, coupon_id, order_status
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            ''', (order_number, *values))
+            return order_number, cursor.lastrowid
+        except MySQLdb.IntegrityError as e:
+            # 1062 is ER_DUP_ENTRY; other integrity errors are real failures
+            if e.args[0] != 1062 or attempt == ORDER_NUMBER_ATTEMPTS - 1:
+                raise
+            app.logger.warning(f"Order number {order_number} already taken, retrying")
 
 def calculate_discount(subtotal, coupon):
     """Calculate discount amount based on coupon"""
@@ -1105,71 +4194,543 @@ def calculate_discount(subtotal, coupon):
     # Don't allow discount to exceed order value
     return min(discount_amount, subtotal)
 
+# Maximum number of ids bound into a single IN (...) clause
+IN_CLAUSE_BATCH_SIZE = 1000
+
+def chunked(values, size=IN_CLAUSE_BATCH_SIZE):
+    """Split a list into consecutive slices of at most size elements"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+ORDER_EXPANSIONS = ('items', 'payments', 'coupon')
+
+def attach_order_details(cursor, orders, include=ORDER_EXPANSIONS):
+    """
+    Add 'items', 'payments' and (when a coupon was used) 'coupon' to each
+    order, limited to the expansions named in include. Related rows are read
+    with one IN (...) query per table and id batch and grouped in Python,
+    instead of three queries per order.
+    """
+    order_ids = [order['id'] for order in orders]
+    items_by_order = {}
+    payments_by_order = {}
+    coupons_by_id = {}
+
+    for batch in chunked(order_ids):
+        format_strings = ','.join(['%s'] * len(batch))
+        if 'items' in include:
+            cursor.execute(f'''
+                SELECT oi.*, p.name as product_name 
+                FROM order_items oi
+                LEFT JOIN products p ON oi.product_id = p.id
+                WHERE oi.order_id IN ({format_strings})
+                ORDER BY oi.order_id, oi.id
+            ''', tuple(batch))
+            for item in cursor.fetchall():
+                # Parse JSON attributes
+                if item['attributes']:
+                    item['attributes'] = json.loads(item['attributes'])
+                items_by_order.setdefault(item['order_id'], []).append(item)
+
+        if 'payments' in include:
+            # ix_payments_order_id_status returns rows grouped by (order_id, status);
+            # each order's few payments are put back in id order below instead
+            # of sorting the whole batch in MySQL
+            cursor.execute(
+                f'SELECT * FROM payments WHERE order_id IN ({format_strings})',
+                tuple(batch)
+            )
+            for payment in cursor.fetchall():
+                payments_by_order.setdefault(payment['order_id'], []).append(payment)
+
+    if 'coupon' in include:
+        coupon_ids = list({order['coupon_id'] for order in orders if order['coupon_id']})
+        for batch in chunked(coupon_ids):
+            format_strings = ','.join(['%s'] * len(batch))
+            cursor.execute(
+                f'SELECT id, code, discount_type, discount_value FROM coupons WHERE id IN ({format_strings})',
+                tuple(batch)
+            )
+            for coupon in cursor.fetchall():
+                coupon_id = coupon.pop('id')
+                coupons_by_id[coupon_id] = coupon
+
+    for order in orders:
+        if 'items' in include:
+            order['items'] = items_by_order.get(order['id'], [])
+        if 'payments' in include:
+            order['payments'] = sorted(payments_by_order.get(order['id'], []), key=lambda payment: payment['id'])
+        # Get coupon details if used
+        if 'coupon' in include and order['coupon_id']:
+            coupon = coupons_by_id.get(order['coupon_id'])
+            order['coupon'] = dict(coupon) if coupon else None
+    return orders
+
+MAX_ORDER_PAGE_SIZE = 200
+
 # Order Management API
+# Per-day order rollups
+# ROLLUP_SHARDS order_daily_rollups rows per order creation day. Every write
+# that creates an order or changes its order/payment status adjusts a row of
+# the order's creation day in the same transaction.
+ORDER_STATUSES = ('pending', 'processing', 'shipped', 'delivered', 'cancelled', 'refunded')
+PAYMENT_STATUSES = ('pending', 'paid', 'partially_paid', 'failed', 'refunded')
+# Orders in these statuses are counted but add nothing to gross, subtotal,
+# discount, tax, shipping or sales revenue. Money actually taken and
+# returned stays visible in paid_amount and refunded_amount.
+VOID_ORDER_STATUSES = ('cancelled', 'refunded')
+VOID_ORDER_STATUS_SQL = ', '.join(f"'{status}'" for status in VOID_ORDER_STATUSES)
+# rollup column -> orders column
+ORDER_ROLLUP_ORDER_AMOUNTS = {
+    'gross': 'total_amount', 'subtotal': 'subtotal', 'discount': 'discount_amount',
+    'tax': 'tax_amount', 'shipping': 'shipping_cost',
+}
+ORDER_ROLLUP_AMOUNTS = ('gross', 'subtotal', 'discount', 'tax', 'shipping', 'paid_amount', 'refunded_amount')
+ORDER_ROLLUP_COLUMNS = (
+    ('order_count',) + ORDER_ROLLUP_AMOUNTS
+    + tuple(f'status_{status}' for status in ORDER_STATUSES)
+    + tuple(f'payment_{status}' for status in PAYMENT_STATUSES)
+)
+
+# The rollup columns recomputed from the raw tables, grouped by creation day
+ORDER_ROLLUP_SOURCE_QUERY = f'''
+    SELECT
+        DATE(o.created_at) AS day,
+        COUNT(*) AS order_count,
+        {', '.join(
+            f"COALESCE(SUM(CASE WHEN o.order_status NOT IN ({VOID_ORDER_STATUS_SQL}) THEN o.{source} END), 0) AS {column}"
+            for column, source in ORDER_ROLLUP_ORDER_AMOUNTS.items()
+        )},
+        COALESCE(SUM(p.paid_amount), 0) AS paid_amount,
+        COALESCE(SUM(p.refunded_amount), 0) AS refunded_amount,
+        {', '.join(f"SUM(o.order_status = '{status}') AS status_{status}" for status in ORDER_STATUSES)},
+        {', '.join(f"SUM(o.payment_status = '{status}') AS payment_{status}" for status in PAYMENT_STATUSES)}
+    FROM orders o
+    LEFT JOIN (
+        SELECT
+            order_id,
+            SUM(CASE WHEN status = 'completed' THEN amount ELSE 0 END) AS paid_amount,
+            SUM(CASE WHEN status = 'refunded' THEN amount ELSE 0 END) AS refunded_amount
+        FROM payments
+        GROUP BY order_id
+    ) p ON p.order_id = o.id
+    GROUP BY DATE(o.created_at)
+'''
+
+def adjust_order_rollup(cursor, day, deltas):
+    """
+    Add {column: delta} to the rollup row of `day` (None for the database's
+    current date). Statuses outside the known sets are skipped; the
+    consistency check reports the resulting drift.
+    """
+    deltas = {column: delta for column, delta in deltas.items() if column in ORDER_ROLLUP_COLUMNS and delta}
+    if not deltas:
+        return
+    columns = list(deltas)
+    day_sql = 'CURDATE()' if day is None else '%s'
+    day_params = () if day is None else (day,)
+    cursor.execute(f'''
+        INSERT INTO order_daily_rollups (day, shard, {', '.join(columns)})
+        VALUES ({day_sql}, %s, {', '.join(['%s'] * len(columns))})
+        ON DUPLICATE KEY UPDATE {', '.join(f'{column} = {column} + VALUES({column})' for column in columns)}
+    ''', (*day_params, rollup_shard(), *[deltas[column] for column in columns]))
+
+# Columns set_order_status(es) needs from each order row
+ORDER_STATUS_COLUMNS = (
+    'id, order_number, order_status, DATE(created_at) AS day, '
+    + ', '.join(ORDER_ROLLUP_ORDER_AMOUNTS.values())
+)
+
+def void_transition(old_status, new_status):
+    """-1 when an order moves into a void status, 1 when it leaves one, otherwise 0"""
+    return int(old_status in VOID_ORDER_STATUSES) - int(new_status in VOID_ORDER_STATUSES)
+
+def order_status_deltas(orders, new_status):
+    """{day: rollup deltas} for moving orders to new_status, with their amounts when they become or stop being void"""
+    deltas_by_day = {}
+    for order in orders:
+        deltas = deltas_by_day.setdefault(order['day'], {})
+        deltas[f"status_{order['order_status']}"] = deltas.get(f"status_{order['order_status']}", 0) - 1
+        deltas[f'status_{new_status}'] = deltas.get(f'status_{new_status}', 0) + 1
+        sign = void_transition(order['order_status'], new_status)
+        if sign:
+            for column, source in ORDER_ROLLUP_ORDER_AMOUNTS.items():
+                deltas[column] = deltas.get(column, 0) + sign * order[source]
+    return deltas_by_day
+
+def set_order_status(cursor, order_id, new_status):
+    """Change an order's status and move it between the status counts (and revenue) of its rollup rows"""
+    cursor.execute(f'SELECT {ORDER_STATUS_COLUMNS} FROM orders WHERE id = %s FOR UPDATE', (order_id,))
+    order = cursor.fetchone()
+    if not order or order['order_status'] == new_status:
+        return
+    set_order_statuses(cursor, [order], new_status)
+
+def derive_order_status(item_statuses):
+    """The order status implied by the statuses of all of its items"""
+    if all(status == 'delivered' for status in item_statuses):
+        return 'delivered'
+    if all(status == 'cancelled' for status in item_statuses):
+        return 'cancelled'
+    if any(status == 'shipped' for status in item_statuses):
+        return 'shipped'
+    if any(status == 'processing' for status in item_statuses):
+        return 'processing'
+    return 'pending'
+
+def order_rollup_summary(cursor):
+    """The GET /orders summary over all orders, summed from order_daily_rollups"""
+    cursor.execute(f'''
+        SELECT COALESCE(SUM(order_count), 0) AS order_count, COALESCE(SUM(gross), 0) AS gross,
+               {', '.join(f'COALESCE(SUM(status_{status}), 0) AS status_{status}' for status in ORDER_STATUSES)}
+        FROM order_daily_rollups
+    ''')
+    totals = cursor.fetchone()
+    return {
+        'count': int(totals['order_count']),
+        'revenue': float(totals['gross']),
+        'status_counts': {
+            status: int(totals[f'status_{status}']) for status in ORDER_STATUSES if totals[f'status_{status}']
+        },
+    }
+
+ORDER_ROLLUP_MISMATCH_TOLERANCE = Decimal('0.005')
+
+def order_rollup_mismatches(cursor):
+    """[(day, column, rollup value, recomputed value)] where the rollups disagree with the raw tables"""
+    cursor.execute(ORDER_ROLLUP_SOURCE_QUERY)
+    expected = {row['day']: row for row in cursor.fetchall()}
+    cursor.execute(
+        f"SELECT day, {', '.join(f'SUM({column}) AS {column}' for column in ORDER_ROLLUP_COLUMNS)} "
+        'FROM order_daily_rollups GROUP BY day'
+    )
+    actual = {row['day']: row for row in cursor.fetchall()}
+    mismatches = []
+    for day in sorted(set(expected) | set(actual)):
+        for column in ORDER_ROLLUP_COLUMNS:
+            want = Decimal(str(expected[day][column])) if day in expected else Decimal(0)
+            have = Decimal(str(actual[day][column])) if day in actual else Decimal(0)
+            if abs(want - have) > ORDER_ROLLUP_MISMATCH_TOLERANCE:
+                mismatches.append((day, column, have, want))
+    return mismatches
+
+@app.cli.command('rebuild-order-rollups')
+def rebuild_order_rollups_command():
+    """Recompute order_daily_rollups from orders and payments"""
+    cursor = get_cursor()
+    cursor.execute('DELETE FROM order_daily_rollups')
+    cursor.execute(f"INSERT INTO order_daily_rollups (day, {', '.join(ORDER_ROLLUP_COLUMNS)}) {ORDER_ROLLUP_SOURCE_QUERY}")
+    get_db().commit()
+    cursor.close()
+    print('Rebuilt order rollups')
+
+@app.cli.command('check-order-rollups')
+def check_order_rollups_command():
+    """Fail if order_daily_rollups disagrees with orders and payments"""
+    cursor = get_cursor()
+    mismatches = order_rollup_mismatches(cursor)
+    cursor.close()
+    for day, column, have, want in mismatches:
+        print(f'MISMATCH {day} {column}: rollup {have}, orders {want}')
+    if mismatches:
+        raise SystemExit(1)
+    print('Order rollups match the raw tables')
+
+def order_rollup_series(cursor, start, end):
+    granularity = request.args.get('granularity', 'day')
+    if granularity not in ANALYTICS_GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(ANALYTICS_GRANULARITIES)}")
+    cursor.execute(
+        f"SELECT day, {', '.join(ORDER_ROLLUP_COLUMNS)} FROM order_daily_rollups WHERE day BETWEEN %s AND %s",
+        (start, end)
+    )
+    rows = cursor.fetchall()
+    days = np.array([row['day'] for row in rows], dtype='datetime64[D]')
+    values = [np.array([row[column] for row in rows], dtype=np.float64) for column in ORDER_ROLLUP_COLUMNS]
+
+    periods = np.unique(period_starts(np.arange(start, end + datetime.timedelta(days=1), dtype='datetime64[D]'), granularity))
+    row_periods, sums = group_sums(period_starts(days, granularity), *values)
+    totals = np.zeros((len(ORDER_ROLLUP_COLUMNS), len(periods)))
+    if len(row_periods):
+        totals[:, np.searchsorted(periods, row_periods)] = np.vstack(sums)
+
+    def shape(column_totals):
+        entry = dict(zip(ORDER_ROLLUP_COLUMNS, column_totals))
+        return {
+            'orders': int(entry['order_count']),
+            **{amount: round(float(entry[amount]), 2) for amount in ORDER_ROLLUP_AMOUNTS},
+            'status_counts': {status: int(entry[f'status_{status}']) for status in ORDER_STATUSES},
+            'payment_status_counts': {status: int(entry[f'payment_{status}']) for status in PAYMENT_STATUSES}
+        }
+
+    return {
+        'granularity': granularity,
+        'totals': shape(totals.sum(axis=1)),
+        'data': [{'period': str(periods[i]), **shape(totals[:, i])} for i in range(len(periods))]
+    }
+
+@app.route('/analytics/orders', methods=['GET'])
+def get_order_analytics():
+    try:
+        return analytics_response('analytics-orders', order_rollup_series, tags={'orders'})
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error fetching order analytics: {str(e)}")
+        return jsonify({'message': 'Failed to fetch order analytics', 'error': str(e)}), 500
+
+# Streaming exports
+# Rows are read through an unbuffered server-side cursor and written out in
+# chunks as they arrive, so memory stays flat however large the table is
+EXPORT_DATASETS = {
+    # name -> (table, date column for ?start=&end=, status column for ?status=)
+    'orders': ('orders', 'created_at', 'order_status'),
+    'sales': ('sales', 'sold_at', None),
+    'deliveries': ('deliveries', 'created_at', 'status'),
+}
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+EXPORT_FETCH_SIZE = 1000
+# Bytes buffered before a chunk is handed to the server
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+def export_value(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (Decimal, datetime.timedelta)):
+        return str(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return value
+
+class ExportStream:
+    """
+    CSV or NDJSON chunks of the rows of an executed unbuffered cursor.
+
+    The server calls close() once the response has been sent or the client
+    went away, whether or not iteration ever started. The connection goes
+    back to the pool when every row was read; otherwise it is dropped, as
+    an unread unbuffered result would have to be drained before reuse.
+    """
+
+    def __init__(self, conn, cursor, fmt):
+        self.conn = conn
+        self.cursor = cursor
+        self.fmt = fmt
+        self.finished = False
+        self.closed = False
+
+    def __iter__(self):
+        try:
+            columns = [column[0] for column in self.cursor.description]
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if self.fmt == 'csv':
+                writer.writerow(columns)
+                # The header goes out before the first row is read
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            while True:
+                rows = self.cursor.fetchmany(EXPORT_FETCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    if self.fmt == 'csv':
+                        writer.writerow(['' if row[c] is None else export_value(row[c]) for c in columns])
+                    else:
+                        buffer.write(json.dumps(row, default=export_value))
+                        buffer.write('\n')
+                if buffer.tell() >= EXPORT_CHUNK_SIZE:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+            self.finished = True
+        except Exception as e:
+            app.logger.error(f"Error streaming export: {str(e)}")
+            raise
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        if self.finished:
+            self.cursor.close()
+            db_pool.release(self.conn)
+        else:
+            db_pool.discard(self.conn)
+
+@app.route('/export/<string:dataset>', methods=['GET'])
+def export_dataset(dataset):
+    try:
+        if dataset not in EXPORT_DATASETS:
+            return jsonify({'message': f"Unknown export. Must be one of: {', '.join(EXPORT_DATASETS)}"}), 404
+        fmt = request.args.get('format', 'csv')
+        if fmt not in EXPORT_FORMATS:
+            return jsonify({'message': 'format must be csv or ndjson'}), 400
+        table, date_column, status_column = EXPORT_DATASETS[dataset]
+
+        filters = []
+        params = []
+        try:
+            if request.args.get('start'):
+                filters.append(f'{date_column} >= %s')
+                params.append(datetime.date.fromisoformat(request.args['start']))
+            if request.args.get('end'):
+                filters.append(f'{date_column} < %s')
+                params.append(datetime.date.fromisoformat(request.args['end']) + datetime.timedelta(days=1))
+        except ValueError:
+            return jsonify({'message': 'start and end must be dates in YYYY-MM-DD format'}), 400
+        if status_column and request.args.get('status'):
+            filters.append(f'{status_column} = %s')
+            params.append(request.args['status'])
+
+        where = f"WHERE {' AND '.join(filters)}" if filters else ''
+        query = f'SELECT * FROM {table} {where} ORDER BY id'
+        # Acquire and execute before any byte is sent, so a saturated pool
+        # or a failing query is still answered with 503 or 500
+        conn = db_pool.acquire()
+        try:
+            cursor = conn.raw.cursor(MySQLdb.cursors.SSDictCursor)
+            cursor.execute(query, tuple(params))
+        except Exception:
+            db_pool.discard(conn)
+            raise
+        response = app.response_class(ExportStream(conn, cursor, fmt), mimetype=EXPORT_FORMATS[fmt])
+        filename = f'{dataset}-{datetime.date.today().isoformat()}.{fmt}'
+        response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+        # Ask nginx to pass chunks through instead of buffering the whole export
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.cache_control.no_store = True
+        return response
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error exporting {dataset}: {str(e)}")
+        return jsonify({'message': f'Failed to export {dataset}', 'error': str(e)}), 500
+
 @app.route('/orders', methods=['GET'])
 def get_orders():
     try:
-        cursor = mysql.connection.cursor()
-        
         # Get query parameters for filtering
         status = request.args.get('status')
         customer_email = request.args.get('customer_email')
         date_from = request.args.get('date_from')
         date_to = request.args.get('date_to')
+        # Pagination / expansion parameters
+        limit = request.args.get('limit', type=int)
+        after = request.args.get('after')
+        include_param = request.args.get('include')
+
+        paginate = limit is not None or after is not None
+        if paginate:
+            if limit is None:
+                limit = MAX_ORDER_PAGE_SIZE
+            if limit <= 0:
+                return jsonify({'message': 'limit must be positive'}), 400
+            limit = min(limit, MAX_ORDER_PAGE_SIZE)
+
+        # Pages only expand what is asked for; the unpaginated listing keeps
+        # returning every expansion as before
+        if include_param is not None:
+            include = {part.strip() for part in include_param.split(',') if part.strip()}
+            unknown = include - set(ORDER_EXPANSIONS)
+            if unknown:
+                return jsonify({'message': f'Unknown include values: {", ".join(sorted(unknown))}'}), 400
+        elif paginate:
+            include = set()
+        else:
+            include = set(ORDER_EXPANSIONS)
         
-        # Base query
-        query = 'SELECT * FROM orders WHERE 1=1'
+        # Filters shared by the page query and the summary query
+        filters = ''
         params = []
         
         # Apply filters if provided
         if status:
-            query += ' AND order_status = %s'
+            filters += ' AND order_status = %s'
             params.append(status)
             
         if customer_email:
-            query += ' AND customer_email = %s'
+            filters += ' AND customer_email = %s'
             params.append(customer_email)
             
         if date_from:
-            query += ' AND created_at >= %s'
+            filters += ' AND created_at >= %s'
             params.append(date_from)
             
         if date_to:
-            query += ' AND created_at <= %s'
+            filters += ' AND created_at <= %s'
             params.append(date_to)
+
+        # Base query
+        query = 'SELECT * FROM orders WHERE 1=1' + filters
+        query_params = list(params)
+
+        if after:
+            try:
+                position = decode_cursor(after)
+                last_created_at = position['created_at']
+                last_id = int(position['id'])
+            except (ValueError, TypeError, KeyError):
+                return jsonify({'message': 'Invalid cursor'}), 400
+            query += ' AND (created_at < %s OR (created_at = %s AND id < %s))'
+            query_params.extend([last_created_at, last_created_at, last_id])
             
-        # Add sorting
-        query += ' ORDER BY created_at DESC'
+        # Add sorting; id breaks ties so pages can resume from (created_at, id)
+        query += ' ORDER BY created_at DESC, id DESC'
+        if paginate:
+            # Read one extra row to know whether another page exists
+            query += ' LIMIT %s'
+            query_params.append(limit + 1)
         
         # Execute query
-        cursor.execute(query, tuple(params))
+        cursor = get_cursor()
+        cursor.execute(query, tuple(query_params))
         orders = cursor.fetchall()
+
+        next_cursor = None
+        if paginate and len(orders) > limit:
+            orders = orders[:limit]
+            last = orders[-1]
+            next_cursor = encode_cursor({'created_at': last['created_at'], 'id': last['id']})
+        
+        # Get items, payments and coupons for the page with batched queries
+        attach_order_details(cursor, orders, include)
+
+        if not paginate:
+            cursor.close()
+            return jsonify(orders), 200
+
+        # Aggregate over every order matching the filters, not just this page
+        if filters:
+            cursor.execute(
+                'SELECT order_status, COUNT(*) AS count, COALESCE(SUM(total_amount), 0) AS revenue '
+                'FROM orders WHERE 1=1' + filters + ' GROUP BY order_status',
+                tuple(params)
+            )
+            status_rows = cursor.fetchall()
+            summary = {
+                'count': sum(row['count'] for row in status_rows),
+                'revenue': float(sum(
+                    Decimal(row['revenue']) for row in status_rows if row['order_status'] not in VOID_ORDER_STATUSES
+                )),
+                'status_counts': {row['order_status']: row['count'] for row in status_rows},
+            }
+        else:
+            # Unfiltered totals come from the per-day rollups instead of a scan of orders
+            summary = order_rollup_summary(cursor)
+        cursor.close()
         
-        # Get order items for each order
-        for order in orders:
-            cursor.execute('''
-                SELECT oi.*, p.name as product_name 
-                FROM order_items oi
-                LEFT JOIN products p ON oi.product_id = p.id
-                WHERE oi.order_id = %s
-            ''', (order['id'],))
-            order['items'] = cursor.fetchall()
-            
-            # Parse JSON attributes
-            for item in order['items']:
-                if item['attributes']:
-                    item['attributes'] = json.loads(item['attributes'])
-                    
-            # Get payment information
-            cursor.execute('SELECT * FROM payments WHERE order_id = %s', (order['id'],))
-            order['payments'] = cursor.fetchall()
-            
-            # Get coupon details if used
-            if order['coupon_id']:
-                cursor.execute('SELECT code, discount_type, discount_value FROM coupons WHERE id = %s', (order['coupon_id'],))
-                order['coupon'] = cursor.fetchone()
-        
-        return jsonify(orders), 200
+        return jsonify({
+            'data': orders,
+            'next_cursor': next_cursor,
+            'summary': summary,
+            'success': True
+        }), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         # Log the error
         app.logger.error(f"Error fetching orders: {str(e)}")
@@ -1178,39 +4739,23 @@ def get_orders():
 @app.route('/orders/<string:order_number>', methods=['GET'])
 def get_order_by_number(order_number):
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         
         # Get order details
         cursor.execute('SELECT * FROM orders WHERE order_number = %s', (order_number,))
         order = cursor.fetchone()
         
         if not order:
+            cursor.close()
             return jsonify({'message': 'Order not found'}), 404
             
-        # Get order items with product names
-        cursor.execute('''
-            SELECT oi.*, p.name as product_name 
-            FROM order_items oi
-            LEFT JOIN products p ON oi.product_id = p.id
-            WHERE oi.order_id = %s
-        ''', (order['id'],))
-        order['items'] = cursor.fetchall()
-        
-        # Parse JSON attributes
-        for item in order['items']:
-            if item['attributes']:
-                item['attributes'] = json.loads(item['attributes'])
-                
-        # Get payment information
-        cursor.execute('SELECT * FROM payments WHERE order_id = %s', (order['id'],))
-        order['payments'] = cursor.fetchall()
-        
-        # Get coupon details if used
-        if order['coupon_id']:
-            cursor.execute('SELECT code, discount_type, discount_value FROM coupons WHERE id = %s', (order['coupon_id'],))
-            order['coupon'] = cursor.fetchone()
+        # Get order items, payments and coupon details
+        attach_order_details(cursor, [order])
+        cursor.close()
             
         return jsonify(order), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         app.logger.error(f"Error fetching order {order_number}: {str(e)}")
         return jsonify({'message': 'Failed to fetch order', 'error': str(e)}), 500
@@ -1242,6 +4787,10 @@ def create_order():
                 return jsonify({'message': 'Each item must have product_id, quantity, and unit_price'}), 400
                 
             # Validate numeric values
+            try:
+                int(item['product_id'])
+            except (ValueError, TypeError):
+                return jsonify({'message': 'Invalid product_id'}), 400
             try:
                 if int(item['quantity']) <= 0:
                     return jsonify({'message': 'Item quantity must be positive'}), 400
@@ -1263,7 +4812,8 @@ def create_order():
             return jsonify({'message': 'Invalid price format'}), 400
 
         # Get a cursor - use with connection pooling
-        conn = mysql.connection
+        conn = get_db()
+        release_expired_reservations(conn)
         cursor = conn.cursor()
         
         # Check coupon if provided
@@ -1296,20 +4846,46 @@ def create_order():
         # Calculate total amount
         total_amount = subtotal + shipping_cost + tax_amount - discount_amount
         
-        # Generate unique order number
-        order_number = generate_order_number()
-        
-        # Create order
-        cursor.execute('''
-            INSERT INTO orders (
-                order_number, customer_name, customer_email, customer_phone, shipping_address,
-                shipping_city, shipping_state, shipping_country, shipping_zip_code,
-                delivery_method, delivery_instructions, is_gift, gift_message,
-                subtotal, shipping_cost, tax_amount, discount_amount, total_amount,
-                payment_method, payment_status, coupon_id, order_status
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-        ''', (
-            order_number, data['customer_name'], data['customer_email'], data.get('customer_phone'),
+        quantities = {}
+        for item in data['items']:
+            product_id = int(item['product_id'])
+            quantities[product_id] = quantities.get(product_id, 0) + int(item['quantity'])
+
+        # Stock is locked and checked before anything is inserted, so checkouts
+        # take their locks in the same order as /products/reserve (holds, then
+        # product rows by ascending id) and a shortage leaves nothing to undo.
+        # Units already held for this checkout are consumed instead of being
+        # taken from stock a second time. Expired holds are left for the
+        # releaser, which puts their units back.
+        reserved = {}
+        if data.get('reservation_token'):
+            cursor.execute('''
+                SELECT id, product_id, quantity FROM stock_reservations
+                WHERE reservation_token = %s AND expires_at > NOW()
+                ORDER BY id
+                FOR UPDATE
+            ''', (data['reservation_token'],))
+            reservation_rows = cursor.fetchall()
+            for row in reservation_rows:
+                reserved[row['product_id']] = reserved.get(row['product_id'], 0) + row['quantity']
+            if reservation_rows:
+                format_strings = ','.join(['%s'] * len(reservation_rows))
+                cursor.execute(
+                    f'DELETE FROM stock_reservations WHERE id IN ({format_strings})',
+                    tuple(row['id'] for row in reservation_rows)
+                )
+
+        # Take the remaining units from stock (or return unused held units)
+        # with conditional, row-locked updates so concurrent checkouts cannot oversell
+        deltas = {pid: quantities.get(pid, 0) - reserved.get(pid, 0) for pid in set(quantities) | set(reserved)}
+        shortages = adjust_stock_locked(cursor, deltas)
+        if shortages:
+            conn.rollback()
+            return jsonify({'message': 'Insufficient stock', 'out_of_stock': shortages}), 409
+
+        # Create order under a unique order number
+        order_number, order_id = insert_order(cursor, (
+            data['customer_name'], data['customer_email'], data.get('customer_phone'),
             data['shipping_address'], data['shipping_city'], data['shipping_state'],
             data['shipping_country'], data['shipping_zip_code'], data['delivery_method'],
             data.get('delivery_instructions'), data.get('is_gift', False), data.get('gift_message'),
@@ -1317,42 +4893,45 @@ def create_order():
             data['payment_method'], 'pending', coupon_id, 'pending'
         ))
         
-        order_id = cursor.lastrowid
-        
+        # Resolve missing product names with one query
+        missing_name_ids = list({int(item['product_id']) for item in data['items'] if 'product_name' not in item})
+        product_names = {}
+        if missing_name_ids:
+            format_strings = ','.join(['%s'] * len(missing_name_ids))
+            cursor.execute(f'SELECT id, name FROM products WHERE id IN ({format_strings})', tuple(missing_name_ids))
+            product_names = {row['id']: row['name'] for row in cursor.fetchall()}
+
         # Add order items
+        order_item_rows = []
         for item in data['items']:
+            product_id = int(item['product_id'])
+            quantity = int(item['quantity'])
+
             # Prepare attributes as JSON if provided
             attributes_json = None
             if 'attributes' in item and item['attributes']:
                 attributes_json = json.dumps(item['attributes'])
                 
             # Calculate total price for item
-            total_price = float(item['unit_price']) * int(item['quantity'])
+            total_price = float(item['unit_price']) * quantity
             
             # Get product name
-            product_name = None
             if 'product_name' in item:
                 product_name = item['product_name']
             else:
-                cursor.execute('SELECT name FROM products WHERE id = %s', (item['product_id'],))
-                product_result = cursor.fetchone()
-                if product_result:
-                    product_name = product_result['name']
-            
-            cursor.execute('''
-                INSERT INTO order_items (
-                    order_id, product_id, product_name, quantity, unit_price, total_price, attributes
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s)
-            ''', (
-                order_id, item['product_id'], product_name, item['quantity'], 
+                product_name = product_names.get(product_id)
+
+            order_item_rows.append((
+                order_id, product_id, product_name, quantity,
                 item['unit_price'], total_price, attributes_json
             ))
-            
-            # Update product stock count (FIXED: use stock_count not stock_quantity)
-            cursor.execute('''
-                UPDATE products SET stock_count = GREATEST(0, stock_count - %s)
-                WHERE id = %s
-            ''', (item['quantity'], item['product_id']))
+        
+        # MySQLdb turns executemany on INSERT ... VALUES into one multi-row INSERT
+        cursor.executemany('''
+            INSERT INTO order_items (
+                order_id, product_id, product_name, quantity, unit_price, total_price, attributes
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+        ''', order_item_rows)
             
         # Create initial payment record
         payment_status = 'pending'
@@ -1365,9 +4944,24 @@ def create_order():
         ''', (
             order_id, total_amount, data['payment_method'], transaction_id, payment_status
         ))
+
+        record_sales_rollup(cursor, [(row[1], row[3], row[5]) for row in order_item_rows])
+        adjust_order_rollup(cursor, None, {
+            'order_count': 1,
+            'gross': total_amount,
+            'subtotal': subtotal,
+            'discount': discount_amount,
+            'tax': tax_amount,
+            'shipping': shipping_cost,
+            'status_pending': 1,
+            'payment_pending': 1
+        })
         
         # Commit changes
         conn.commit()
+        # Stock counts changed for every ordered product
+        catalog_cache.invalidate('stock', 'sales', 'orders', *[f'product:{pid}' for pid in deltas])
+        refresh_product_facets(cursor, deltas)
         
         # Prepare response data
         response_data = {
@@ -1380,6 +4974,8 @@ def create_order():
         # Return successful response
         return jsonify(response_data), 201
         
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         # Log the error
         app.logger.error(f"Error creating order: {str(e)}")
@@ -1406,7 +5002,7 @@ def update_order_status(order_number):
         if new_status not in valid_statuses:
             return jsonify({'message': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
             
-        conn = mysql.connection
+        conn = get_db()
         cursor = conn.cursor()
         
         # Check if order exists
@@ -1417,10 +5013,13 @@ def update_order_status(order_number):
             return jsonify({'message': 'Order not found'}), 404
             
         # Update order status
-        cursor.execute('UPDATE orders SET order_status = %s WHERE id = %s', (new_status, order['id']))
+        set_order_status(cursor, order['id'], new_status)
         conn.commit()
+        catalog_cache.invalidate('orders', 'sales')
         
         return jsonify({'message': 'Order status updated successfully'}), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         app.logger.error(f"Error updating order status for {order_number}: {str(e)}")
         if conn:
@@ -1456,11 +5055,14 @@ def update_payment(order_number):
         if data['status'] not in valid_statuses:
             return jsonify({'message': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
             
-        conn = mysql.connection
+        conn = get_db()
         cursor = conn.cursor()
         
         # Check if order exists
-        cursor.execute('SELECT id, total_amount FROM orders WHERE order_number = %s', (order_number,))
+        cursor.execute(
+            'SELECT id, total_amount, payment_status, DATE(created_at) AS day FROM orders WHERE order_number = %s FOR UPDATE',
+            (order_number,)
+        )
         order = cursor.fetchone()
         
         if not order:
@@ -1496,11 +5098,22 @@ def update_payment(order_number):
             payment_status = 'refunded'
             
         cursor.execute('UPDATE orders SET payment_status = %s WHERE id = %s', (payment_status, order['id']))
+        rollup_deltas = {
+            'paid_amount': amount if data['status'] == 'completed' else 0,
+            'refunded_amount': amount if data['status'] == 'refunded' else 0
+        }
+        if payment_status != order['payment_status']:
+            rollup_deltas[f"payment_{order['payment_status']}"] = -1
+            rollup_deltas[f'payment_{payment_status}'] = 1
+        adjust_order_rollup(cursor, order['day'], rollup_deltas)
         
         conn.commit()
+        catalog_cache.invalidate('orders')
         
         return jsonify({'message': 'Payment updated successfully'}), 200
         
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         app.logger.error(f"Error updating payment for order {order_number}: {str(e)}")
         if conn:
@@ -1525,7 +5138,7 @@ def update_order_item_status(order_number, item_id):
         if new_status not in valid_statuses:
             return jsonify({'message': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
             
-        conn = mysql.connection
+        conn = get_db()
         cursor = conn.cursor()
         
         # Check if order exists
@@ -1551,22 +5164,11 @@ def update_order_item_status(order_number, item_id):
             cursor.execute('SELECT status FROM order_items WHERE order_id = %s', (order['id'],))
             items = cursor.fetchall()
             
-            # Determine the overall order status based on item statuses
-            if all(item['status'] == 'delivered' for item in items):
-                order_status = 'delivered'
-            elif all(item['status'] == 'cancelled' for item in items):
-                order_status = 'cancelled'
-            elif any(item['status'] == 'shipped' for item in items):
-                order_status = 'shipped'
-            elif any(item['status'] == 'processing' for item in items):
-                order_status = 'processing'
-            else:
-                order_status = 'pending'
-                
             # Update the order status
-            cursor.execute('UPDATE orders SET order_status = %s WHERE id = %s', (order_status, order['id']))
+            set_order_status(cursor, order['id'], derive_order_status([item['status'] for item in items]))
         
         conn.commit()
+        catalog_cache.invalidate('orders', 'sales')
         
         return jsonify({
             'message': 'Order item status updated successfully',
@@ -1574,6 +5176,8 @@ def update_order_item_status(order_number, item_id):
             'new_status': new_status
         }), 200
         
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         app.logger.error(f"Error updating order item status for order {order_number}, item {item_id}: {str(e)}")
         if conn:
@@ -1583,6 +5187,216 @@ def update_order_item_status(order_number, item_id):
                 app.logger.error(f"Error during rollback: {str(rollback_error)}")
         return jsonify({'message': 'Failed to update order item status', 'error': str(e)}), 500
 
+# Bulk status updates
+# Most ids a single bulk status request may name
+BULK_STATUS_MAX_IDS = int(os.getenv('BULK_STATUS_MAX_IDS', 5000))
+ORDER_ITEM_STATUSES = ('pending', 'processing', 'shipped', 'delivered', 'backordered', 'cancelled', 'refunded')
+
+def set_order_statuses(cursor, orders, new_status):
+    """
+    Move orders locked by the caller to new_status, with their rollups.
+    orders are rows with ORDER_STATUS_COLUMNS; returns the ids actually changed.
+    """
+    changed = [order for order in orders if order['order_status'] != new_status]
+    for batch in chunked(changed):
+        format_strings = ','.join(['%s'] * len(batch))
+        cursor.execute(
+            f'UPDATE orders SET order_status = %s WHERE id IN ({format_strings})',
+            (new_status, *[order['id'] for order in batch])
+        )
+    # All orders changing voidness here move the same way, as new_status is shared
+    voided = [order for order in changed if void_transition(order['order_status'], new_status)]
+    if voided:
+        move_order_sales(cursor, voided, void_transition(voided[0]['order_status'], new_status))
+    # One rollup write per creation day instead of one per order, days in order
+    for day, deltas in sorted(order_status_deltas(changed, new_status).items()):
+        adjust_order_rollup(cursor, day, deltas)
+    return {order['id'] for order in changed}
+
+def lock_orders(cursor, column, values):
+    """{value: order row} for the orders whose column is in values, locked FOR UPDATE"""
+    orders = {}
+    for batch in chunked(values):
+        format_strings = ','.join(['%s'] * len(batch))
+        cursor.execute(f'''
+            SELECT {ORDER_STATUS_COLUMNS}
+            FROM orders WHERE {column} IN ({format_strings})
+            FOR UPDATE
+        ''', tuple(batch))
+        orders.update((row[column], row) for row in cursor.fetchall())
+    return orders
+
+def bulk_status_ids(data, key):
+    """The de-duplicated ids listed under key, in request order; raises ValueError"""
+    ids = data.get(key)
+    if not isinstance(ids, list) or not ids:
+        raise ValueError(f'{key} must be a non-empty list')
+    try:
+        ids = list(dict.fromkeys(ids))
+    except TypeError:
+        raise ValueError(f'{key} must only contain ids')
+    if len(ids) > BULK_STATUS_MAX_IDS:
+        raise ValueError(f'At most {BULK_STATUS_MAX_IDS} {key} may be updated at once')
+    return ids
+
+def bulk_item_id(value):
+    """value as an item id the way the <int:item_id> route converter reads it, or None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value if value >= 0 else None
+    if isinstance(value, str) and value.isascii() and value.isdigit():
+        return int(value)
+    return None
+
+@app.route('/orders/status', methods=['PATCH'])
+def bulk_update_order_status():
+    """Move many orders to one status in a single transaction"""
+    conn = None
+    try:
+        data = request.get_json() or {}
+        new_status = data.get('status')
+        if new_status not in ORDER_STATUSES:
+            return jsonify({'message': f'Invalid status. Must be one of: {", ".join(ORDER_STATUSES)}'}), 400
+        try:
+            order_numbers = [str(number) for number in bulk_status_ids(data, 'order_numbers')]
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+
+        conn = get_db()
+        cursor = conn.cursor()
+        orders = lock_orders(cursor, 'order_number', order_numbers)
+        changed = set_order_statuses(cursor, list(orders.values()), new_status)
+        conn.commit()
+        cursor.close()
+        if changed:
+            catalog_cache.invalidate('orders', 'sales')
+
+        results = []
+        for order_number in order_numbers:
+            order = orders.get(order_number)
+            outcome = 'not_found' if not order else ('updated' if order['id'] in changed else 'unchanged')
+            results.append({'order_number': order_number, 'outcome': outcome})
+        return jsonify({
+            'status': new_status,
+            'updated': len(changed),
+            'unchanged': len(orders) - len(changed),
+            'not_found': len(order_numbers) - len(orders),
+            'results': results
+        }), 200
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error bulk updating order status: {str(e)}")
+        if conn:
+            try:
+                conn.rollback()
+            except Exception as rollback_error:
+                app.logger.error(f"Error during rollback: {str(rollback_error)}")
+        return jsonify({'message': 'Failed to update order status', 'error': str(e)}), 500
+
+@app.route('/orders/items/status', methods=['PATCH'])
+def bulk_update_order_item_status():
+    """
+    Move many order items to one status in a single transaction, optionally
+    re-deriving the status of every order they belong to
+    """
+    conn = None
+    try:
+        data = request.get_json() or {}
+        new_status = data.get('status')
+        if new_status not in ORDER_ITEM_STATUSES:
+            return jsonify({'message': f'Invalid status. Must be one of: {", ".join(ORDER_ITEM_STATUSES)}'}), 400
+        try:
+            requested = bulk_status_ids(data, 'item_ids')
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        coerced = {item_id: bulk_item_id(item_id) for item_id in requested}
+        # 5 and "5" name the same item
+        item_ids = list(dict.fromkeys(item_id for item_id in coerced.values() if item_id is not None))
+
+        conn = get_db()
+        cursor = conn.cursor()
+        items = {}
+        for batch in chunked(item_ids):
+            format_strings = ','.join(['%s'] * len(batch))
+            cursor.execute(
+                f'SELECT id, order_id, status FROM order_items WHERE id IN ({format_strings}) FOR UPDATE',
+                tuple(batch)
+            )
+            items.update((row['id'], row) for row in cursor.fetchall())
+        changed = [item['id'] for item in items.values() if item['status'] != new_status]
+        for batch in chunked(changed):
+            format_strings = ','.join(['%s'] * len(batch))
+            cursor.execute(
+                f'UPDATE order_items SET status = %s WHERE id IN ({format_strings})',
+                (new_status, *batch)
+            )
+
+        order_updates = []
+        if parse_bool(data.get('update_order_status', False)) and changed:
+            order_ids = list({items[item_id]['order_id'] for item_id in changed})
+            orders = lock_orders(cursor, 'id', order_ids)
+            item_statuses = {}
+            for batch in chunked(order_ids):
+                format_strings = ','.join(['%s'] * len(batch))
+                cursor.execute(
+                    f'SELECT order_id, status FROM order_items WHERE order_id IN ({format_strings})',
+                    tuple(batch)
+                )
+                for row in cursor.fetchall():
+                    item_statuses.setdefault(row['order_id'], []).append(row['status'])
+            # Orders moving to the same derived status share one UPDATE
+            by_status = {}
+            for order_id, statuses in item_statuses.items():
+                by_status.setdefault(derive_order_status(statuses), []).append(orders[order_id])
+            for order_status, group in by_status.items():
+                updated = set_order_statuses(cursor, group, order_status)
+                order_updates.extend(
+                    {'order_number': order['order_number'], 'status': order_status}
+                    for order in group if order['id'] in updated
+                )
+
+        conn.commit()
+        cursor.close()
+        if changed:
+            catalog_cache.invalidate('orders', 'sales')
+
+        changed_ids = set(changed)
+        results = []
+        for item_id in requested:
+            if coerced[item_id] is None:
+                outcome = 'invalid'
+            elif coerced[item_id] not in items:
+                outcome = 'not_found'
+            else:
+                outcome = 'updated' if coerced[item_id] in changed_ids else 'unchanged'
+            results.append({'item_id': item_id, 'outcome': outcome})
+        return jsonify({
+            'status': new_status,
+            'updated': len(changed),
+            'unchanged': len(items) - len(changed),
+            'not_found': len(item_ids) - len(items),
+            'invalid': sum(1 for item_id in coerced.values() if item_id is None),
+            'results': results,
+            'orders_updated': order_updates
+        }), 200
+    except PoolTimeoutError:
+        raise
+    except Exception as e:
+        app.logger.error(f"Error bulk updating order item status: {str(e)}")
+        if conn:
+            try:
+                conn.rollback()
+            except Exception as rollback_error:
+                app.logger.error(f"Error during rollback: {str(rollback_error)}")
+        return jsonify({'message': 'Failed to update order item status', 'error': str(e)}), 500
+
+@app.route('/orders/status', methods=['OPTIONS'])
+@app.route('/orders/items/status', methods=['OPTIONS'])
+def handle_bulk_status_options():
+    return jsonify({}), 200
+
 # Add the OPTIONS handler for the new route
 @app.route('/orders/<string:order_number>/items/<int:item_id>/status', methods=['OPTIONS'])
 def handle_item_status_options(order_number, item_id):
@@ -1605,13 +5419,215 @@ def handle_options_request(order_number=None):
     return jsonify({}), 200
 
 
+# `flask check-query-plans` replays these requests through the real routes,
+# records every statement they send and EXPLAINs it, so the plans checked
+# are those of the SQL the routes actually run. Reads are executed; writes
+# are only recorded, so the replay changes nothing in the database.
+# Endpoints that return a whole table by design (GET /products and
+# /categories without limit, GET /deliveries) are left out.
+QUERY_PLAN_REQUESTS = [
+    ('GET', '/products?limit=50', None),
+    ('GET', '/products?category_id={category_id}&min_price=0&sort_by=price-low&limit=50', None),
+    ('GET', '/products/{product_id}', None),
+    ('GET', '/orders?limit=50&include=items,payments,coupon', None),
+    ('GET', '/orders?status=pending&limit=50', None),
+    ('GET', '/orders?customer_email={customer_email}&limit=50', None),
+    ('GET', '/orders?date_from=2024-01-01&limit=50', None),
+    ('GET', '/orders/{order_number}', None),
+    ('POST', '/coupons/validate', lambda s: {'code': s['coupon_code'], 'subtotal': 1000}),
+    ('POST', '/products/check-stock', lambda s: {'items': [{'productId': s['product_id'], 'quantity': 1}]}),
+    ('POST', '/products/reserve', lambda s: {'items': [{'product_id': s['product_id'], 'quantity': 1}]}),
+    ('POST', '/orders', lambda s: {
+        'customer_name': 'Plan Check', 'customer_email': 'plan-check@example.com', 'shipping_address': '-',
+        'shipping_city': '-', 'shipping_state': '-', 'shipping_country': '-', 'shipping_zip_code': '-',
+        'delivery_method': 'standard', 'subtotal': 1, 'shipping_cost': 0, 'tax_amount': 0,
+        'payment_method': 'card', 'reservation_token': 'plan-check',
+        'items': [{'product_id': s['product_id'], 'quantity': 1, 'unit_price': 1}]
+    }),
+    ('POST', '/orders/{order_number}/payment', lambda s: {'amount': 1, 'payment_method': 'card', 'status': 'completed'}),
+    ('PATCH', '/orders/status', lambda s: {'order_numbers': [s['order_number']], 'status': 'processing'}),
+    ('GET', '/track/{tracking_number}', None),
+]
+# Existing values substituted into the requests so that they reach past
+# their not-found checks; the fallbacks are used on an empty database
+QUERY_PLAN_SAMPLES = {
+    'product_id': ('SELECT MAX(id) AS value FROM products', 1),
+    'category_id': ('SELECT MAX(id) AS value FROM categories', 1),
+    'order_number': ('SELECT order_number AS value FROM orders ORDER BY id DESC LIMIT 1', 'ORD-0'),
+    'customer_email': ('SELECT customer_email AS value FROM orders ORDER BY id DESC LIMIT 1', 'a@b.c'),
+    'coupon_code': ('SELECT code AS value FROM coupons ORDER BY id DESC LIMIT 1', 'X'),
+    'tracking_number': ('SELECT tracking_number AS value FROM deliveries ORDER BY id DESC LIMIT 1', 'X'),
+}
+# Tables small enough by construction (one row per category or per day)
+# that scanning or sorting them is fine
+QUERY_PLAN_SMALL_TABLES = {'categories', 'roles', 'order_daily_rollups', 'sales_daily_rollups'}
+app.config['QUERY_PLAN_MAX_ROWS'] = int(os.getenv('QUERY_PLAN_MAX_ROWS', 10000))
+
+class StatementRecorder:
+    """Collects the statements run on RecordingConnections"""
+
+    def __init__(self):
+        self.statements = OrderedDict()
+        self._lock = threading.Lock()
+
+    def record(self, query, params):
+        key = ' '.join(query.split())
+        if key.split(' ', 1)[0].upper() in ('SELECT', 'UPDATE', 'DELETE'):
+            with self._lock:
+                self.statements.setdefault(key, params)
+
+class RecordingConnection(PooledConnection):
+    """
+    Pooled connection for `flask check-query-plans`: cursors record what
+    they are sent, run only the reads, and commits are dropped, so the
+    locks the reads take are released with the rollback at release.
+    """
+
+    def __init__(self, raw, created_at, recorder):
+        super().__init__(raw, created_at)
+        self.recorder = recorder
+
+    def cursor(self):
+        return RecordingCursor(super().cursor(), self.recorder)
+
+    def commit(self):
+        pass
+
+class RecordingCursor:
+    """
+    Records every statement but only executes reads. A skipped write
+    reports a row per parameter set and no result rows, so the route
+    carries on down the path it takes when the write succeeds.
+    """
+
+    WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+    def __init__(self, cursor, recorder):
+        self._cursor = cursor
+        self._recorder = recorder
+        self._skipped = None
+
+    def _is_write(self, query):
+        return query.split(None, 1)[0].upper() in self.WRITE_STATEMENTS
+
+    def execute(self, query, params=None):
+        self._recorder.record(query, params)
+        if self._is_write(query):
+            self._skipped = 1
+            return 1
+        self._skipped = None
+        return self._cursor.execute(query, params)
+
+    def executemany(self, query, seq):
+        seq = list(seq)
+        if seq:
+            self._recorder.record(query, seq[0])
+        if self._is_write(query):
+            self._skipped = len(seq)
+            return len(seq)
+        self._skipped = None
+        return self._cursor.executemany(query, seq)
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount if self._skipped is None else self._skipped
+
+    @property
+    def lastrowid(self):
+        return self._cursor.lastrowid if self._skipped is None else 0
+
+    def fetchone(self):
+        return self._cursor.fetchone() if self._skipped is None else None
+
+    def fetchall(self):
+        return self._cursor.fetchall() if self._skipped is None else ()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+def plan_problems(plan_rows):
+    """Describe the full scans, filesorts and large row estimates in EXPLAIN output"""
+    problems = []
+    for row in plan_rows:
+        table = row.get('table')
+        if not table or table.startswith('<'):
+            continue
+        small = table in QUERY_PLAN_SMALL_TABLES
+        if row.get('type') == 'ALL' and not small:
+            problems.append(f'full scan of {table}')
+        if 'Using filesort' in (row.get('Extra') or '') and not small:
+            problems.append(f'filesort on {table}')
+        if (row.get('rows') or 0) > app.config['QUERY_PLAN_MAX_ROWS']:
+            problems.append(f"{table} estimated at {row['rows']} rows")
+    return problems
+
+def record_route_statements(samples, connect=connect_mysql):
+    """Replay QUERY_PLAN_REQUESTS and return {statement: params} for everything they ran"""
+    global db_pool
+    recorder = StatementRecorder()
+    client = app.test_client()
+    serving_pool = db_pool
+    # The routes reach the database through db_pool, so it is swapped for a
+    # pool of recording connections while the requests are replayed
+    db_pool = ConnectionPool(
+        connect, min_size=0, max_size=2, recycle=3600, wait_timeout=app.config['MYSQL_POOL_WAIT_TIMEOUT'],
+        ping_interval=3600, connection_class=lambda raw, created_at: RecordingConnection(raw, created_at, recorder)
+    )
+    try:
+        for method, path, body in QUERY_PLAN_REQUESTS:
+            client.open(path.format(**samples), method=method, json=body(samples) if body else None)
+        # Background helpers that run outside requests
+        conn = db_pool.acquire()
+        try:
+            release_expired_reservations(conn)
+        finally:
+            db_pool.release(conn)
+        claim_asset_deletions()
+    finally:
+        db_pool = serving_pool
+    return recorder.statements
+
+@app.cli.command('check-query-plans')
+def check_query_plans():
+    """
+    Fail if a hot route statement scans a table, sorts with filesort or
+    expects too many rows.
+
+    Replays QUERY_PLAN_REQUESTS through the real views against MYSQL_DB.
+    Reads run (and are rolled back), writes are recorded and EXPLAINed but
+    never executed, so the database, its AUTO_INCREMENT counters and the
+    serving processes' caches are left untouched. Point MYSQL_DB at a
+    production-sized copy for meaningful row estimates.
+    """
+    app.config['ASSET_DELETION_WORKER'] = False
+    cursor = get_cursor()
+    samples = {}
+    for key, (query, fallback) in QUERY_PLAN_SAMPLES.items():
+        cursor.execute(query)
+        row = cursor.fetchone()
+        samples[key] = row['value'] if row and row['value'] is not None else fallback
+    get_db().rollback()
+
+    failures = 0
+    for query, params in record_route_statements(samples).items():
+        cursor.execute('EXPLAIN ' + query, params)
+        problems = plan_problems(cursor.fetchall())
+        if problems:
+            failures += 1
+            print(f"FAIL {query}\n     {'; '.join(problems)}")
+        else:
+            print(f'ok   {query}')
+    cursor.close()
+    if failures:
+        raise SystemExit(f'{failures} route statements have unindexed plans')
+
 # Database schema setup function
 def create_delivery_tables():
     """
     Function to create necessary tables for the delivery management system
     """
     try:
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         
         # Create deliveries table
         cursor.execute('''
@@ -1645,7 +5661,7 @@ def create_delivery_tables():
             )
         ''')
         
-        mysql.connection.commit()
+        get_db().commit()
         app.logger.info("Delivery tables created successfully")
         
     except Exception as e:
@@ -1656,7 +5672,7 @@ def create_delivery_tables():
 @app.route('/deliveries', methods=['GET'])
 def get_deliveries():
     try:
-        cursor = mysql.connection.cursor(dictionary=True)
+        cursor = get_cursor()
         
         # Get query parameters for filtering
         order_number = request.args.get('order_number')
@@ -1730,6 +5746,8 @@ def get_deliveries():
                         delivery[date_field] = delivery[date_field].isoformat()
         
         return jsonify(deliveries), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         app.logger.error(f"Error fetching deliveries: {str(e)}")
         return jsonify({'message': 'Failed to fetch deliveries', 'error': str(e)}), 500
@@ -1738,7 +5756,7 @@ def get_deliveries():
 @app.route('/deliveries/<int:delivery_id>', methods=['GET'])
 def get_delivery(delivery_id):
     try:
-        cursor = mysql.connection.cursor(dictionary=True)
+        cursor = get_cursor()
         
         # Query with product information
         cursor.execute('''
@@ -1775,6 +5793,8 @@ def get_delivery(delivery_id):
                     event['timestamp'] = event['timestamp'].isoformat()
         
         return jsonify(delivery), 200
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         app.logger.error(f"Error fetching delivery {delivery_id}: {str(e)}")
         return jsonify({'message': 'Failed to fetch delivery', 'error': str(e)}), 500
@@ -1800,8 +5820,8 @@ def create_delivery(order_number):
         except (ValueError, TypeError):
             return jsonify({'message': 'Quantity must be a valid number'}), 400
         
-        conn = mysql.connection
-        cursor = conn.cursor(dictionary=True)
+        conn = get_db()
+        cursor = conn.cursor()
         
         # Check if order exists
         cursor.execute('SELECT id FROM orders WHERE order_number = %s', (order_number,))
@@ -1870,9 +5890,10 @@ def create_delivery(order_number):
         
         # Update order status to shipped if requested
         if data.get('update_order_status', False):
-            cursor.execute('UPDATE orders SET order_status = %s WHERE id = %s', ('shipped', order['id']))
+            set_order_status(cursor, order['id'], 'shipped')
         
         conn.commit()
+        catalog_cache.invalidate('orders')
         
         # Fetch the created delivery for response
         cursor.execute('''
@@ -1894,6 +5915,8 @@ def create_delivery(order_number):
             'delivery_id': delivery_id,
             'delivery': created_delivery
         }), 201
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         app.logger.error(f"Error creating delivery for order {order_number}: {str(e)}")
         if conn:
@@ -1921,8 +5944,8 @@ def add_tracking_event(delivery_id):
         if data['status'] not in valid_statuses:
             return jsonify({'message': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'}), 400
         
-        conn = mysql.connection
-        cursor = conn.cursor(dictionary=True)
+        conn = get_db()
+        cursor = conn.cursor()
         
         # Check if delivery exists
         cursor.execute('SELECT id, order_id FROM deliveries WHERE id = %s', (delivery_id,))
@@ -1958,9 +5981,10 @@ def add_tracking_event(delivery_id):
         # Update order status if delivered or cancelled
         if data['status'] in ['delivered', 'cancelled']:
             new_order_status = 'delivered' if data['status'] == 'delivered' else 'cancelled'
-            cursor.execute('UPDATE orders SET order_status = %s WHERE id = %s', (new_order_status, delivery['order_id']))
+            set_order_status(cursor, delivery['order_id'], new_order_status)
         
         conn.commit()
+        catalog_cache.invalidate('orders', 'sales')
         
         # Get the created event
         cursor.execute('''
@@ -1980,6 +6004,8 @@ def add_tracking_event(delivery_id):
             'message': 'Tracking event added successfully',
             'event': created_event
         }), 201
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         app.logger.error(f"Error adding tracking event for delivery {delivery_id}: {str(e)}")
         if conn:
@@ -2017,7 +6043,7 @@ def update_delivery_status(product_id):
             return jsonify({"message": f"Invalid status. Must be one of: {', '.join(valid_statuses)}", "success": False}), 400
         
         # Check if the record exists
-        cursor = mysql.connection.cursor()
+        cursor = get_cursor()
         cursor.execute(
             "SELECT id FROM deliveries WHERE order_id = %s AND product_id = %s", 
             (order_id, product_id)
@@ -2034,7 +6060,7 @@ def update_delivery_status(product_id):
                 """, 
                 (order_id, product_id, new_status)
             )
-            mysql.connection.commit()
+            get_db().commit()
             cursor.close()
             
             return jsonify({
@@ -2056,7 +6082,7 @@ def update_delivery_status(product_id):
             )
             
             # Commit the changes
-            mysql.connection.commit()
+            get_db().commit()
             cursor.close()
             
             return jsonify({
@@ -2067,6 +6093,8 @@ def update_delivery_status(product_id):
                 "success": True
             }), 200
         
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         return jsonify({
             "message": "Failed to update delivery status", 
@@ -2078,7 +6106,7 @@ def update_delivery_status(product_id):
 @app.route('/track/<string:tracking_number>', methods=['GET'])
 def track_delivery(tracking_number):
     try:
-        cursor = mysql.connection.cursor(dictionary=True)
+        cursor = get_cursor()
         
         # Query with product information
         cursor.execute('''
@@ -2136,7 +6164,11 @@ def track_delivery(tracking_number):
             'tracking_history': tracking_events
         }
         
-        return jsonify(result), 200
+        # Tracking pages are polled; let clients revalidate with If-None-Match.
+        # The body carries the customer's name, so keep it out of shared caches
+        return conditional_json_response(jsonify(result).get_data(), public=False)
+    except PoolTimeoutError:
+        raise
     except Exception as e:
         app.logger.error(f"Error tracking delivery {tracking_number}: {str(e)}")
         return jsonify({'message': 'Failed to track delivery', 'error': str(e)}), 500
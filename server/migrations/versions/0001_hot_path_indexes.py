@@ -0,0 +1,95 @@
+"""Indexes for the hot query paths
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns, unique)
+INDEXES = [
+    # Order lookups by number, customer and date; listings page on (created_at, id)
+    ('uq_orders_order_number', 'orders', ['order_number'], True),
+    ('ix_orders_customer_email_created_at', 'orders', ['customer_email', 'created_at'], False),
+    ('ix_orders_order_status_created_at', 'orders', ['order_status', 'created_at'], False),
+    ('ix_orders_created_at', 'orders', ['created_at'], False),
+    ('ix_order_items_order_id', 'order_items', ['order_id'], False),
+    ('ix_payments_order_id_status', 'payments', ['order_id', 'status'], False),
+    ('ix_product_images_product_id', 'product_images', ['product_id'], False),
+    ('ix_products_category_id_price', 'products', ['category_id', 'price'], False),
+    ('uq_coupons_code', 'coupons', ['code'], True),
+    ('ix_deliveries_tracking_number', 'deliveries', ['tracking_number'], False),
+    ('uq_deliveries_order_id_product_id', 'deliveries', ['order_id', 'product_id'], True),
+    ('ix_delivery_tracking_events_delivery_id_timestamp', 'delivery_tracking_events', ['delivery_id', 'timestamp'], False),
+]
+
+log = logging.getLogger('alembic.migration.0001')
+
+
+def duplicate_groups(bind, table, columns):
+    """Rows sharing a value of the columns about to get a unique index"""
+    key = ', '.join(columns)
+    return bind.execute(sa.text(f'''
+        SELECT {key}, MIN(id) AS keep_id, COUNT(*) AS copies
+        FROM {table} GROUP BY {key} HAVING COUNT(*) > 1
+    ''')).mappings().all()
+
+
+def duplicates_join(table, columns):
+    key = ', '.join(columns)
+    match = ' AND '.join(f't.{column} = d.{column}' for column in columns)
+    return f'''
+        {table} t JOIN (
+            SELECT {key}, MIN(id) AS keep_id FROM {table} GROUP BY {key} HAVING COUNT(*) > 1
+        ) d ON {match} AND t.id <> d.keep_id
+    '''
+
+
+def resolve_duplicates(bind):
+    """Make existing rows fit the unique indexes; the oldest row of each group keeps its value"""
+    for group in duplicate_groups(bind, 'orders', ['order_number']):
+        log.warning(
+            f"{group['copies']} orders share order_number {group['order_number']}; "
+            f"renaming all but order {group['keep_id']} to <order_number>-<id>"
+        )
+    bind.execute(sa.text(f"UPDATE {duplicates_join('orders', ['order_number'])} SET t.order_number = CONCAT(t.order_number, '-', t.id)"))
+
+    for group in duplicate_groups(bind, 'coupons', ['code']):
+        log.warning(
+            f"{group['copies']} coupons share code {group['code']}; "
+            f"renaming all but coupon {group['keep_id']} to <code>-<id> and deactivating them"
+        )
+    bind.execute(sa.text(f"UPDATE {duplicates_join('coupons', ['code'])} SET t.code = CONCAT(t.code, '-', t.id), t.is_active = 0"))
+
+    # Extra deliveries for the same order line are merged into the oldest one:
+    # their tracking events move over, then the rows go
+    for group in duplicate_groups(bind, 'deliveries', ['order_id', 'product_id']):
+        log.warning(
+            f"{group['copies']} deliveries for order {group['order_id']} product {group['product_id']}; "
+            f"merging into delivery {group['keep_id']}"
+        )
+    bind.execute(sa.text(f"""
+        UPDATE delivery_tracking_events e JOIN {duplicates_join('deliveries', ['order_id', 'product_id'])}
+            ON e.delivery_id = t.id
+        SET e.delivery_id = d.keep_id
+    """))
+    bind.execute(sa.text(f"DELETE t FROM {duplicates_join('deliveries', ['order_id', 'product_id'])}"))
+
+
+def upgrade():
+    resolve_duplicates(op.get_bind())
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
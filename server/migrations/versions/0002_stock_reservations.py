@@ -0,0 +1,31 @@
+"""Stock reservations table
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stock_reservations',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('reservation_token', sa.String(64), nullable=False),
+        sa.Column('product_id', sa.Integer, sa.ForeignKey('products.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('quantity', sa.Integer, nullable=False),
+        sa.Column('expires_at', sa.DateTime, nullable=False),
+        sa.Column('created_at', sa.TIMESTAMP, server_default=sa.func.current_timestamp()),
+    )
+    op.create_index('ix_stock_reservations_reservation_token', 'stock_reservations', ['reservation_token'])
+    op.create_index('ix_stock_reservations_expires_at', 'stock_reservations', ['expires_at'])
+
+
+def downgrade():
+    op.drop_table('stock_reservations')
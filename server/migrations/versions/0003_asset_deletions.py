@@ -0,0 +1,31 @@
+"""Cloudinary asset deletion queue
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'asset_deletions',
+        sa.Column('id', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('public_id', sa.String(255), nullable=False),
+        sa.Column('attempts', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('next_attempt_at', sa.DateTime, nullable=False, server_default=sa.func.current_timestamp()),
+        sa.Column('last_error', sa.Text, nullable=True),
+        sa.Column('dead_lettered_at', sa.DateTime, nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP, server_default=sa.func.current_timestamp()),
+    )
+    op.create_index('ix_asset_deletions_due', 'asset_deletions', ['dead_lettered_at', 'next_attempt_at'])
+
+
+def downgrade():
+    op.drop_table('asset_deletions')
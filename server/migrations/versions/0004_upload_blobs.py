@@ -0,0 +1,29 @@
+"""Content-addressed upload reference counts
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'upload_blobs',
+        sa.Column('content_hash', sa.CHAR(64), primary_key=True),
+        sa.Column('extension', sa.String(10), nullable=False),
+        sa.Column('size', sa.BigInteger, nullable=False),
+        sa.Column('ref_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('created_at', sa.TIMESTAMP, server_default=sa.func.current_timestamp()),
+    )
+    op.create_index('ix_upload_blobs_ref_count', 'upload_blobs', ['ref_count'])
+
+
+def downgrade():
+    op.drop_table('upload_blobs')
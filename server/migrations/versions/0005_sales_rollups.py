@@ -0,0 +1,38 @@
+"""Sales rollup tables for the analytics endpoints
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows recorded before this column existed are dated to the migration
+    op.add_column('sales', sa.Column('sold_at', sa.DateTime, nullable=False, server_default=sa.func.current_timestamp()))
+    op.create_table(
+        'product_sales_rollups',
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('product_id', sa.Integer, primary_key=True),
+        sa.Column('units', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('line_count', sa.Integer, nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'sales_daily_rollups',
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('order_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(14, 2), nullable=False, server_default='0'),
+    )
+
+
+def downgrade():
+    op.drop_table('sales_daily_rollups')
+    op.drop_table('product_sales_rollups')
+    op.drop_column('sales', 'sold_at')
@@ -0,0 +1,37 @@
+"""Per-day order rollups
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+ORDER_STATUSES = ('pending', 'processing', 'shipped', 'delivered', 'cancelled', 'refunded')
+PAYMENT_STATUSES = ('pending', 'paid', 'partially_paid', 'failed', 'refunded')
+
+
+def upgrade():
+    op.create_table(
+        'order_daily_rollups',
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('order_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('gross', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('subtotal', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('discount', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('tax', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('shipping', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('paid_amount', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        sa.Column('refunded_amount', sa.Numeric(14, 2), nullable=False, server_default='0'),
+        *[sa.Column(f'status_{status}', sa.Integer, nullable=False, server_default='0') for status in ORDER_STATUSES],
+        *[sa.Column(f'payment_{status}', sa.Integer, nullable=False, server_default='0') for status in PAYMENT_STATUSES],
+    )
+
+
+def downgrade():
+    op.drop_table('order_daily_rollups')
@@ -0,0 +1,47 @@
+"""Unique product SKUs for the bulk import upsert
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+import logging
+
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+log = logging.getLogger('alembic.migration.0007')
+
+
+def upgrade():
+    bind = op.get_bind()
+    # Blank skus mean "no sku" and must not collide with each other
+    bind.execute(sa.text("UPDATE products SET sku = NULLIF(TRIM(sku), '') WHERE sku IS NOT NULL"))
+    # The oldest product keeps a shared sku; the others get "-<id>" appended
+    duplicates = bind.execute(sa.text('''
+        SELECT sku, MIN(id) AS keep_id, COUNT(*) AS copies
+        FROM products WHERE sku IS NOT NULL GROUP BY sku HAVING COUNT(*) > 1
+    ''')).mappings().all()
+    for group in duplicates:
+        log.warning(
+            f"{group['copies']} products share sku {group['sku']}; "
+            f"renaming all but product {group['keep_id']} to <sku>-<id>"
+        )
+    bind.execute(sa.text('''
+        UPDATE products p JOIN (
+            SELECT sku, MIN(id) AS keep_id FROM products WHERE sku IS NOT NULL GROUP BY sku HAVING COUNT(*) > 1
+        ) d ON p.sku = d.sku AND p.id <> d.keep_id
+        SET p.sku = CONCAT(p.sku, '-', p.id)
+    '''))
+    # Imports match existing products by id or sku via ON DUPLICATE KEY UPDATE.
+    # NULL skus stay allowed and never collide.
+    op.create_index('uq_products_sku', 'products', ['sku'], unique=True)
+
+
+def downgrade():
+    op.drop_index('uq_products_sku', table_name='products')
@@ -0,0 +1,30 @@
+"""Upload references counted per row
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Time of the last upload of the bytes, for the claim grace period
+    op.add_column('upload_blobs', sa.Column('stored_at', sa.TIMESTAMP, nullable=False, server_default=sa.func.current_timestamp()))
+    # ref_count counted uploads until now; recount it as the rows using each file
+    op.execute('''
+        UPDATE upload_blobs b
+        SET ref_count = (
+            SELECT COUNT(*) FROM categories c
+            WHERE c.image LIKE CONCAT('%/static/uploads/', b.content_hash, '.%')
+        )
+    ''')
+
+
+def downgrade():
+    op.drop_column('upload_blobs', 'stored_at')
@@ -0,0 +1,67 @@
+"""Sharded sales rollup rows; cancelled and refunded orders out of sales revenue
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+# table -> primary key without the shard column
+ROLLUP_KEYS = {
+    'product_sales_rollups': ['day', 'product_id'],
+    'sales_daily_rollups': ['day'],
+}
+VOID_STATUSES = "'cancelled', 'refunded'"
+
+
+def upgrade():
+    # Existing rows become shard 0, one per key as before
+    for table, key in ROLLUP_KEYS.items():
+        op.add_column(table, sa.Column('shard', sa.SmallInteger, nullable=False, server_default='0'))
+        op.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY ({', '.join(key + ['shard'])})")
+
+    # Take the orders already cancelled or refunded out of sales revenue
+    op.execute(f'''
+        UPDATE product_sales_rollups r JOIN (
+            SELECT DATE(o.created_at) AS day, oi.product_id, SUM(oi.quantity) AS units,
+                   SUM(oi.total_price) AS revenue, COUNT(*) AS line_count
+            FROM order_items oi JOIN orders o ON o.id = oi.order_id
+            WHERE o.order_status IN ({VOID_STATUSES})
+            GROUP BY DATE(o.created_at), oi.product_id
+        ) v ON v.day = r.day AND v.product_id = r.product_id
+        SET r.units = r.units - v.units, r.revenue = r.revenue - v.revenue, r.line_count = r.line_count - v.line_count
+    ''')
+    op.execute(f'''
+        UPDATE sales_daily_rollups r JOIN (
+            SELECT DATE(o.created_at) AS day, COUNT(DISTINCT o.id) AS order_count, SUM(oi.total_price) AS revenue
+            FROM order_items oi JOIN orders o ON o.id = oi.order_id
+            WHERE o.order_status IN ({VOID_STATUSES})
+            GROUP BY DATE(o.created_at)
+        ) v ON v.day = r.day
+        SET r.order_count = r.order_count - v.order_count, r.revenue = r.revenue - v.revenue
+    ''')
+
+
+def downgrade():
+    # Collapse the shards back into one row per key; the amounts keep excluding void orders
+    for table, key in ROLLUP_KEYS.items():
+        columns = [c['name'] for c in sa.inspect(op.get_bind()).get_columns(table) if c['name'] not in key + ['shard']]
+        # Every key needs a shard 0 row to receive the sum
+        op.execute(f"INSERT IGNORE INTO {table} ({', '.join(key)}, shard) SELECT DISTINCT {', '.join(key)}, 0 FROM {table}")
+        op.execute(f'''
+            UPDATE {table} r JOIN (
+                SELECT {', '.join(key)}, {', '.join(f'SUM({column}) AS {column}' for column in columns)}
+                FROM {table} GROUP BY {', '.join(key)}
+            ) t ON {' AND '.join(f'r.{column} = t.{column}' for column in key)}
+            SET {', '.join(f'r.{column} = t.{column}' for column in columns)}
+            WHERE r.shard = 0
+        ''')
+        op.execute(f'DELETE FROM {table} WHERE shard <> 0')
+        op.execute(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY ({', '.join(key)})")
+        op.drop_column(table, 'shard')
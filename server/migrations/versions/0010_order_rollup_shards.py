@@ -0,0 +1,48 @@
+"""Sharded order rollup rows; cancelled and refunded orders out of the amounts
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+VOID_STATUSES = "'cancelled', 'refunded'"
+AMOUNTS = {'gross': 'total_amount', 'subtotal': 'subtotal', 'discount': 'discount_amount', 'tax': 'tax_amount', 'shipping': 'shipping_cost'}
+
+
+def upgrade():
+    # Existing rows become shard 0, one per day as before
+    op.add_column('order_daily_rollups', sa.Column('shard', sa.SmallInteger, nullable=False, server_default='0'))
+    op.execute('ALTER TABLE order_daily_rollups DROP PRIMARY KEY, ADD PRIMARY KEY (day, shard)')
+    # Take the orders already cancelled or refunded out of the amounts
+    op.execute(f'''
+        UPDATE order_daily_rollups r JOIN (
+            SELECT DATE(created_at) AS day, {', '.join(f'SUM({source}) AS {column}' for column, source in AMOUNTS.items())}
+            FROM orders WHERE order_status IN ({VOID_STATUSES})
+            GROUP BY DATE(created_at)
+        ) v ON v.day = r.day
+        SET {', '.join(f'r.{column} = r.{column} - v.{column}' for column in AMOUNTS)}
+    ''')
+
+
+def downgrade():
+    # Collapse the shards back into one row per day; the amounts keep excluding void orders
+    columns = [c['name'] for c in sa.inspect(op.get_bind()).get_columns('order_daily_rollups') if c['name'] not in ('day', 'shard')]
+    op.execute('INSERT IGNORE INTO order_daily_rollups (day, shard) SELECT DISTINCT day, 0 FROM order_daily_rollups')
+    op.execute(f'''
+        UPDATE order_daily_rollups r JOIN (
+            SELECT day, {', '.join(f'SUM({column}) AS {column}' for column in columns)}
+            FROM order_daily_rollups GROUP BY day
+        ) t ON r.day = t.day
+        SET {', '.join(f'r.{column} = t.{column}' for column in columns)}
+        WHERE r.shard = 0
+    ''')
+    op.execute('DELETE FROM order_daily_rollups WHERE shard <> 0')
+    op.execute('ALTER TABLE order_daily_rollups DROP PRIMARY KEY, ADD PRIMARY KEY (day)')
+    op.drop_column('order_daily_rollups', 'shard')
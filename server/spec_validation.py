@@ -0,0 +1,25 @@
+"""
+Specification JSON checks for the bulk product import.
+
+Kept apart from app.py so the fork server behind the validation pool can
+preload just this module. Note that multiprocessing still runs the
+program's main script in every worker it starts, as __mp_main__: under
+gunicorn or `flask run` that is their launcher, but under `python app.py`
+it is app.py itself, whose __main__ guard keeps it from serving.
+"""
+import json
+
+
+def specification_errors(values):
+    """For each value, None when it is empty or valid JSON, otherwise the parse error"""
+    errors = []
+    for value in values:
+        if not value:
+            errors.append(None)
+            continue
+        try:
+            json.loads(value)
+            errors.append(None)
+        except ValueError as e:
+            errors.append(str(e))
+    return errors
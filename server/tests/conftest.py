@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+try:
+    import MySQLdb  # noqa: F401
+except ImportError:
+    # Unit tests never reach a real server; see stubs/MySQLdb
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'stubs'))
+
+import app as app_module
+from fakedb import FakeDatabase
+
+
+@pytest.fixture(autouse=True)
+def quiet_background_workers(monkeypatch):
+    # The asset deletion worker would poll the database from a thread
+    monkeypatch.setattr(app_module, 'ensure_asset_deletion_worker', lambda: None)
+    monkeypatch.setattr(app_module, 'catalog_cache', app_module.CatalogCache(512, 60))
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    db = FakeDatabase()
+    pool = app_module.ConnectionPool(
+        db.connect, min_size=0, max_size=4, recycle=3600, wait_timeout=1, ping_interval=3600
+    )
+    monkeypatch.setattr(app_module, 'db_pool', pool)
+    return db
+
+
+@pytest.fixture
+def client():
+    app_module.app.config['TESTING'] = True
+    return app_module.app.test_client()
@@ -0,0 +1,123 @@
+"""
+In-memory database double for unit tests.
+
+FakeDatabase answers queries from rules registered with on(): the first rule
+whose pattern is found in the whitespace-normalized SQL supplies the rows.
+Every statement is recorded in .log as (sql, params) so tests can count and
+inspect queries. install() points app.db_pool at a real ConnectionPool whose
+connections are FakeConnections.
+"""
+import re
+import threading
+
+
+def normalize(sql):
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+        self.description = None
+
+    def execute(self, sql, params=None):
+        sql = normalize(sql)
+        self.db.record(sql, params)
+        result = self.db.respond(sql, params)
+        if isinstance(result, Exception):
+            raise result
+        self.rows = list(result or [])
+        # Column names come from the first row; an empty result has none
+        self.description = tuple((column,) for column in self.rows[0]) if self.rows else ()
+        self.rowcount = len(self.rows) if sql.startswith('SELECT') else self.db.next_rowcount(sql, params)
+        self.lastrowid = self.db.next_id() if sql.startswith('INSERT') else None
+        return self.rowcount
+
+    def executemany(self, sql, seq):
+        seq = list(seq)
+        sql = normalize(sql)
+        self.db.record(sql, seq, many=True)
+        result = self.db.respond(sql, seq)
+        if isinstance(result, Exception):
+            raise result
+        self.rows = []
+        self.rowcount = len(seq)
+        self.lastrowid = self.db.next_id() if sql.startswith('INSERT') else None
+        return self.rowcount
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+        self.closed = False
+
+    def cursor(self, cursorclass=None):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.db.commits += 1
+
+    def rollback(self):
+        self.db.rollbacks += 1
+
+    def ping(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.rules = []
+        self.log = []
+        self.commits = 0
+        self.rollbacks = 0
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def on(self, pattern, result):
+        """Answer statements containing pattern with result: rows, an exception, or f(sql, params)"""
+        self.rules.insert(0, (pattern, result))
+        return self
+
+    def respond(self, sql, params):
+        for pattern, result in self.rules:
+            if pattern in sql:
+                return result(sql, params) if callable(result) else result
+        return []
+
+    def record(self, sql, params, many=False):
+        with self._lock:
+            self.log.append((sql, params))
+
+    def next_rowcount(self, sql, params):
+        return 1
+
+    def next_id(self):
+        with self._lock:
+            self._last_id += 1
+            return self._last_id
+
+    def queries(self, prefix=''):
+        return [sql for sql, _ in self.log if sql.startswith(prefix)]
+
+    def connect(self):
+        return FakeConnection(self)
@@ -0,0 +1,102 @@
+"""
+Fixtures for tests that need a real MySQL server.
+
+Set TEST_MYSQL_DB to the name of a scratch database; it is dropped and
+recreated from schema.sql plus the Alembic migrations. TEST_MYSQL_HOST,
+TEST_MYSQL_USER and TEST_MYSQL_PASSWORD default to localhost/root/''.
+Without TEST_MYSQL_DB every test in this directory is skipped.
+"""
+import os
+
+import pytest
+
+import app as app_module
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SCHEMA_PATH = os.path.join(os.path.dirname(__file__), 'schema.sql')
+
+
+def pytest_collection_modifyitems(config, items):
+    for item in items:
+        if 'integration' in item.nodeid.split('/'):
+            item.add_marker(pytest.mark.mysql)
+
+
+def mysql_settings():
+    return {
+        'host': os.getenv('TEST_MYSQL_HOST', 'localhost'),
+        'user': os.getenv('TEST_MYSQL_USER', 'root'),
+        'passwd': os.getenv('TEST_MYSQL_PASSWORD', ''),
+        'db': os.getenv('TEST_MYSQL_DB'),
+    }
+
+
+@pytest.fixture(scope='session')
+def mysql_database():
+    settings = mysql_settings()
+    if not settings['db']:
+        pytest.skip('TEST_MYSQL_DB is not set')
+    MySQLdb = pytest.importorskip('MySQLdb')
+    if not hasattr(MySQLdb, 'version_info'):
+        pytest.skip('mysqlclient is not installed')
+
+    conn = MySQLdb.connect(host=settings['host'], user=settings['user'], passwd=settings['passwd'])
+    cursor = conn.cursor()
+    cursor.execute(f"DROP DATABASE IF EXISTS `{settings['db']}`")
+    cursor.execute(f"CREATE DATABASE `{settings['db']}` CHARACTER SET utf8mb4")
+    cursor.execute(f"USE `{settings['db']}`")
+    with open(SCHEMA_PATH) as f:
+        statements = [s.strip() for s in f.read().split(';')]
+    for statement in statements:
+        lines = [line for line in statement.splitlines() if not line.startswith('--')]
+        if ''.join(lines).strip():
+            cursor.execute('\n'.join(lines))
+    conn.commit()
+    conn.close()
+
+    # migrations/env.py reads the same variables as app.py
+    os.environ.update({
+        'MYSQL_HOST': settings['host'], 'MYSQL_USER': settings['user'],
+        'MYSQL_PASSWORD': settings['passwd'], 'MYSQL_DB': settings['db'],
+    })
+    from alembic import command
+    from alembic.config import Config
+    alembic_config = Config(os.path.join(SERVER_DIR, 'alembic.ini'))
+    alembic_config.set_main_option('script_location', os.path.join(SERVER_DIR, 'migrations'))
+    command.upgrade(alembic_config, 'head')
+
+    app_module.app.config.update({
+        'MYSQL_HOST': settings['host'], 'MYSQL_USER': settings['user'],
+        'MYSQL_PASSWORD': settings['passwd'], 'MYSQL_DB': settings['db'],
+    })
+    return settings
+
+
+@pytest.fixture
+def mysql_db(mysql_database, monkeypatch):
+    """Empty tables and a fresh pool for each test; yields a connect() for direct SQL"""
+    import MySQLdb
+    import MySQLdb.cursors
+
+    def connect():
+        return MySQLdb.connect(
+            host=mysql_database['host'], user=mysql_database['user'], passwd=mysql_database['passwd'],
+            db=mysql_database['db'], cursorclass=MySQLdb.cursors.DictCursor, charset='utf8mb4'
+        )
+
+    conn = connect()
+    cursor = conn.cursor()
+    cursor.execute("SELECT table_name AS name FROM information_schema.tables WHERE table_schema = DATABASE()")
+    tables = [row['name'] for row in cursor.fetchall() if row['name'] != 'alembic_version']
+    cursor.execute('SET FOREIGN_KEY_CHECKS = 0')
+    for table in tables:
+        cursor.execute(f'TRUNCATE TABLE `{table}`')
+    cursor.execute('SET FOREIGN_KEY_CHECKS = 1')
+    conn.commit()
+    conn.close()
+
+    pool = app_module.ConnectionPool(
+        app_module.connect_mysql, min_size=0, max_size=32, recycle=3600, wait_timeout=30, ping_interval=30
+    )
+    monkeypatch.setattr(app_module, 'db_pool', pool)
+    yield connect
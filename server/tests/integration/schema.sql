@@ -0,0 +1,141 @@
+-- Tables that predate migrations/versions. The integration fixture loads
+-- this into an empty database and then runs `alembic upgrade head`.
+CREATE TABLE categories (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    image VARCHAR(512),
+    icon VARCHAR(255),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE products (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(255) NOT NULL,
+    price DECIMAL(10, 2) NOT NULL,
+    image VARCHAR(512),
+    category_id INT,
+    description TEXT,
+    rating DECIMAL(3, 2),
+    full_description TEXT,
+    specifications TEXT,
+    in_stock TINYINT(1) NOT NULL DEFAULT 1,
+    stock_count INT NOT NULL DEFAULT 0,
+    sku VARCHAR(64),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (category_id) REFERENCES categories(id) ON DELETE SET NULL
+);
+
+CREATE TABLE product_images (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    image_url VARCHAR(512) NOT NULL,
+    is_primary TINYINT(1) NOT NULL DEFAULT 0,
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+);
+
+CREATE TABLE users (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    username VARCHAR(255) NOT NULL,
+    email VARCHAR(255) NOT NULL,
+    password VARCHAR(255) NOT NULL
+);
+
+CREATE TABLE coupons (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    code VARCHAR(64) NOT NULL,
+    description TEXT,
+    discount_type VARCHAR(20) NOT NULL,
+    discount_value DECIMAL(10, 2) NOT NULL,
+    min_order_value DECIMAL(10, 2) DEFAULT 0,
+    max_discount DECIMAL(10, 2),
+    is_active TINYINT(1) NOT NULL DEFAULT 1,
+    start_date DATETIME,
+    end_date DATETIME,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE orders (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    order_number VARCHAR(64) NOT NULL,
+    customer_name VARCHAR(255) NOT NULL,
+    customer_email VARCHAR(255) NOT NULL,
+    customer_phone VARCHAR(64),
+    shipping_address TEXT NOT NULL,
+    shipping_city VARCHAR(255) NOT NULL,
+    shipping_state VARCHAR(255) NOT NULL,
+    shipping_country VARCHAR(255) NOT NULL,
+    shipping_zip_code VARCHAR(32) NOT NULL,
+    delivery_method VARCHAR(64) NOT NULL,
+    delivery_instructions TEXT,
+    is_gift TINYINT(1) NOT NULL DEFAULT 0,
+    gift_message TEXT,
+    subtotal DECIMAL(12, 2) NOT NULL,
+    shipping_cost DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    tax_amount DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    discount_amount DECIMAL(12, 2) NOT NULL DEFAULT 0,
+    total_amount DECIMAL(12, 2) NOT NULL,
+    payment_method VARCHAR(64) NOT NULL,
+    payment_status VARCHAR(32) NOT NULL DEFAULT 'pending',
+    coupon_id INT,
+    order_status VARCHAR(32) NOT NULL DEFAULT 'pending',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+CREATE TABLE order_items (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    order_id INT NOT NULL,
+    product_id INT,
+    product_name VARCHAR(255),
+    quantity INT NOT NULL,
+    unit_price DECIMAL(12, 2) NOT NULL,
+    total_price DECIMAL(12, 2) NOT NULL,
+    attributes TEXT,
+    status VARCHAR(32) NOT NULL DEFAULT 'pending',
+    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+);
+
+CREATE TABLE payments (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    order_id INT NOT NULL,
+    amount DECIMAL(12, 2) NOT NULL,
+    payment_method VARCHAR(64) NOT NULL,
+    transaction_id VARCHAR(255),
+    status VARCHAR(32) NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE
+);
+
+CREATE TABLE sales (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    product_id INT NOT NULL,
+    quantity INT NOT NULL,
+    total_price DECIMAL(12, 2) NOT NULL
+);
+
+CREATE TABLE deliveries (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    order_id INT NOT NULL,
+    product_id INT NOT NULL,
+    carrier VARCHAR(255),
+    tracking_number VARCHAR(255),
+    estimated_delivery_date DATE,
+    status ENUM('pending', 'processing', 'shipped', 'delivered', 'cancelled', 'returned') NOT NULL DEFAULT 'pending',
+    quantity INT NOT NULL,
+    notes TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    FOREIGN KEY (order_id) REFERENCES orders(id) ON DELETE CASCADE,
+    FOREIGN KEY (product_id) REFERENCES products(id) ON DELETE CASCADE
+);
+
+CREATE TABLE delivery_tracking_events (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    delivery_id INT NOT NULL,
+    status VARCHAR(50) NOT NULL,
+    location VARCHAR(255) DEFAULT 'System',
+    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    details TEXT,
+    FOREIGN KEY (delivery_id) REFERENCES deliveries(id) ON DELETE CASCADE
+);
@@ -0,0 +1,78 @@
+"""Concurrent checkouts and reservations against MySQL must never oversell"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app as app_module
+from test_checkout import order_payload
+
+STOCK = 25
+BUYERS = 80
+
+
+@pytest.fixture
+def products(mysql_db):
+    conn = mysql_db()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO categories (name) VALUES ('Stress')")
+    cursor.executemany(
+        "INSERT INTO products (id, name, price, category_id, stock_count, in_stock) VALUES (%s, %s, 10, 1, %s, 1)",
+        [(1, 'A', STOCK), (2, 'B', STOCK)]
+    )
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def stock_of(conn, product_id):
+    conn.commit()
+    cursor = conn.cursor()
+    cursor.execute('SELECT stock_count FROM products WHERE id = %s', (product_id,))
+    return cursor.fetchone()['stock_count']
+
+
+def run_concurrently(requests):
+    def send(request):
+        client = app_module.app.test_client()
+        method, url, payload = request
+        response = getattr(client, method)(url, json=payload)
+        return response.status_code
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        return list(executor.map(send, requests))
+
+
+def test_concurrent_checkouts_of_one_product_do_not_oversell(products):
+    item = [{'product_id': 1, 'quantity': 1, 'unit_price': 10}]
+    statuses = run_concurrently([('post', '/orders', order_payload(item))] * BUYERS)
+
+    assert statuses.count(201) == STOCK
+    assert statuses.count(409) == BUYERS - STOCK
+    assert stock_of(products, 1) == 0
+    cursor = products.cursor()
+    cursor.execute('SELECT COALESCE(SUM(quantity), 0) AS sold FROM order_items WHERE product_id = 1')
+    assert cursor.fetchone()['sold'] == STOCK
+
+
+def test_checkouts_in_opposite_item_order_do_not_deadlock(products):
+    forward = [{'product_id': 1, 'quantity': 1, 'unit_price': 10}, {'product_id': 2, 'quantity': 1, 'unit_price': 10}]
+    backward = list(reversed(forward))
+    requests = [('post', '/orders', order_payload(forward if n % 2 else backward)) for n in range(BUYERS)]
+    statuses = run_concurrently(requests)
+
+    # A deadlock would surface as a 500
+    assert set(statuses) <= {201, 409}
+    assert statuses.count(201) == STOCK
+    assert stock_of(products, 1) == stock_of(products, 2) == 0
+
+
+def test_reservations_and_checkouts_share_stock_without_overselling(products):
+    hold = {'items': [{'product_id': 1, 'quantity': 1}]}
+    item = [{'product_id': 1, 'quantity': 1, 'unit_price': 10}]
+    requests = [
+        ('post', '/products/reserve', hold) if n % 2 else ('post', '/orders', order_payload(item))
+        for n in range(BUYERS)
+    ]
+    statuses = run_concurrently(requests)
+
+    assert statuses.count(201) == STOCK
+    assert stock_of(products, 1) == 0
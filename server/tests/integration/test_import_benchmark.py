@@ -0,0 +1,78 @@
+"""
+POST /products/import with 100k NDJSON rows, first as inserts and then as a
+re-import of the same file, which must update the products in place.
+Results are printed; run with -s to see them.
+"""
+import json
+import time
+
+import pytest
+
+import app as app_module
+
+ROW_COUNT = 100000
+
+pytestmark = pytest.mark.benchmark
+
+
+@pytest.fixture
+def import_file(mysql_db):
+    conn = mysql_db()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO categories (name) VALUES ('Bench')")
+    conn.commit()
+    conn.close()
+    rows = (
+        {
+            'sku': f'SKU-{n}', 'name': f'Product {n}', 'price': n % 500 + 0.99, 'category_id': 1,
+            'description': 'Benchmark product', 'stock_count': n % 50,
+            # Enough JSON in total to send validation to the worker pool
+            'specifications': json.dumps({'weight': n % 7, 'colour': 'black', 'tags': ['a', 'b']}),
+        }
+        for n in range(ROW_COUNT)
+    )
+    yield '\n'.join(json.dumps(row) for row in rows)
+    if app_module.spec_validation_pool is not None:
+        app_module.spec_validation_pool.shutdown()
+        app_module.spec_validation_pool = None
+
+
+def timed_import(client, body):
+    started = time.perf_counter()
+    response = client.post('/products/import', data=body, content_type='application/x-ndjson')
+    return response, time.perf_counter() - started
+
+
+def test_import_and_reimport_of_100k_rows(import_file, mysql_db, client):
+    first, first_seconds = timed_import(client, import_file)
+    second, second_seconds = timed_import(client, import_file.replace('Benchmark product', 'Updated'))
+    print(f'\n{ROW_COUNT} rows: import in {first_seconds:.2f}s, re-import in {second_seconds:.2f}s')
+
+    for response in (first, second):
+        assert response.status_code == 200
+        assert response.get_json()['upserted'] == ROW_COUNT
+        assert response.get_json()['errors'] == []
+
+    conn = mysql_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT COUNT(*) AS count, SUM(description = 'Updated') AS updated FROM products")
+    counts = cursor.fetchone()
+    conn.close()
+    assert counts['count'] == ROW_COUNT
+    assert counts['updated'] == ROW_COUNT
+
+
+def test_bad_rows_in_a_large_import_only_fail_themselves(import_file, mysql_db, client):
+    lines = import_file.split('\n')
+    # Longer than products.sku allows, so the database rejects the batch
+    bad = json.loads(lines[500])
+    bad['sku'] = 'X' * 100
+    lines[500] = json.dumps(bad)
+    lines[700] = '{"sku": "SKU-700", "price": 1}'
+
+    response, seconds = timed_import(client, '\n'.join(lines))
+    print(f'\n{ROW_COUNT} rows with two bad ones: {seconds:.2f}s')
+
+    result = response.get_json()
+    assert [error['row'] for error in result['errors']] == [501, 701]
+    assert result['upserted'] == ROW_COUNT - 2
@@ -0,0 +1,120 @@
+"""
+GET /orders against 10k orders, comparing the batched loader with the
+per-order lookups it replaced. Results are printed; run with -s to see them.
+"""
+import json
+import time
+
+import pytest
+
+import app as app_module
+
+ORDER_COUNT = 10000
+
+pytestmark = pytest.mark.benchmark
+
+
+class CountingCursor:
+    def __init__(self, cursor, counter):
+        self._cursor = cursor
+        self._counter = counter
+
+    def execute(self, *args):
+        self._counter[0] += 1
+        return self._cursor.execute(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def attach_order_details_per_order(cursor, orders):
+    """The pre-batching loader: three lookups per order"""
+    for order in orders:
+        cursor.execute('''
+            SELECT oi.*, p.name as product_name
+            FROM order_items oi
+            LEFT JOIN products p ON oi.product_id = p.id
+            WHERE oi.order_id = %s
+        ''', (order['id'],))
+        items = cursor.fetchall()
+        for item in items:
+            if item['attributes']:
+                item['attributes'] = json.loads(item['attributes'])
+        order['items'] = items
+        cursor.execute('SELECT * FROM payments WHERE order_id = %s', (order['id'],))
+        order['payments'] = cursor.fetchall()
+        if order['coupon_id']:
+            cursor.execute(
+                'SELECT code, discount_type, discount_value FROM coupons WHERE id = %s', (order['coupon_id'],)
+            )
+            order['coupon'] = cursor.fetchone()
+    return orders
+
+
+@pytest.fixture
+def ten_thousand_orders(mysql_db):
+    conn = mysql_db()
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO categories (name) VALUES ('Bench')")
+    cursor.execute("INSERT INTO products (name, price, category_id, stock_count) VALUES ('P', 10, 1, 100)")
+    cursor.execute("INSERT INTO coupons (code, discount_type, discount_value) VALUES ('SAVE', 'percentage', 10)")
+    cursor.executemany('''
+        INSERT INTO orders (
+            order_number, customer_name, customer_email, shipping_address, shipping_city,
+            shipping_state, shipping_country, shipping_zip_code, delivery_method,
+            subtotal, total_amount, payment_method, coupon_id
+        ) VALUES (%s, 'C', 'c@example.com', 'A', 'B', 'S', 'NG', '1', 'standard', 30, 30, 'card', %s)
+    ''', [(f'ORD-{n}', 1 if n % 10 == 0 else None) for n in range(ORDER_COUNT)])
+    cursor.execute('''
+        INSERT INTO order_items (order_id, product_id, product_name, quantity, unit_price, total_price)
+        SELECT id, 1, 'P', 1, 10, 10 FROM orders
+    ''')
+    cursor.execute('INSERT INTO order_items (order_id, product_id, product_name, quantity, unit_price, total_price) '
+                   'SELECT order_id, product_id, product_name, quantity, unit_price, total_price FROM order_items')
+    cursor.execute("INSERT INTO payments (order_id, amount, payment_method, status) SELECT id, 30, 'card', 'completed' FROM orders")
+    conn.commit()
+    yield conn
+    conn.close()
+
+
+def timed_load(conn, load):
+    counter = [0]
+    cursor = CountingCursor(conn.cursor(), counter)
+    started = time.perf_counter()
+    cursor.execute('SELECT * FROM orders ORDER BY created_at DESC, id DESC')
+    orders = load(cursor, cursor.fetchall())
+    return orders, counter[0], time.perf_counter() - started
+
+
+def test_batched_order_details_beat_per_order_lookups(ten_thousand_orders):
+    before, before_queries, before_seconds = timed_load(ten_thousand_orders, attach_order_details_per_order)
+    after, after_queries, after_seconds = timed_load(ten_thousand_orders, app_module.attach_order_details)
+    print(f'\n{ORDER_COUNT} orders: per-order {before_queries} queries in {before_seconds:.2f}s, '
+          f'batched {after_queries} queries in {after_seconds:.2f}s')
+
+    assert [len(order['items']) for order in after] == [len(order['items']) for order in before]
+    assert before_queries > 2 * ORDER_COUNT
+    assert after_queries <= 1 + 2 * (ORDER_COUNT // app_module.IN_CLAUSE_BATCH_SIZE + 1) + 1
+    assert after_seconds < before_seconds
+
+
+def test_get_orders_latency(ten_thousand_orders, client, monkeypatch):
+    counter = [0]
+    cursor_factory = app_module.PooledConnection.cursor
+    monkeypatch.setattr(app_module.PooledConnection, 'cursor', lambda self: CountingCursor(cursor_factory(self), counter))
+
+    started = time.perf_counter()
+    response = client.get('/orders')
+    full_seconds = time.perf_counter() - started
+    full_queries = counter[0]
+
+    counter[0] = 0
+    started = time.perf_counter()
+    page = client.get('/orders?limit=50&include=items,payments,coupon')
+    page_seconds = time.perf_counter() - started
+    print(f'\nGET /orders: all {ORDER_COUNT} in {full_seconds:.2f}s ({full_queries} queries), '
+          f'page of 50 in {page_seconds * 1000:.0f}ms ({counter[0]} queries)')
+
+    assert response.status_code == 200 and len(response.get_json()) == ORDER_COUNT
+    assert page.status_code == 200 and len(page.get_json()['data']) == 50
+    assert counter[0] == 5
@@ -0,0 +1,26 @@
+"""
+Stand-in for mysqlclient, put on sys.path by conftest.py only when the real
+driver is not installed, so that unit tests can import app.py. It provides
+the names app.py references; connecting always fails.
+"""
+from . import cursors
+
+
+class Error(Exception):
+    pass
+
+
+class DatabaseError(Error):
+    pass
+
+
+class OperationalError(DatabaseError):
+    pass
+
+
+class IntegrityError(DatabaseError):
+    pass
+
+
+def connect(**kwargs):
+    raise OperationalError(2002, "Can't connect to MySQL (mysqlclient is not installed)")
@@ -0,0 +1,6 @@
+class DictCursor:
+    pass
+
+
+class SSDictCursor:
+    pass
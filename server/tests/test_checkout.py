@@ -0,0 +1,75 @@
+import MySQLdb
+import pytest
+
+
+def order_payload(items, **extra):
+    payload = {
+        'customer_name': 'Ada', 'customer_email': 'ada@example.com', 'shipping_address': '1 Road',
+        'shipping_city': 'Lagos', 'shipping_state': 'LA', 'shipping_country': 'NG',
+        'shipping_zip_code': '100001', 'delivery_method': 'standard', 'subtotal': 20,
+        'shipping_cost': 0, 'tax_amount': 0, 'payment_method': 'card', 'items': items,
+    }
+    payload.update(extra)
+    return payload
+
+
+def stock_rows(stock):
+    def respond(sql, product_ids):
+        return [{'id': pid, 'name': f'P{pid}', 'stock_count': stock, 'in_stock': 1} for pid in product_ids]
+    return respond
+
+
+@pytest.fixture
+def checkout_db(fake_db):
+    fake_db.on('FROM stock_reservations WHERE reservation_token', [{'id': 7, 'product_id': 2, 'quantity': 1}])
+    return fake_db
+
+
+def test_checkout_locks_stock_before_inserting_the_order(checkout_db, client):
+    checkout_db.on('SELECT id, name, stock_count', stock_rows(5))
+    items = [
+        {'product_id': 2, 'quantity': 1, 'unit_price': 10, 'product_name': 'B'},
+        {'product_id': 1, 'quantity': 1, 'unit_price': 10, 'product_name': 'A'},
+    ]
+
+    response = client.post('/orders', json=order_payload(items, reservation_token='tok'))
+
+    assert response.status_code == 201
+    statements = [sql for sql, _ in checkout_db.log]
+    holds = next(i for i, sql in enumerate(statements) if 'reservation_token = %s' in sql)
+    stock_lock = next(i for i, sql in enumerate(statements) if sql.startswith('SELECT id, name, stock_count'))
+    order_insert = next(i for i, sql in enumerate(statements) if sql.startswith('INSERT INTO orders'))
+    assert holds < stock_lock < order_insert
+    # Product rows are locked in ascending id order, like /products/reserve
+    assert checkout_db.log[stock_lock][1] == (1, 2)
+
+
+def test_checkout_shortage_inserts_nothing(checkout_db, client):
+    checkout_db.on('SELECT id, name, stock_count', stock_rows(0))
+
+    response = client.post('/orders', json=order_payload([{'product_id': 1, 'quantity': 3, 'unit_price': 10}]))
+
+    assert response.status_code == 409
+    assert response.get_json()['out_of_stock'][0]['available'] == 0
+    assert checkout_db.queries('INSERT') == []
+    assert checkout_db.queries('UPDATE products') == []
+
+
+def test_checkout_retries_a_taken_order_number(checkout_db, client):
+    checkout_db.on('SELECT id, name, stock_count', stock_rows(5))
+    taken = []
+
+    def insert_order(sql, params):
+        if not taken:
+            taken.append(params[0])
+            raise MySQLdb.IntegrityError(1062, f"Duplicate entry '{params[0]}' for key 'uq_orders_order_number'")
+        return []
+    checkout_db.on('INSERT INTO orders', insert_order)
+
+    response = client.post('/orders', json=order_payload([{'product_id': 1, 'quantity': 1, 'unit_price': 10}]))
+
+    assert response.status_code == 201
+    inserts = [params for sql, params in checkout_db.log if sql.startswith('INSERT INTO orders')]
+    assert len(inserts) == 2
+    assert inserts[0][0] == taken[0]
+    assert response.get_json()['order_number'] == inserts[1][0]
@@ -0,0 +1,109 @@
+import datetime
+import json
+from decimal import Decimal
+
+import MySQLdb
+
+import app as app_module
+
+
+def order_rows(count):
+    return [
+        {
+            'id': order_id, 'order_number': f'ORD-{order_id}', 'total_amount': Decimal('10.50'),
+            'created_at': datetime.datetime(2024, 5, order_id), 'notes': None,
+        }
+        for order_id in range(1, count + 1)
+    ]
+
+
+def test_csv_export(fake_db, client):
+    fake_db.on('SELECT * FROM orders', order_rows(2))
+
+    response = client.get('/export/orders?status=pending&start=2024-05-01')
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.headers['Content-Disposition'].startswith('attachment; filename=orders-')
+    assert response.get_data(as_text=True).splitlines() == [
+        'id,order_number,total_amount,created_at,notes',
+        '1,ORD-1,10.50,2024-05-01T00:00:00,',
+        '2,ORD-2,10.50,2024-05-02T00:00:00,',
+    ]
+    sql, params = fake_db.log[-1]
+    assert 'WHERE created_at >= %s AND order_status = %s ORDER BY id' in sql
+    assert params == (datetime.date(2024, 5, 1), 'pending')
+
+
+def test_ndjson_export(fake_db, client):
+    fake_db.on('SELECT * FROM orders', order_rows(3))
+
+    response = client.get('/export/orders?format=ndjson')
+
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [line['order_number'] for line in lines] == ['ORD-1', 'ORD-2', 'ORD-3']
+    assert lines[0] == {
+        'id': 1, 'order_number': 'ORD-1', 'total_amount': '10.50',
+        'created_at': '2024-05-01T00:00:00', 'notes': None,
+    }
+
+
+def test_csv_header_is_the_first_chunk(fake_db, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'EXPORT_FETCH_SIZE', 1)
+    monkeypatch.setattr(app_module, 'EXPORT_CHUNK_SIZE', 1)
+    fake_db.on('SELECT * FROM orders', order_rows(3))
+
+    response = client.get('/export/orders', buffered=False)
+    chunks = list(response.iter_encoded())
+
+    assert chunks[0] == b'id,order_number,total_amount,created_at,notes\r\n'
+    assert len(chunks) == 4
+
+
+def test_finished_download_returns_its_connection(fake_db, client):
+    fake_db.on('SELECT * FROM orders', order_rows(2))
+
+    response = client.get('/export/orders')
+    response.get_data()
+    # The server closes the response once the body is sent
+    response.close()
+
+    stats = app_module.db_pool.stats()
+    assert (stats['in_use'], stats['idle']) == (0, stats['size'])
+    assert stats['size'] >= 1
+
+
+def test_cancelled_download_discards_its_connection(fake_db, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'EXPORT_FETCH_SIZE', 1)
+    monkeypatch.setattr(app_module, 'EXPORT_CHUNK_SIZE', 1)
+    fake_db.on('SELECT * FROM orders', order_rows(3))
+
+    response = client.get('/export/orders', buffered=False)
+    next(response.iter_encoded())
+    response.close()
+
+    # The unread result makes the connection unusable, so it is closed
+    # instead of going back to the pool
+    stats = app_module.db_pool.stats()
+    assert (stats['created'], stats['size'], stats['in_use']) == (1, 0, 0)
+
+
+def test_export_reports_pool_saturation_before_streaming(fake_db, client, monkeypatch):
+    def saturated():
+        raise app_module.PoolTimeoutError('No database connection available')
+    monkeypatch.setattr(app_module.db_pool, 'acquire', saturated)
+
+    response = client.get('/export/orders')
+
+    assert response.status_code == 503
+
+
+def test_export_reports_query_errors_before_streaming(fake_db, client):
+    fake_db.on('SELECT * FROM orders', MySQLdb.OperationalError(1054, "Unknown column 'order_status'"))
+
+    response = client.get('/export/orders')
+
+    assert response.status_code == 500
+    assert response.get_json()['message'] == 'Failed to export orders'
+    assert app_module.db_pool.stats()['in_use'] == 0
@@ -0,0 +1,84 @@
+import pytest
+
+import app as app_module
+
+
+def product(product_id, category_id, price, rating, in_stock=True):
+    return {
+        'id': product_id, 'category_id': category_id, 'price': price, 'rating': rating,
+        'in_stock': 1, 'stock_count': 5 if in_stock else 0,
+    }
+
+
+@pytest.fixture
+def index():
+    index = app_module.ProductFacetIndex(max_age=300)
+    index.build([
+        product(1, 1, 10, 4.5),
+        product(2, 1, 60, 3.2),
+        product(3, 2, 30, 4.1, in_stock=False),
+        product(4, 2, 300, 2.0),
+        product(5, None, None, None, in_stock=False),
+    ])
+    return index
+
+
+def counts_by_value(facet):
+    return {entry['value']: entry['count'] for entry in facet}
+
+
+def counts_by_min(facet):
+    return {entry['min']: entry['count'] for entry in facet}
+
+
+def test_unfiltered_counts(index):
+    counts = index.counts()
+
+    assert counts_by_value(counts['category']) == {1: 2, 2: 2, None: 1}
+    assert counts_by_min(counts['price']) == {0: 1, 25: 1, 50: 1, 100: 0, 250: 1, 500: 0}
+    assert counts_by_min(counts['rating']) == {4: 2, 3: 3, 2: 4, 1: 4}
+    # Products without stock left count as out of stock
+    assert counts['in_stock'] == {'true': 3, 'false': 2}
+
+
+def test_a_facet_is_counted_without_its_own_filter(index):
+    counts = index.counts(category_id=1, in_stock=True)
+
+    # Categories ignore the category filter but honour the stock filter
+    assert counts_by_value(counts['category']) == {1: 2, 2: 1}
+    # Stock ignores the stock filter but honours the category filter
+    assert counts['in_stock'] == {'true': 2, 'false': 0}
+    assert counts_by_min(counts['price']) == {0: 1, 25: 0, 50: 1, 100: 0, 250: 0, 500: 0}
+
+
+def test_price_and_rating_filters_drop_products_without_values(index):
+    counts = index.counts(min_price=20, max_price=100, min_rating=3)
+
+    assert counts_by_value(counts['category']) == {1: 1, 2: 1}
+    # The price facet keeps the rating filter only
+    assert counts_by_min(counts['price']) == {0: 1, 25: 1, 50: 1, 100: 0, 250: 0, 500: 0}
+    # The rating facet keeps the price filter only
+    assert counts_by_min(counts['rating']) == {4: 1, 3: 2, 2: 2, 1: 2}
+
+
+def test_upsert_and_remove_move_products_between_values(index):
+    index.upsert(product(3, 1, 30, 4.1, in_stock=True))
+    index.remove(4)
+
+    counts = index.counts()
+
+    assert counts_by_value(counts['category']) == {1: 3, None: 1}
+    assert counts['in_stock'] == {'true': 3, 'false': 1}
+
+
+def test_listing_returns_facets_from_the_index(fake_db, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'facet_index', app_module.ProductFacetIndex(max_age=300))
+    fake_db.on('SELECT id, category_id, price, rating, in_stock, stock_count FROM products', [
+        product(1, 1, 10, 4.5), product(2, 2, 60, 3.2),
+    ])
+
+    response = client.get('/products?category_id=1&facets=true')
+
+    facets = response.get_json()['facets']
+    assert counts_by_value(facets['category']) == {1: 1, 2: 1}
+    assert facets['in_stock'] == {'true': 1, 'false': 0}
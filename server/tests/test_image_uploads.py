@@ -0,0 +1,127 @@
+import io
+import threading
+import time
+
+import cloudinary.uploader
+import pytest
+
+import app as app_module
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+def product_form(image_count):
+    return {
+        'name': 'Kettle', 'price': '10', 'category_id': '1', 'description': 'Boils water',
+        'images': [(io.BytesIO(PNG + str(i).encode()), f'kettle-{i}.png') for i in range(image_count)],
+    }
+
+
+def wait_for_job(client, product_id, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        status = client.get(f'/products/{product_id}/image-uploads').get_json()
+        if status['status'] != 'pending':
+            return status
+        time.sleep(0.01)
+    pytest.fail(f'image upload job for product {product_id} did not finish')
+
+
+@pytest.fixture(autouse=True)
+def fresh_jobs(monkeypatch):
+    monkeypatch.setattr(app_module, 'image_upload_jobs', {})
+
+
+@pytest.fixture
+def cloudinary_upload(monkeypatch):
+    """Stands in for cloudinary.uploader.upload; set .handler to change its behaviour"""
+    class Upload:
+        def __init__(self):
+            self.handler = lambda data: None
+            self.calls = 0
+            self.lock = threading.Lock()
+
+        def __call__(self, stream, **options):
+            with self.lock:
+                self.calls += 1
+                number = self.calls
+            data = stream.read()
+            assert data.startswith(PNG)
+            self.handler(data)
+            return {'secure_url': f'https://res.cloudinary.com/demo/image/upload/v1/products/{number}.png'}
+
+    upload = Upload()
+    monkeypatch.setattr(cloudinary.uploader, 'upload', upload)
+    return upload
+
+
+def image_inserts(fake_db):
+    return [params for sql, params in fake_db.log if sql.startswith('INSERT INTO product_images')]
+
+
+def test_images_upload_concurrently(fake_db, client, cloudinary_upload):
+    fake_db.on('FROM products WHERE id = %s FOR UPDATE', [{'id': 1}])
+    fake_db.on('SELECT COUNT(*) AS count FROM product_images', [{'count': 0}])
+    # Every upload waits for the others, so this only passes if all three run at once
+    barrier = threading.Barrier(3, timeout=5)
+    cloudinary_upload.handler = lambda data: barrier.wait()
+
+    response = client.post('/products', data=product_form(3), content_type='multipart/form-data')
+
+    assert response.status_code == 202
+    product_id = response.get_json()['id']
+    status = wait_for_job(client, product_id)
+    assert status['status'] == 'completed'
+    assert status['completed'] == 3
+    assert len(status['images']) == 3
+    # All images are attached in one statement, the first as primary
+    (rows,) = image_inserts(fake_db)
+    assert [row[2] for row in rows] == [True, False, False]
+
+
+def test_job_status_reports_progress(fake_db, client, cloudinary_upload):
+    assert client.get('/products/99/image-uploads').status_code == 404
+    release = threading.Event()
+    cloudinary_upload.handler = lambda data: release.wait(5)
+
+    response = client.post('/products', data=product_form(2), content_type='multipart/form-data')
+
+    product_id = response.get_json()['id']
+    assert response.get_json()['image_upload']['status'] == 'pending'
+    status = client.get(f'/products/{product_id}/image-uploads').get_json()
+    assert status == {'status': 'pending', 'total': 2, 'completed': 0, 'images': [], 'errors': []}
+    release.set()
+    assert wait_for_job(client, product_id)['completed'] == 2
+
+
+def test_failed_upload_keeps_the_others(fake_db, client, cloudinary_upload):
+    fake_db.on('FROM products WHERE id = %s FOR UPDATE', [{'id': 1}])
+    fake_db.on('SELECT COUNT(*) AS count FROM product_images', [{'count': 0}])
+
+    def fail_second(data):
+        if data.endswith(b'1'):
+            raise RuntimeError('Cloudinary is unavailable')
+    cloudinary_upload.handler = fail_second
+
+    response = client.post('/products', data=product_form(2), content_type='multipart/form-data')
+    status = wait_for_job(client, response.get_json()['id'])
+
+    assert status['status'] == 'partial'
+    assert len(status['images']) == 1
+    assert status['errors'] == [{'filename': 'kettle-1.png', 'error': 'Cloudinary is unavailable'}]
+    (rows,) = image_inserts(fake_db)
+    assert len(rows) == 1
+
+
+def test_all_uploads_failing_attach_nothing(fake_db, client, cloudinary_upload):
+    def fail(data):
+        raise RuntimeError('Cloudinary is unavailable')
+    cloudinary_upload.handler = fail
+
+    response = client.post('/products', data=product_form(2), content_type='multipart/form-data')
+    status = wait_for_job(client, response.get_json()['id'])
+
+    assert status['status'] == 'failed'
+    assert status['images'] == []
+    assert len(status['errors']) == 2
+    assert image_inserts(fake_db) == []
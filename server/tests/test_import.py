@@ -0,0 +1,141 @@
+import io
+import json
+
+import MySQLdb
+
+import app as app_module
+
+
+def ndjson(rows):
+    return '\n'.join(json.dumps(row) for row in rows)
+
+
+def product(**fields):
+    return {'name': 'Boot', 'price': 10, 'category_id': 1, 'description': 'd', **fields}
+
+
+def post_import(client, body, content_type='application/x-ndjson'):
+    return client.post('/products/import', data=body, content_type=content_type)
+
+
+def upserted_rows(fake_db):
+    """Parameter tuples of every product upsert statement, in order"""
+    return [row for sql, params in fake_db.log if sql.startswith('INSERT INTO products') for row in params]
+
+
+def test_invalid_rows_are_reported_and_the_rest_imported(fake_db, client):
+    fake_db.on('SELECT id FROM categories', [{'id': 1}])
+    body = ndjson([
+        product(sku='A1'),
+        product(sku='A2', category_id=7),
+        {'sku': 'A3', 'price': 10, 'category_id': 1, 'description': 'd'},
+        product(),
+        product(sku='A5', specifications='{"size": '),
+        product(sku='A6', price='cheap'),
+    ]) + '\n[1, 2]\nnot json'
+
+    response = post_import(client, body)
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result['received'], result['upserted'], result['failed']) == (8, 1, 7)
+    errors = {error['row']: error['error'] for error in result['errors']}
+    assert errors[2] == 'Unknown category_id 7'
+    assert errors[3] == 'name required'
+    assert errors[4] == 'id or sku required'
+    assert errors[5].startswith('specifications must be valid JSON')
+    assert errors[6] == 'id, price, category_id, rating and stock_count must be numbers'
+    assert errors[7] == 'Each line must be a JSON object'
+    assert errors[8].startswith('Invalid JSON')
+    assert [row[0] for row in upserted_rows(fake_db)] == ['A1']
+
+
+def test_csv_rows_are_numbered_without_the_header(fake_db, client):
+    fake_db.on('SELECT id FROM categories', [{'id': 1}])
+    body = 'sku,name,price,category_id,description\nB1,Boot,10,1,d\nB2,,10,1,d\n'
+
+    result = post_import(client, body, 'text/csv').get_json()
+
+    assert result['errors'] == [{'row': 2, 'error': 'name required'}]
+    assert result['upserted'] == 1
+
+
+def test_sku_of_another_product_is_a_row_error(fake_db, client):
+    fake_db.on('SELECT id FROM categories', [{'id': 1}])
+    fake_db.on('SELECT id, sku FROM products WHERE sku IN', [{'id': 5, 'sku': 'TAKEN'}])
+    body = ndjson([
+        product(id=9, sku='TAKEN'),
+        product(id=5, sku='TAKEN'),
+        product(sku='TAKEN'),
+        product(id=10, sku='NEW'),
+        product(id=11, sku='NEW'),
+    ])
+
+    result = post_import(client, body).get_json()
+
+    assert result['errors'] == [
+        {'row': 1, 'error': 'sku TAKEN belongs to product 5, not 9'},
+        {'row': 5, 'error': 'sku NEW is given for a different product in row 4'},
+    ]
+    assert result['upserted'] == 3
+
+
+def test_rows_matched_by_id_update_the_sku(fake_db, client):
+    fake_db.on('SELECT id FROM categories', [{'id': 1}])
+
+    post_import(client, ndjson([product(id=3, sku='C3')]))
+
+    sql = fake_db.queries('INSERT INTO products')[0]
+    assert 'sku = VALUES(sku)' in sql
+    assert 'id = VALUES(id)' not in sql
+
+
+def test_rejected_batch_is_retried_row_by_row(fake_db, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'IMPORT_BATCH_SIZE', 4)
+    fake_db.on('SELECT id FROM categories', [{'id': 1}])
+
+    def upsert(sql, rows):
+        if any(row[0] == 'BAD' for row in rows):
+            return MySQLdb.DatabaseError(1406, "Data too long for column 'sku'")
+        return []
+    fake_db.on('INSERT INTO products', upsert)
+    skus = ['D1', 'D2', 'BAD', 'D4', 'D5', 'D6']
+
+    result = post_import(client, ndjson([product(sku=sku) for sku in skus])).get_json()
+
+    assert result['failed'] == 1
+    assert result['errors'][0]['row'] == 3
+    assert 'Data too long' in result['errors'][0]['error']
+    assert result['upserted'] == 5
+    # The first batch of four failed as a whole and was retried one row at a
+    # time; the second batch went through in one statement
+    batches = [params for sql, params in fake_db.log if sql.startswith('INSERT INTO products')]
+    assert [len(batch) for batch in batches] == [4, 1, 1, 1, 1, 2]
+
+
+def test_large_specifications_are_validated_in_worker_processes(fake_db, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'IMPORT_PARALLEL_VALIDATION_BYTES', 0)
+    monkeypatch.setattr(app_module, 'IMPORT_VALIDATION_CHUNK_SIZE', 2)
+    monkeypatch.setitem(app_module.app.config, 'IMPORT_VALIDATION_WORKERS', 2)
+    monkeypatch.setattr(app_module, 'spec_validation_pool', None)
+    fake_db.on('SELECT id FROM categories', [{'id': 1}])
+    specs = ['{"a": 1}', '{', '[]', '{"b": }', '{"c": [1, 2]}']
+
+    try:
+        body = ndjson([product(sku=f'E{i}', specifications=spec) for i, spec in enumerate(specs)])
+        result = post_import(client, body).get_json()
+    finally:
+        if app_module.spec_validation_pool is not None:
+            app_module.spec_validation_pool.shutdown()
+
+    assert [error['row'] for error in result['errors']] == [2, 4]
+    assert result['upserted'] == 3
+
+
+def test_uploaded_file_is_imported(fake_db, client):
+    fake_db.on('SELECT id FROM categories', [{'id': 1}])
+    upload = (io.BytesIO(ndjson([product(sku='F1')]).encode()), 'products.ndjson')
+
+    response = client.post('/products/import', data={'file': upload}, content_type='multipart/form-data')
+
+    assert response.get_json()['upserted'] == 1
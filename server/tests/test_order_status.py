@@ -0,0 +1,106 @@
+import MySQLdb
+
+from test_rollups import DAY, order_row, order_rollup_deltas
+
+
+def orders_by_number(*orders):
+    """Answer the bulk lock query with the listed orders whose numbers were asked for"""
+    def respond(sql, params):
+        return [order for order in orders if order['order_number'] in params]
+    return respond
+
+
+def test_bulk_order_status_reports_each_number(fake_db, client):
+    fake_db.on('FROM orders WHERE order_number IN', orders_by_number(
+        order_row(1, 'pending'), order_row(2, 'processing'),
+    ))
+
+    response = client.patch('/orders/status', json={
+        'order_numbers': ['ORD-1', 'ORD-2', 'ORD-9', 'ORD-1'], 'status': 'processing',
+    })
+
+    assert response.status_code == 200
+    result = response.get_json()
+    assert (result['updated'], result['unchanged'], result['not_found']) == (1, 1, 1)
+    assert result['results'] == [
+        {'order_number': 'ORD-1', 'outcome': 'updated'},
+        {'order_number': 'ORD-2', 'outcome': 'unchanged'},
+        {'order_number': 'ORD-9', 'outcome': 'not_found'},
+    ]
+    assert fake_db.queries('UPDATE orders') == ['UPDATE orders SET order_status = %s WHERE id IN (%s)']
+    assert order_rollup_deltas(fake_db) == {DAY: {'status_pending': -1, 'status_processing': 1}}
+    assert fake_db.commits == 1
+
+
+def test_bulk_order_status_rejects_bad_requests(fake_db, client):
+    assert client.patch('/orders/status', json={'order_numbers': ['ORD-1'], 'status': 'lost'}).status_code == 400
+    assert client.patch('/orders/status', json={'order_numbers': [], 'status': 'shipped'}).status_code == 400
+    assert client.patch('/orders/status', json={'order_numbers': [['ORD-1']], 'status': 'shipped'}).status_code == 400
+    assert fake_db.log == []
+
+
+def test_bulk_order_status_is_one_transaction(fake_db, client):
+    fake_db.on('FROM orders WHERE order_number IN', orders_by_number(order_row(1, 'pending'), order_row(2, 'pending')))
+    fake_db.on('INSERT INTO order_daily_rollups', MySQLdb.OperationalError(1205, 'Lock wait timeout exceeded'))
+
+    response = client.patch('/orders/status', json={'order_numbers': ['ORD-1', 'ORD-2'], 'status': 'shipped'})
+
+    assert response.status_code == 500
+    # The status UPDATE already ran but is rolled back with the failed rollup write
+    assert len(fake_db.queries('UPDATE orders')) == 1
+    assert fake_db.commits == 0
+    assert fake_db.rollbacks >= 1
+
+
+def item_rows(*items):
+    """Answer the item lock query with the listed (id, order_id, status) items that were asked for"""
+    def respond(sql, params):
+        return [
+            {'id': item_id, 'order_id': order_id, 'status': status}
+            for item_id, order_id, status in items if item_id in params
+        ]
+    return respond
+
+
+def test_bulk_item_status_reports_each_id_and_accepts_numeric_strings(fake_db, client):
+    fake_db.on('SELECT id, order_id, status FROM order_items', item_rows((5, 1, 'pending'), (6, 1, 'shipped')))
+
+    response = client.patch('/orders/items/status', json={
+        'item_ids': [5, '6', 7, 'seven', -1, True, '5'], 'status': 'shipped',
+    })
+
+    result = response.get_json()
+    assert response.status_code == 200
+    assert [(r['item_id'], r['outcome']) for r in result['results']] == [
+        (5, 'updated'), ('6', 'unchanged'), (7, 'not_found'), ('seven', 'invalid'),
+        (-1, 'invalid'), (True, 'invalid'), ('5', 'updated'),
+    ]
+    assert (result['updated'], result['unchanged'], result['not_found'], result['invalid']) == (1, 1, 1, 3)
+    # Each item is locked and updated once, whichever way its id was given
+    lock_sql, lock_params = next(entry for entry in fake_db.log if 'FROM order_items' in entry[0])
+    assert lock_params == (5, 6, 7)
+    assert [params for sql, params in fake_db.log if sql.startswith('UPDATE order_items')] == [('shipped', 5)]
+    assert result['orders_updated'] == []
+    assert fake_db.commits == 1
+
+
+def test_bulk_item_status_derives_the_order_status(fake_db, client):
+    items = [(5, 1, 'pending'), (6, 1, 'delivered'), (7, 2, 'pending'), (8, 2, 'pending')]
+    fake_db.on('SELECT id, order_id, status FROM order_items', item_rows(*items))
+    fake_db.on('FROM orders WHERE id IN', lambda sql, params: [
+        order_row(order_id, 'shipped' if order_id == 1 else 'pending') for order_id in params
+    ])
+    # Statuses after the update: order 1 is fully delivered, order 2 partly shipped
+    fake_db.on('SELECT order_id, status FROM order_items', [
+        {'order_id': 1, 'status': 'delivered'}, {'order_id': 1, 'status': 'delivered'},
+        {'order_id': 2, 'status': 'delivered'}, {'order_id': 2, 'status': 'pending'},
+    ])
+
+    response = client.patch('/orders/items/status', json={
+        'item_ids': [5, 7], 'status': 'delivered', 'update_order_status': True,
+    })
+
+    # Order 2 still has a pending item, so it stays pending
+    assert response.get_json()['orders_updated'] == [{'order_number': 'ORD-1', 'status': 'delivered'}]
+    assert order_rollup_deltas(fake_db) == {DAY: {'status_shipped': -1, 'status_delivered': 1}}
+    assert fake_db.commits == 1
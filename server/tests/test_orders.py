@@ -0,0 +1,92 @@
+import datetime
+import math
+
+import app as app_module
+
+ORDER_COUNT = 10000
+
+
+def order_rows(count):
+    created = datetime.datetime(2026, 1, 1)
+    return [
+        {
+            'id': order_id, 'order_number': f'ORD-{order_id}', 'created_at': created,
+            'coupon_id': 1 if order_id % 10 == 0 else None, 'order_status': 'pending',
+            'total_amount': 10,
+        }
+        for order_id in range(count, 0, -1)
+    ]
+
+
+def items_for(sql, order_ids):
+    return [
+        {'id': order_id, 'order_id': order_id, 'product_id': 1, 'product_name': 'P', 'attributes': None}
+        for order_id in order_ids
+    ]
+
+
+def test_order_listing_batches_related_rows(fake_db, client):
+    fake_db.on('SELECT * FROM orders', order_rows(ORDER_COUNT))
+    fake_db.on('FROM order_items', items_for)
+    fake_db.on('FROM coupons', [{'id': 1, 'code': 'SAVE', 'discount_type': 'percentage', 'discount_value': 10}])
+
+    response = client.get('/orders')
+
+    assert response.status_code == 200
+    orders = response.get_json()
+    assert len(orders) == ORDER_COUNT
+    assert orders[0]['items'][0]['order_id'] == ORDER_COUNT
+    assert orders[0]['coupon']['code'] == 'SAVE'
+    batches = math.ceil(ORDER_COUNT / app_module.IN_CLAUSE_BATCH_SIZE)
+    # The orders query, items and payments per id batch, and one coupons batch
+    assert len(fake_db.log) == 1 + 2 * batches + 1
+
+
+def test_order_page_only_loads_requested_expansions(fake_db, client):
+    fake_db.on('SELECT * FROM orders', order_rows(51))
+    totals = {f'status_{status}': 0 for status in app_module.ORDER_STATUSES}
+    fake_db.on('FROM order_daily_rollups', [{**totals, 'order_count': 51, 'gross': 510, 'status_pending': 51}])
+
+    response = client.get('/orders?limit=50&include=items')
+
+    payload = response.get_json()
+    assert response.status_code == 200
+    assert len(payload['data']) == 50
+    assert payload['next_cursor']
+    assert payload['summary']['count'] == 51
+    assert payload['summary']['status_counts'] == {'pending': 51}
+    assert len(fake_db.queries('SELECT * FROM payments')) == 0
+    assert len(fake_db.log) == 3
+
+
+def test_order_pages_resume_from_the_cursor_with_filtered_totals(fake_db, client):
+    rows = order_rows(5)
+
+    def page(sql, params):
+        # params: customer_email, then the cursor position when resuming, then the row limit
+        matching = [row for row in rows if len(params) == 2 or row['id'] < params[3]]
+        return matching[:params[-1]]
+    fake_db.on('SELECT * FROM orders', page)
+    fake_db.on('GROUP BY order_status', [
+        {'order_status': 'pending', 'count': 3, 'revenue': '30.00'},
+        {'order_status': 'shipped', 'count': 1, 'revenue': '25.50'},
+        {'order_status': 'cancelled', 'count': 1, 'revenue': '99.00'},
+    ])
+
+    first = client.get('/orders?limit=3&customer_email=a@example.com').get_json()
+    second = client.get(f'/orders?limit=3&customer_email=a@example.com&after={first["next_cursor"]}').get_json()
+
+    assert [order['id'] for order in first['data']] == [5, 4, 3]
+    assert [order['id'] for order in second['data']] == [2, 1]
+    assert second['next_cursor'] is None
+    resumed_sql, resumed_params = [
+        (sql, params) for sql, params in fake_db.log if sql.startswith('SELECT * FROM orders')
+    ][1]
+    assert 'AND (created_at < %s OR (created_at = %s AND id < %s))' in resumed_sql
+    assert resumed_params == ('a@example.com', '2026-01-01 00:00:00', '2026-01-01 00:00:00', 3, 4)
+    # Cancelled orders count towards the totals but not the revenue
+    for payload in (first, second):
+        assert payload['summary'] == {
+            'count': 5, 'revenue': 55.5, 'status_counts': {'pending': 3, 'shipped': 1, 'cancelled': 1},
+        }
+    assert len(fake_db.queries('FROM order_daily_rollups')) == 0
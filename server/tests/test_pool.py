@@ -0,0 +1,72 @@
+import pytest
+
+import app as app_module
+from fakedb import FakeDatabase
+
+
+class FlakyConnect:
+    """connect() that fails on the listed call numbers (1-based)"""
+
+    def __init__(self, db, failures=(), down=False):
+        self.db = db
+        self.failures = set(failures)
+        self.down = down
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.down or self.calls in self.failures:
+            raise ConnectionError('database unavailable')
+        return self.db.connect()
+
+
+def make_pool(connect, min_size, max_size, wait_timeout=0.05):
+    return app_module.ConnectionPool(
+        connect, min_size=min_size, max_size=max_size, recycle=3600,
+        wait_timeout=wait_timeout, ping_interval=3600
+    )
+
+
+def test_warm_failure_while_database_is_down_leaves_no_phantom_slots():
+    connect = FlakyConnect(FakeDatabase(), down=True)
+    pool = make_pool(connect, min_size=3, max_size=4)
+
+    with pytest.raises(ConnectionError):
+        pool.acquire()
+    assert pool.stats()['size'] == 0
+
+    connect.down = False
+    held = [pool.acquire() for _ in range(4)]
+    assert pool.stats()['size'] == 4
+    for conn in held:
+        pool.release(conn)
+
+
+def test_failed_connect_during_warm_keeps_full_capacity():
+    connect = FlakyConnect(FakeDatabase(), failures={2})
+    pool = make_pool(connect, min_size=3, max_size=3)
+
+    with pytest.raises(ConnectionError):
+        pool.warm()
+    assert pool.stats()['size'] == 1
+
+    # The next acquire finishes warming; every slot is still usable
+    held = [pool.acquire() for _ in range(3)]
+    assert pool.stats()['in_use'] == 3
+    with pytest.raises(app_module.PoolTimeoutError):
+        pool.acquire()
+    for conn in held:
+        pool.release(conn)
+
+
+def test_route_answers_503_when_pool_is_exhausted(monkeypatch, client):
+    pool = make_pool(FakeDatabase().connect, min_size=0, max_size=1)
+    monkeypatch.setattr(app_module, 'db_pool', pool)
+    held = pool.acquire()
+
+    try:
+        response = client.get('/products')
+        assert response.status_code == 503
+        assert client.get('/orders').status_code == 503
+    finally:
+        pool.release(held)
@@ -0,0 +1,111 @@
+import pytest
+
+
+def product_rows(count):
+    return [
+        {
+            'id': product_id, 'name': f'Product {product_id}', 'price': 10, 'image': None,
+            'category_id': 1, 'category_name': 'Shoes', 'description': 'd', 'rating': 4,
+            'full_description': None, 'specifications': None, 'in_stock': 1, 'stock_count': 3, 'sku': None,
+        }
+        for product_id in range(count, 0, -1)
+    ]
+
+
+def image_rows(sql, product_ids):
+    return [{'product_id': product_id, 'image_url': f'/static/uploads/{product_id}.jpg'} for product_id in product_ids]
+
+
+@pytest.mark.parametrize('page_size', [1, 20, 200])
+def test_product_page_query_count_does_not_grow_with_page_size(fake_db, client, page_size):
+    fake_db.on('FROM products p', product_rows(page_size + 1))
+    fake_db.on('FROM product_images', image_rows)
+
+    response = client.get(f'/products?limit={page_size}')
+
+    assert response.status_code == 200
+    assert len(response.get_json()['data']) == page_size
+    # One products query (category names joined in) and one images query
+    assert len(fake_db.log) == 2
+
+
+@pytest.mark.parametrize('count', [3, 300])
+def test_full_product_listing_query_count_is_constant(fake_db, client, count):
+    fake_db.on('FROM products p', product_rows(count))
+    fake_db.on('FROM product_images', image_rows)
+
+    response = client.get('/products')
+
+    assert response.status_code == 200
+    products = response.get_json()
+    assert len(products) == count
+    assert products[0]['images'] == [f'/static/uploads/{count}.jpg']
+    assert products[0]['category_name'] == 'Shoes'
+    assert len(fake_db.log) == 2
+
+
+def test_product_listing_is_served_from_cache(fake_db, client):
+    fake_db.on('FROM products p', product_rows(2))
+
+    client.get('/products')
+    client.get('/products')
+
+    assert len(fake_db.queries('SELECT')) == 2
+
+
+def category_rows(sql, params):
+    """Products 1-3 in category 1 and 4-6 in category 2, filtered like the listing query"""
+    rows = product_rows(6)
+    for row in rows:
+        row['category_id'] = 1 if row['id'] <= 3 else 2
+    if 'p.category_id = %s' in sql:
+        rows = [row for row in rows if row['category_id'] == params[0]]
+    return rows
+
+
+def listing_reads(fake_db, url, client):
+    before = len(fake_db.queries('SELECT'))
+    client.get(url)
+    return len(fake_db.queries('SELECT')) - before
+
+
+def test_product_edit_only_invalidates_listings_of_its_categories(fake_db, client):
+    fake_db.on('FROM products p', category_rows)
+    fake_db.on('SELECT id, category_id FROM products', [{'id': 2, 'category_id': 1}])
+    for url in ('/products?category_id=1', '/products?category_id=2', '/products'):
+        client.get(url)
+
+    response = client.put('/products/2', data={'price': '12'})
+
+    assert response.status_code == 200
+    assert listing_reads(fake_db, '/products?category_id=2', client) == 0
+    assert listing_reads(fake_db, '/products?category_id=1', client) > 0
+    assert listing_reads(fake_db, '/products', client) > 0
+
+
+def test_moving_a_product_invalidates_both_category_listings(fake_db, client):
+    fake_db.on('FROM products p', category_rows)
+    fake_db.on('SELECT id, category_id FROM products', [{'id': 2, 'category_id': 1}])
+    client.get('/products?category_id=1')
+    client.get('/products?category_id=2')
+
+    client.put('/products/2', data={'category_id': '2'})
+
+    assert listing_reads(fake_db, '/products?category_id=1', client) > 0
+    assert listing_reads(fake_db, '/products?category_id=2', client) > 0
+
+
+def test_stock_hold_only_invalidates_listings_showing_the_product(fake_db, client):
+    fake_db.on('FROM products p', category_rows)
+    fake_db.on('SELECT id, name, stock_count', [{'id': 5, 'name': 'P5', 'stock_count': 3, 'in_stock': 1}])
+    fake_db.on('SELECT MIN(expires_at)', [{'expires_at': None}])
+    for url in ('/products?category_id=1', '/products?category_id=2', '/products?category_id=1&in_stock=true'):
+        client.get(url)
+
+    response = client.post('/products/reserve', json={'items': [{'product_id': 5, 'quantity': 1}]})
+
+    assert response.status_code == 201
+    assert listing_reads(fake_db, '/products?category_id=1', client) == 0
+    assert listing_reads(fake_db, '/products?category_id=2', client) > 0
+    # Whether a product is in stock decides which products this listing holds
+    assert listing_reads(fake_db, '/products?category_id=1&in_stock=true', client) > 0
@@ -0,0 +1,52 @@
+import app as app_module
+
+
+def plan_row(table, type='ref', rows=10, extra=None):
+    return {'table': table, 'type': type, 'rows': rows, 'Extra': extra}
+
+
+def test_plan_problems_flags_scans_filesorts_and_large_estimates():
+    assert app_module.plan_problems([plan_row('orders')]) == []
+    assert app_module.plan_problems([plan_row('orders', type='ALL')]) == ['full scan of orders']
+    assert app_module.plan_problems([plan_row('orders', extra='Using where; Using filesort')]) == ['filesort on orders']
+    assert app_module.plan_problems([plan_row('orders', type='range', rows=50000)]) == ['orders estimated at 50000 rows']
+    # One row per category or day; derived tables are judged by their sources
+    assert app_module.plan_problems([plan_row('categories', type='ALL', extra='Using filesort')]) == []
+    assert app_module.plan_problems([plan_row('<derived2>', type='ALL')]) == []
+
+
+def test_recorded_statements_are_the_route_sql(fake_db):
+    samples = {
+        'product_id': 3, 'category_id': 1, 'order_number': 'ORD-1', 'customer_email': 'a@b.c',
+        'coupon_code': 'SAVE', 'tracking_number': 'T1',
+    }
+    fake_db.on('SELECT * FROM orders', [{
+        'id': 1, 'order_number': 'ORD-1', 'created_at': None, 'coupon_id': None,
+        'order_status': 'pending', 'total_amount': 10,
+    }])
+    # The order PATCH /orders/status locks, so that its UPDATE is reached
+    fake_db.on('FOR UPDATE', lambda sql, params: [{
+        'id': 1, 'order_number': 'ORD-1', 'order_status': 'pending', 'day': None,
+        'total_amount': 10, 'subtotal': 10, 'discount_amount': 0,
+        'tax_amount': 0, 'shipping_cost': 0,
+    }] if 'FROM orders' in sql else [])
+    totals = {f'status_{status}': 0 for status in app_module.ORDER_STATUSES}
+    fake_db.on('FROM order_daily_rollups', [{**totals, 'order_count': 1, 'gross': 10}])
+
+    serving_pool = app_module.db_pool
+    statements = app_module.record_route_statements(samples, connect=fake_db.connect)
+
+    assert app_module.db_pool is serving_pool
+    # Serving connections are never the recording kind
+    assert not hasattr(app_module.PooledConnection, 'recorder')
+    # Reads were sent to the database verbatim; writes were only recorded
+    sent = {sql for sql, _ in fake_db.log}
+    reads = {sql for sql in statements if sql.startswith('SELECT')}
+    assert reads <= sent
+    assert any(sql.startswith('SELECT * FROM orders') and 'customer_email = %s' in sql for sql in reads)
+    assert any('FROM order_items' in sql for sql in reads)
+    assert any(sql.startswith('UPDATE orders') for sql in statements)
+    assert not any(sql.startswith(('INSERT', 'UPDATE', 'DELETE', 'REPLACE')) for sql in sent)
+    assert not any(sql.startswith('INSERT') for sql in statements)
+    # Nothing is committed, so the replay leaves no trace
+    assert fake_db.commits == 0
@@ -0,0 +1,98 @@
+import datetime
+from decimal import Decimal
+
+import app as app_module
+
+DAY = datetime.date(2026, 10, 1)
+
+
+def order_row(order_id, status, day=DAY):
+    return {
+        'id': order_id, 'order_number': f'ORD-{order_id}', 'order_status': status, 'day': day,
+        'total_amount': Decimal('55.00'), 'subtotal': Decimal('50.00'), 'discount_amount': Decimal('5.00'),
+        'tax_amount': Decimal('4.00'), 'shipping_cost': Decimal('6.00'),
+    }
+
+
+def items_of(sql, order_ids):
+    return [
+        {'order_id': order_id, 'product_id': product_id, 'quantity': 2, 'total_price': Decimal('25.00')}
+        for order_id in order_ids for product_id in (3, 4)
+    ]
+
+
+def rollup_writes(fake_db, table):
+    return [params for sql, params in fake_db.log if sql.startswith(f'INSERT INTO {table}')]
+
+
+def order_rollup_deltas(fake_db):
+    """{column: delta} of each order_daily_rollups write, keyed by day"""
+    writes = {}
+    for sql, params in fake_db.log:
+        if sql.startswith('INSERT INTO order_daily_rollups'):
+            columns = sql.split('(', 1)[1].split(')', 1)[0].split(', ')
+            values = dict(zip(columns, params))
+            assert 0 <= values.pop('shard') < app_module.app.config['ROLLUP_SHARDS']
+            writes[values.pop('day')] = values
+    return writes
+
+
+def test_cancelling_an_order_takes_out_its_revenue(fake_db, client):
+    fake_db.on('SELECT id FROM orders WHERE order_number', [{'id': 1}])
+    fake_db.on('FROM orders WHERE id = %s FOR UPDATE', [order_row(1, 'processing')])
+    fake_db.on('FROM order_items WHERE order_id IN', items_of)
+
+    response = client.patch('/orders/ORD-1/status', json={'status': 'cancelled'})
+
+    assert response.status_code == 200
+    assert order_rollup_deltas(fake_db) == {DAY: {
+        'status_processing': -1, 'status_cancelled': 1, 'gross': Decimal('-55.00'), 'subtotal': Decimal('-50.00'),
+        'discount': Decimal('-5.00'), 'tax': Decimal('-4.00'), 'shipping': Decimal('-6.00'),
+    }}
+    ((_, shard, order_count, revenue),) = rollup_writes(fake_db, 'sales_daily_rollups')
+    assert (order_count, revenue) == (-1, Decimal('-50.00'))
+    (products,) = rollup_writes(fake_db, 'product_sales_rollups')
+    assert [(row[1], row[3], row[4]) for row in products] == [(3, -2, Decimal('-25.00')), (4, -2, Decimal('-25.00'))]
+    # The whole order shares one shard
+    assert {row[2] for row in products} == {shard}
+
+
+def test_reopening_a_cancelled_order_puts_it_back(fake_db, client):
+    fake_db.on('SELECT id FROM orders WHERE order_number', [{'id': 1}])
+    fake_db.on('FROM orders WHERE id = %s FOR UPDATE', [order_row(1, 'cancelled')])
+    fake_db.on('FROM order_items WHERE order_id IN', items_of)
+
+    client.patch('/orders/ORD-1/status', json={'status': 'processing'})
+
+    assert order_rollup_deltas(fake_db)[DAY]['gross'] == Decimal('55.00')
+    ((_, _, order_count, revenue),) = rollup_writes(fake_db, 'sales_daily_rollups')
+    assert (order_count, revenue) == (1, Decimal('50.00'))
+
+
+def test_moves_between_live_statuses_leave_revenue_alone(fake_db, client):
+    fake_db.on('SELECT id FROM orders WHERE order_number', [{'id': 1}])
+    fake_db.on('FROM orders WHERE id = %s FOR UPDATE', [order_row(1, 'processing')])
+
+    client.patch('/orders/ORD-1/status', json={'status': 'shipped'})
+
+    assert order_rollup_deltas(fake_db) == {DAY: {'status_processing': -1, 'status_shipped': 1}}
+    assert fake_db.queries('SELECT order_id, product_id') == []
+    assert rollup_writes(fake_db, 'sales_daily_rollups') == []
+
+
+def test_bulk_cancel_writes_days_in_order(fake_db, client):
+    later = DAY + datetime.timedelta(days=1)
+    fake_db.on('FROM orders WHERE order_number IN', [
+        order_row(2, 'pending', later), order_row(1, 'pending'), order_row(3, 'refunded'),
+    ])
+    fake_db.on('FROM order_items WHERE order_id IN', items_of)
+
+    response = client.patch('/orders/status', json={'order_numbers': ['ORD-2', 'ORD-1', 'ORD-3'], 'status': 'cancelled'})
+
+    assert response.get_json()['updated'] == 3
+    # ORD-3 was already void, so only two orders come out of revenue
+    assert [(row[0], row[2]) for row in rollup_writes(fake_db, 'sales_daily_rollups')] == [(DAY, -1), (later, -1)]
+    deltas = order_rollup_deltas(fake_db)
+    assert list(deltas) == [DAY, later]
+    assert deltas[DAY]['gross'] == Decimal('-55.00')
+    assert deltas[DAY]['status_refunded'] == -1
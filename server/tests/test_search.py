@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+import app as app_module
+
+
+def product(product_id, name, description='', price=10, category_id=1, specifications=None):
+    return {
+        'id': product_id, 'name': name, 'description': description, 'full_description': None,
+        'specifications': specifications, 'price': price, 'category_id': category_id,
+    }
+
+
+@pytest.fixture
+def index():
+    index = app_module.ProductSearchIndex(max_age=300)
+    index.build([
+        product(1, 'Steel Kettle', 'Boils water fast', price=30),
+        product(2, 'Glass Teapot', 'Pairs with a kettle', price=20),
+        product(3, 'Kettle Descaler', 'Cleans any kettle kettle', price=5, category_id=2),
+        product(4, 'Desk Lamp', 'Warm light', price=45, category_id=3, specifications='{"bulb": "LED"}'),
+    ])
+    return index
+
+
+def ids(page):
+    return [product_id for product_id, _ in page]
+
+
+def test_name_matches_outrank_description_matches(index):
+    total, page = index.search('kettle')
+
+    assert total == 3
+    # Both name matches beat the teapot, which only mentions kettles once
+    assert ids(page)[-1] == 2
+    assert set(ids(page)[:2]) == {1, 3}
+
+
+def test_rare_terms_weigh_more_than_common_ones(index):
+    _, page = index.search('kettle descaler')
+
+    assert ids(page)[0] == 3
+
+
+def test_filters_and_paging(index):
+    assert ids(index.search('kettle', category_id=2)[1]) == [3]
+    assert ids(index.search('kettle', min_price=10, max_price=25)[1]) == [2]
+    total, page = index.search('kettle', offset=1, limit=1)
+    assert total == 3 and len(page) == 1
+    assert index.search('toaster') == (0, [])
+
+
+def test_specifications_are_searchable(index):
+    assert ids(index.search('led')[1]) == [4]
+
+
+def test_updates_and_removals_apply_without_rebuild(index):
+    index.upsert(product(4, 'Kettle Lamp', 'Warm light', price=45, category_id=3))
+    index.remove(1)
+
+    _, page = index.search('kettle')
+
+    assert 1 not in ids(page)
+    assert 4 in ids(page)
+    assert index.search('steel') == (0, [])
+
+
+def test_background_refresh_runs_once_and_clears_its_flag(index, fake_db):
+    started = threading.Event()
+    release = threading.Event()
+    loads = []
+
+    def load(cursor):
+        loads.append(cursor)
+        started.set()
+        release.wait(5)
+        index.build([product(5, 'Copper Kettle')])
+
+    index.refresh_in_background(load)
+    assert started.wait(5)
+    # A second stale request while the rebuild runs does not start another
+    index.refresh_in_background(load)
+    release.set()
+    for _ in range(500):
+        with index._lock:
+            if not index._refreshing:
+                break
+        time.sleep(0.01)
+
+    assert len(loads) == 1
+    assert ids(index.search('copper')[1]) == [5]
+    assert not index._refreshing
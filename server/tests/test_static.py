@@ -0,0 +1,37 @@
+import gzip
+
+import pytest
+
+import app as app_module
+
+CSS = b'body { color: black; }\n' * 50
+
+
+@pytest.fixture
+def static_folder(monkeypatch, tmp_path):
+    (tmp_path / 'site.css').write_bytes(CSS)
+    monkeypatch.setattr(app_module.app, 'static_folder', str(tmp_path))
+    return tmp_path
+
+
+def test_static_files_use_precompressed_siblings(static_folder, client):
+    result = app_module.app.test_cli_runner().invoke(args=['precompress-static'])
+    assert 'Wrote 1 precompressed files' in result.output
+
+    response = client.get('/static/site.css', headers={'Accept-Encoding': 'gzip, deflate'})
+
+    assert response.status_code == 200
+    assert response.content_encoding == 'gzip'
+    assert 'Accept-Encoding' in response.vary
+    assert gzip.decompress(response.get_data()) == CSS
+
+
+def test_static_files_without_gzip_support(static_folder, client):
+    (static_folder / 'site.css.gz').write_bytes(gzip.compress(CSS))
+
+    response = client.get('/static/site.css', headers={'Accept-Encoding': 'identity'})
+
+    assert response.content_encoding is None
+    assert response.get_data() == CSS
+    assert client.get('/static/missing.css').status_code == 404
+    assert client.get('/static/../app.py').status_code == 404
@@ -0,0 +1,102 @@
+import pytest
+
+import app as app_module
+
+
+def product(product_id, name, category_id, sales=0):
+    return {
+        'id': product_id, 'name': name, 'price': 10, 'image': None, 'rating': 4,
+        'category_id': category_id, 'sales': sales,
+    }
+
+
+@pytest.fixture
+def suggest_indexes(monkeypatch, fake_db):
+    max_age = app_module.app.config['SEARCH_INDEX_MAX_AGE']
+    monkeypatch.setattr(app_module, 'product_suggest_index', app_module.PrefixIndex(max_age, app_module.SUGGEST_RANKS))
+    monkeypatch.setattr(app_module, 'category_suggest_index', app_module.PrefixIndex(max_age, ('productCount',)))
+    fake_db.on('FROM order_items GROUP BY product_id', [
+        product(1, 'Red Kettle', 10, sales=7), product(2, 'Blue Kettle', 10), product(3, 'Desk Lamp', 20),
+    ])
+    fake_db.on('FROM categories c', [
+        {'id': 10, 'name': 'Kitchen', 'icon': None, 'productCount': 2},
+        {'id': 20, 'name': 'Lighting', 'icon': None, 'productCount': 1},
+    ])
+    with app_module.app.app_context():
+        app_module.load_suggest_index(app_module.get_cursor())
+    fake_db.log.clear()
+    return fake_db
+
+
+def category_counts():
+    return {
+        entry['name']: entry['productCount']
+        for entry in app_module.category_suggest_index.complete('k', 10, 'productCount')
+        + app_module.category_suggest_index.complete('l', 10, 'productCount')
+    }
+
+
+def test_product_write_patches_only_its_own_entries(suggest_indexes, client):
+    suggest_indexes.on('SELECT id, name, price, image, rating, category_id FROM products', [
+        {k: v for k, v in product(1, 'Red Lamp', 20).items() if k != 'sales'},
+    ])
+
+    with app_module.app.app_context():
+        app_module.reindex_products([1])
+
+    assert all('order_items' not in sql and 'categories' not in sql for sql, _ in suggest_indexes.log)
+    lamps = app_module.product_suggest_index.complete('lamp', 10, 'rating')
+    assert sorted(entry['id'] for entry in lamps) == [1, 3]
+    # Sales come from the last build, the category count follows the move
+    assert app_module.product_suggest_index.get(1)['sales'] == 7
+    assert category_counts() == {'Kitchen': 1, 'Lighting': 2}
+
+
+def test_deleted_product_leaves_its_category_count(suggest_indexes, client):
+    with app_module.app.app_context():
+        app_module.reindex_products([2])
+
+    assert app_module.product_suggest_index.get(2) is None
+    assert category_counts() == {'Kitchen': 1, 'Lighting': 1}
+
+
+def test_category_write_reloads_only_that_category(suggest_indexes, client):
+    suggest_indexes.on('WHERE c.id = %s', [{'id': 20, 'name': 'Lamps', 'icon': None, 'productCount': 1}])
+
+    response = client.put('/categories/20', json={'name': 'Lamps'})
+
+    assert response.status_code == 200
+    assert [params for sql, params in suggest_indexes.log if 'FROM categories c' in sql] == [(20,)]
+    assert category_counts() == {'Kitchen': 2, 'Lamps': 1}
+
+
+def names(entries):
+    return [entry['name'] for entry in entries]
+
+
+def test_prefix_matches_any_word_ranked_by_the_chosen_score():
+    index = app_module.PrefixIndex(300, app_module.SUGGEST_RANKS)
+    index.build([
+        {'id': 1, 'name': 'Red Kettle', 'rating': 4.8, 'sales': 2},
+        {'id': 2, 'name': 'Blue Kettle', 'rating': 3.9, 'sales': 40},
+        {'id': 3, 'name': 'Kettlebell', 'rating': 4.1, 'sales': 9},
+        {'id': 4, 'name': 'Desk Lamp', 'rating': 5.0, 'sales': 1},
+    ])
+
+    assert names(index.complete('ket', 10, 'rating')) == ['Red Kettle', 'Kettlebell', 'Blue Kettle']
+    assert names(index.complete('ket', 10, 'sales')) == ['Blue Kettle', 'Kettlebell', 'Red Kettle']
+    assert names(index.complete('ket', 2, 'rating')) == ['Red Kettle', 'Kettlebell']
+    # Every word of the query must start a word of the name
+    assert names(index.complete('kettle b', 10, 'rating')) == ['Blue Kettle']
+    assert names(index.complete('LAMP', 10, 'rating')) == ['Desk Lamp']
+    assert index.complete('toaster', 10, 'rating') == []
+    assert index.complete('', 10, 'rating') == []
+
+
+def test_suggest_endpoint_returns_products_and_categories(suggest_indexes, client):
+    response = client.get('/products/suggest?q=kit&rank=sales')
+
+    assert response.status_code == 200
+    assert names(response.get_json()['categories']) == ['Kitchen']
+    assert client.get('/products/suggest?q=kettle&rank=sales').get_json()['products'][0]['name'] == 'Red Kettle'
+    assert client.get('/products/suggest?q=k&rank=price').status_code == 400
@@ -0,0 +1,113 @@
+import io
+import os
+
+import pytest
+
+import app as app_module
+
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 64
+
+
+class UploadBlobs:
+    """upload_blobs and categories.image rows kept in dicts, answering the statements the upload code runs"""
+
+    def __init__(self, db):
+        self.refs = {}
+        self.extensions = {}
+        self.category_images = {}
+        db.on('INSERT INTO upload_blobs', self.insert)
+        db.on('SELECT extension FROM upload_blobs', lambda sql, params: [{'extension': self.extensions[params[0]]}])
+        db.on('SET ref_count = ref_count +', self.adjust(1))
+        db.on('SET ref_count = GREATEST', self.adjust(-1))
+        db.on('WHERE ref_count = 0', self.unreferenced)
+        db.on('DELETE FROM upload_blobs', self.delete)
+        db.on('SELECT content_hash FROM upload_blobs', lambda sql, params: [
+            {'content_hash': h} for h in params if h in self.refs
+        ])
+        db.on('INSERT INTO categories', lambda sql, params: self.category_images.update({len(self.category_images) + 1: params[2]}))
+        db.on('SELECT image FROM categories', lambda sql, params: [{'image': self.category_images[params[0]]}])
+        db.on('UPDATE categories', lambda sql, params: self.category_images.update({params[4]: params[2]}))
+
+    def insert(self, sql, params):
+        content_hash, extension, _ = params
+        self.refs.setdefault(content_hash, 0)
+        self.extensions.setdefault(content_hash, extension)
+
+    def adjust(self, sign):
+        def respond(sql, rows):
+            for count, content_hash in rows:
+                self.refs[content_hash] = max(self.refs[content_hash] + sign * count, 0)
+        return respond
+
+    def unreferenced(self, sql, params):
+        # params[0] is the claim grace period, which every blob here is past
+        return [
+            {'content_hash': h, 'extension': self.extensions[h]}
+            for h in params[1:] if self.refs.get(h) == 0
+        ]
+
+    def delete(self, sql, params):
+        for content_hash in params:
+            del self.refs[content_hash]
+
+
+@pytest.fixture
+def blobs(fake_db, monkeypatch, tmp_path):
+    monkeypatch.setitem(app_module.app.config, 'UPLOAD_FOLDER', str(tmp_path / 'uploads'))
+    monkeypatch.setitem(app_module.app.config, 'DERIVATIVE_FOLDER', str(tmp_path / 'derivatives'))
+    monkeypatch.setattr(app_module, 'generate_all_derivatives', lambda path: None)
+    return UploadBlobs(fake_db)
+
+
+def upload(client):
+    response = client.post('/upload', data={'image': (io.BytesIO(PNG), 'logo.png')}, content_type='multipart/form-data')
+    assert response.status_code == 200
+    url = response.get_json()['url']
+    return url, app_module.upload_path(url.rsplit('/', 1)[1])
+
+
+def test_each_category_holds_its_own_reference(blobs, client):
+    url, path = upload(client)
+    (content_hash,) = blobs.refs
+    assert blobs.refs[content_hash] == 0
+
+    client.post('/categories', json={'name': 'Kitchen', 'image': url})
+    client.post('/categories', json={'name': 'Garden', 'image': url})
+    assert blobs.refs[content_hash] == 2
+
+    # One category dropping the image leaves the file to the other
+    client.put('/categories/1', json={'name': 'Kitchen', 'image': ''})
+    assert blobs.refs[content_hash] == 1
+    assert os.path.exists(path)
+
+    client.delete('/categories/2')
+    assert content_hash not in blobs.refs
+    assert not os.path.exists(path)
+
+
+def test_files_are_removed_after_the_rows_are_committed(blobs, fake_db, client, monkeypatch):
+    url, path = upload(client)
+    client.post('/categories', json={'name': 'Kitchen', 'image': url})
+    removed = []
+    remove = os.remove
+
+    def remove_after_commit(target):
+        removed.append((target, fake_db.commits))
+        remove(target)
+    monkeypatch.setattr(os, 'remove', remove_after_commit)
+    commits = fake_db.commits
+
+    client.delete('/categories/1')
+
+    # Two commits before the file goes: the category delete, then the upload_blobs rows
+    assert removed == [(path, commits + 2)]
+
+
+def test_failed_row_delete_keeps_the_file(blobs, fake_db, client):
+    url, path = upload(client)
+    client.post('/categories', json={'name': 'Kitchen', 'image': url})
+    fake_db.on('DELETE FROM upload_blobs', RuntimeError('lock wait timeout'))
+
+    client.delete('/categories/1')
+
+    assert os.path.exists(path)